@@ -0,0 +1,52 @@
+import random
+from collections import namedtuple
+from sqlalchemy import func, select
+from lib.database import get_db_session
+from lib.importer import import_records
+from lib.models.answer import Answer
+from lib.models.category import Category
+from lib.models.question import Question
+
+DEFAULT_CATEGORIES = 20
+ANSWERS_PER_QUESTION = 4
+
+# Varied enough that search, dedupe and the import path see realistic texts rather than one repeated string
+SUBJECTS = ("river", "planet", "painter", "element", "treaty", "composer", "mountain", "language", "empire",
+            "novel", "protein", "theorem", "volcano", "dynasty", "satellite", "enzyme", "festival", "glacier")
+QUESTION_FORMS = ("Which {s} is described by clue {n}?", "What is the name of {s} number {n}?",
+                  "In which year was {s} {n} first recorded?", "Who is most associated with {s} {n}?")
+
+Bank = namedtuple("Bank", ["questions", "answers", "category_ids", "question_ids", "answer_ids", "import_result"])
+
+
+def synthetic_records(questions, categories=DEFAULT_CATEGORIES, seed=0):
+    """Yields `questions` import records spread evenly over `categories` categories.
+
+    Each question has ANSWERS_PER_QUESTION answers, one correct. The same arguments always
+    yield the same bank.
+    """
+    rng = random.Random(seed)
+    for n in range(questions):
+        subject = rng.choice(SUBJECTS)
+        correct = rng.randrange(ANSWERS_PER_QUESTION)
+        yield {
+            "category": f"Bench Category {n % categories + 1}",
+            "question": rng.choice(QUESTION_FORMS).format(s=subject, n=n),
+            "answers": [{"text": f"{subject.title()} {n}-{i}", "is_correct": i == correct}
+                        for i in range(ANSWERS_PER_QUESTION)],
+        }
+
+
+def build_bank(questions, categories=DEFAULT_CATEGORIES, seed=0):
+    """Imports a synthetic bank through the bulk import path and returns a Bank describing it.
+
+    question_ids and answer_ids are (first, last) ID ranges; the import inserts them contiguously.
+    """
+    result = import_records(synthetic_records(questions, categories, seed), duplicates="off")
+    session = get_db_session()
+    category_ids = session.execute(select(Category.id).where(Category.name.like("Bench Category %"))
+                                   .order_by(Category.id)).scalars().all()
+    question_ids = session.execute(select(func.min(Question.id), func.max(Question.id))).one()
+    answer_ids = session.execute(select(func.min(Answer.id), func.max(Answer.id))).one()
+    session.close()
+    return Bank(result.questions, result.answers, category_ids, tuple(question_ids), tuple(answer_ids), result)
@@ -0,0 +1,139 @@
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+from collections import namedtuple
+from lib.cache import invalidate_cache
+from lib.database import close_db_session
+from lib.dedupe import scan_duplicates
+from lib.exporter import export_questions
+from lib.helpers import seed_database
+from lib.importer import import_records
+from lib.models.answer import Answer
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.snapshot_file import write_snapshot
+from benchmarks.bank import synthetic_records
+
+# A case is run(bank, ops, rng) -> list of seconds, one per timed operation. Cases run in
+# registration order on the same database, so destructive ones come last; fresh_database
+# cases get an empty database of their own instead of the bank.
+Benchmark = namedtuple("Benchmark", ["name", "description", "run", "ops", "threshold", "fresh_database"])
+BENCHMARKS = []
+
+
+def benchmark(name, description, ops=200, threshold=None, fresh_database=False):
+    """Registers a benchmark case; threshold overrides the allowed regression for noisy cases."""
+    def register(run):
+        BENCHMARKS.append(Benchmark(name, description, run, ops, threshold, fresh_database))
+        return run
+    return register
+
+
+def time_each(fn, args, before=None):
+    """Calls fn(*arg) for each arg and returns the duration of every call (before() is not timed)."""
+    timings = []
+    for arg in args:
+        if before:
+            before()
+        start = time.perf_counter()
+        fn(*arg)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _random_ids(id_range, ops, rng):
+    return [(rng.randint(*id_range),) for _ in range(ops)]
+
+
+@benchmark("seed", "seed_database() on an empty database", ops=5, fresh_database=True)
+def _seed(bank, ops, rng):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return time_each(seed_database, [()] * ops)
+
+
+@benchmark("category_create", "Category.create, one commit each")
+def _category_create(bank, ops, rng):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return time_each(Category.create, [(f"Bench New Category {i}",) for i in range(ops)])
+
+
+@benchmark("question_find_by_id_cold", "Question.find_by_id of a random question, cache cleared", ops=2000)
+def _question_find_cold(bank, ops, rng):
+    return time_each(Question.find_by_id, _random_ids(bank.question_ids, ops, rng), before=invalidate_cache)
+
+
+@benchmark("question_find_by_id_cached", "Question.find_by_id of a few hot questions", ops=2000, threshold=1.0)
+def _question_find_cached(bank, ops, rng):
+    hot = _random_ids(bank.question_ids, 20, rng)
+    return time_each(Question.find_by_id, [rng.choice(hot) for _ in range(ops)])
+
+
+@benchmark("answer_update", "Answer.update of a random answer's text")
+def _answer_update(bank, ops, rng):
+    def update(answer_id, n):
+        answer = Answer.find_by_id(answer_id)
+        if answer:
+            answer.update(new_text=f"Updated answer {n}")
+    ids = _random_ids(bank.answer_ids, ops, rng)
+    return time_each(update, [(answer_id, n) for n, (answer_id,) in enumerate(ids)])
+
+
+@benchmark("quiz_load_category", "Whole-category quiz load as in Take Quiz (get_all, IDs, load_quiz)", ops=20)
+def _quiz_load_category(bank, ops, rng):
+    def load(category_id):
+        Category.get_all()
+        Question.ids_for_category(category_id)
+        Category.load_quiz(category_id)
+        close_db_session() # Each quiz run ends its session, as the main menu does
+    return time_each(load, [(rng.choice(bank.category_ids),) for _ in range(ops)], before=invalidate_cache)
+
+
+@benchmark("quiz_load_sample", "10-question quiz load as in Take Quiz (get_all, IDs, sample)", ops=200)
+def _quiz_load_sample(bank, ops, rng):
+    def load(category_id):
+        Category.get_all()
+        Question.ids_for_category(category_id)
+        Question.sample(category_id, 10)
+        close_db_session()
+    return time_each(load, [(rng.choice(bank.category_ids),) for _ in range(ops)])
+
+
+@benchmark("export_jsonl", "Streaming JSONL export of the whole bank", ops=1)
+def _export(bank, ops, rng):
+    with open(os.devnull, "w") as out:
+        return time_each(export_questions, [(out,)] * ops)
+
+
+@benchmark("snapshot_write", "Binary content snapshot of the whole bank", ops=1)
+def _snapshot(bank, ops, rng):
+    with tempfile.TemporaryDirectory() as directory:
+        return time_each(write_snapshot, [(os.path.join(directory, "bench.bin"),)] * ops)
+
+
+@benchmark("dedupe_scan", "scan_duplicates over the whole bank (templated questions)", ops=1)
+def _dedupe_scan(bank, ops, rng):
+    return time_each(scan_duplicates, [()] * ops)
+
+
+@benchmark("import_default_policy", "import_records of a bank-sized input with the default duplicate policy",
+           ops=1, fresh_database=True)
+def _import_default_policy(bank, ops, rng):
+    return time_each(lambda: import_records(synthetic_records(bank.questions)), [()] * ops)
+
+
+@benchmark("import_flag_duplicates", "import_records of a bank-sized input, flagging near-duplicates",
+           ops=1, fresh_database=True)
+def _import_flag_duplicates(bank, ops, rng):
+    return time_each(lambda: import_records(synthetic_records(bank.questions), duplicates="flag"), [()] * ops)
+
+
+@benchmark("category_delete_cascade", "Category.delete of a category with its questions and answers", ops=2)
+def _category_delete(bank, ops, rng):
+    def delete(category_id):
+        Category.find_by_id(category_id).delete()
+    chosen = bank.category_ids[:min(ops, len(bank.category_ids))]
+    with contextlib.redirect_stdout(io.StringIO()):
+        return time_each(delete, [(category_id,) for category_id in chosen], before=invalidate_cache)
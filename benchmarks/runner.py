@@ -0,0 +1,144 @@
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+import sqlalchemy
+from lib.cache import invalidate_cache
+from lib.database import build_engine, close_db_session, swap_engine
+from lib.migrations import upgrade
+from benchmarks.bank import DEFAULT_CATEGORIES, build_bank
+from benchmarks.cases import BENCHMARKS
+
+DEFAULT_SIZES = (1000, 10000)
+RESULTS_VERSION = 1
+REGRESSION_THRESHOLD = float(os.environ.get("QUIZ_BENCH_THRESHOLD", 0.25)) # Allowed slowdown of the median, 0.25 = 25%
+NOISE_FLOOR = 20e-6 # Seconds; smaller differences in the median are never regressions
+
+Regression = namedtuple("Regression", ["size", "name", "baseline", "current", "limit"])
+
+
+def summarize(timings):
+    """Reduces per-operation durations to the statistics stored in the results file."""
+    ordered = sorted(timings)
+    return {
+        "ops": len(ordered),
+        "total": sum(ordered),
+        "mean": statistics.fmean(ordered),
+        "median": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "min": ordered[0],
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class _ScratchDatabase:
+    """Points the app at an empty, migrated SQLite file for the duration of a with block.
+
+    The app's own engine is left open and rebound afterwards, so even an in-memory database survives.
+    """
+
+    def __enter__(self):
+        self.directory = tempfile.TemporaryDirectory(prefix="quiz-bench-")
+        engine = build_engine(f"sqlite:///{os.path.join(self.directory.name, 'bench.db')}")
+        self.original = swap_engine(engine)
+        invalidate_cache() # Cached rows belong to the other database
+        upgrade(engine, log=lambda message: None)
+        return self
+
+    def __exit__(self, *exc_info):
+        close_db_session()
+        swap_engine(self.original).dispose()
+        invalidate_cache()
+        self.directory.cleanup()
+
+
+def _run_case(case, bank, ops, seed):
+    try:
+        return summarize(case.run(bank, ops, random.Random(seed)))
+    finally:
+        close_db_session()
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, categories=DEFAULT_CATEGORIES, ops_scale=1.0, only=None, seed=0, log=print):
+    """Builds a synthetic bank of each size on a scratch database and times every case against it.
+
+    ops_scale multiplies each case's operation count. Returns the results document
+    ({"results": {size: {case: statistics}}} plus the environment it was measured in).
+    """
+    cases = [case for case in BENCHMARKS if not only or case.name in only]
+    results = {}
+    for size in sizes:
+        log(f"Bank of {size:,} questions:")
+        size_results = results[str(size)] = {}
+        with _ScratchDatabase():
+            start = time.perf_counter()
+            bank = build_bank(size, categories, seed)
+            seconds = time.perf_counter() - start
+            size_results["bulk_import"] = {**summarize([seconds]),
+                                           "rows_per_second": (bank.questions + bank.answers) / seconds}
+            log(f"  {'bulk_import':<28} {seconds * 1000:>10.2f} ms")
+            for case in cases:
+                ops = max(1, round(case.ops * ops_scale))
+                if case.fresh_database:
+                    with _ScratchDatabase():
+                        stats = _run_case(case, bank, ops, seed)
+                else:
+                    stats = _run_case(case, bank, ops, seed)
+                size_results[case.name] = stats
+                log(f"  {case.name:<28} {stats['median'] * 1000:>10.3f} ms median, "
+                    f"{stats['p95'] * 1000:.3f} ms p95 ({stats['ops']} ops)")
+    return {
+        "version": RESULTS_VERSION,
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "sqlite": sqlite3.sqlite_version,
+        "categories": categories,
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """Returns a Regression for every case whose median slowed by more than its threshold.
+
+    Only cases measured at the same bank size in both documents are compared.
+    """
+    thresholds = {case.name: case.threshold for case in BENCHMARKS if case.threshold is not None}
+    regressions = []
+    for size, cases in current["results"].items():
+        for name, stats in cases.items():
+            before = baseline.get("results", {}).get(size, {}).get(name)
+            if not before:
+                continue
+            limit = before["median"] * (1 + thresholds.get(name, threshold))
+            if stats["median"] > limit and stats["median"] - before["median"] > NOISE_FLOOR:
+                regressions.append(Regression(int(size), name, before["median"], stats["median"], limit))
+    return regressions
+
+
+def save_results(document, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fp:
+        json.dump(document, fp, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as fp:
+        return json.load(fp)
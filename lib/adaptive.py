@@ -0,0 +1,192 @@
+import atexit
+import math
+import os
+import threading
+from array import array
+from sqlalchemy import select
+from lib.cache import PerEngine
+from lib.database import get_db_session, get_engine
+from lib.models.base import upsert
+from lib.models.question_stat import QuestionStat
+from lib.quiz import QuizSession
+
+STATS_FLUSH_EVERY = int(os.environ.get("QUIZ_STATS_FLUSH_EVERY", 200)) # Updates between writes to question_stats
+
+# Item response theory, two-parameter logistic model: a taker of ability t answers a question
+# of difficulty b and discrimination a correctly with probability 1 / (1 + exp(-a * (t - b))).
+# Both sides are fitted online, Elo-style: each response moves the estimates along the
+# prediction error, with steps shrinking as more responses are seen.
+DEFAULT_DIFFICULTY, DEFAULT_DISCRIMINATION = 0.0, 1.0
+MIN_DISCRIMINATION, MAX_DISCRIMINATION = 0.25, 4.0
+ITEM_STEP, ABILITY_STEP, DISCRIMINATION_RATE = 0.4, 1.0, 0.2
+MIN_STEP = 0.05 # Keeps estimates able to follow questions that get easier or harder
+
+
+def probability(ability, difficulty, discrimination):
+    """Chance of a correct answer under the 2PL model."""
+    exponent = -discrimination * (ability - difficulty)
+    return 1.0 / (1.0 + math.exp(exponent)) if exponent < 700 else 0.0
+
+
+def _step(base, count):
+    return max(MIN_STEP, base / math.sqrt(1 + count))
+
+
+class ItemStats:
+    """Difficulty and discrimination of every question, in flat arrays indexed by question ID.
+
+    A question's statistics are three array slots, so picking the most informative of n
+    questions is one pass over plain floats with no queries, and a million questions take
+    about 20 MB. Updates are kept in memory and written to the question_stats table every
+    flush_every updates (and at exit), so persisting costs one batched statement per
+    flush rather than one per answer. What is written is the change since the last flush,
+    added to the stored values like the leaderboard counters, so processes sharing a
+    database do not overwrite each other's updates.
+    """
+
+    def __init__(self, flush_every=STATS_FLUSH_EVERY, engine=None):
+        self.flush_every = flush_every
+        self.engine = engine # Database written to on flush (default: the active one)
+        self.difficulty = array("d")
+        self.discrimination = array("d")
+        self.responses = array("I")
+        self._pending = {} # question ID -> [difficulty, discrimination, responses] changes not yet written
+        self._updates = 0 # Since the last flush
+        self._lock = threading.RLock()
+
+    def _ensure(self, question_id):
+        missing = question_id + 1 - len(self.difficulty)
+        if missing > 0:
+            self.difficulty.extend([DEFAULT_DIFFICULTY] * missing)
+            self.discrimination.extend([DEFAULT_DISCRIMINATION] * missing)
+            self.responses.extend([0] * missing)
+
+    def load(self, connection):
+        """Reads every stored row (one query)."""
+        with self._lock:
+            table = QuestionStat.__table__
+            for question_id, difficulty, discrimination, responses in connection.execute(select(
+                    table.c.question_id, table.c.difficulty, table.c.discrimination, table.c.responses)):
+                self._ensure(question_id)
+                self.difficulty[question_id] = difficulty
+                self.discrimination[question_id] = discrimination
+                self.responses[question_id] = responses
+        return self
+
+    def get(self, question_id):
+        """Returns (difficulty, discrimination, responses) for a question."""
+        if question_id < len(self.difficulty):
+            return self.difficulty[question_id], self.discrimination[question_id], self.responses[question_id]
+        return DEFAULT_DIFFICULTY, DEFAULT_DISCRIMINATION, 0
+
+    def most_informative(self, question_ids, ability):
+        """Returns the question whose answer tells the most about a taker of this ability.
+
+        Fisher information a^2 * p * (1 - p) peaks for questions the taker has an even chance
+        on, weighted towards questions that separate strong from weak takers. Ties go to the
+        earliest question in question_ids.
+        """
+        difficulty, discrimination = self.difficulty, self.discrimination
+        size = len(difficulty)
+        best_id, best_information = None, -1.0
+        for question_id in question_ids:
+            if question_id < size:
+                a, b = discrimination[question_id], difficulty[question_id]
+            else:
+                a, b = DEFAULT_DISCRIMINATION, DEFAULT_DIFFICULTY
+            p = probability(ability, b, a)
+            information = a * a * p * (1.0 - p)
+            if information > best_information:
+                best_id, best_information = question_id, information
+        return best_id
+
+    def update(self, question_id, ability, is_correct):
+        """Folds one response into the question's estimates; returns the predicted probability."""
+        with self._lock:
+            self._ensure(question_id)
+            a, b, count = self.discrimination[question_id], self.difficulty[question_id], self.responses[question_id]
+            p = probability(ability, b, a)
+            error = (1.0 if is_correct else 0.0) - p
+            step = _step(ITEM_STEP, count)
+            difficulty = b - step * a * error
+            discrimination = a + step * DISCRIMINATION_RATE * error * (ability - b)
+            discrimination = min(MAX_DISCRIMINATION, max(MIN_DISCRIMINATION, discrimination))
+            self.difficulty[question_id] = difficulty
+            self.discrimination[question_id] = discrimination
+            self.responses[question_id] = count + 1
+            pending = self._pending.setdefault(question_id, [0.0, 0.0, 0])
+            pending[0] += difficulty - b
+            pending[1] += discrimination - a
+            pending[2] += 1
+            self._updates += 1
+            due = self._updates >= self.flush_every
+        if due:
+            self.flush()
+        return p
+
+    def flush(self):
+        """Adds the changes since the last flush to the stored statistics; returns the number of questions written.
+
+        Changes are kept when the write fails, and retried on the next flush.
+        """
+        with self._lock:
+            if not self._pending:
+                return 0
+            self._updates = 0 # Also after a failure, so it is retried flush_every updates later
+            rows = [{"question_id": q, "difficulty": d, "discrimination": a, "responses": n}
+                    for q, (d, a, n) in sorted(self._pending.items())]
+            table = QuestionStat.__table__
+            try:
+                with (self.engine or get_engine()).begin() as connection:
+                    # Missing rows are created with the column defaults first, so the changes apply to them too
+                    upsert(connection, table, ["question_id"], [{"question_id": row["question_id"], "responses": 0}
+                                                                for row in rows], increment=("responses",))
+                    upsert(connection, table, ["question_id"], rows,
+                           increment=("difficulty", "discrimination", "responses"))
+            except Exception as e:
+                print(f"Error saving question statistics: {e}")
+                return 0
+            self._pending.clear()
+            return len(rows)
+
+
+class AdaptiveQuizSession(QuizSession):
+    """A QuizSession that serves, at each step, the remaining question most informative at the
+    taker's current ability estimate, and learns question statistics from the answers.
+
+    The estimate starts at `ability` and moves after each answer by the prediction error;
+    questions the model knows nothing about are served in the session's random order.
+    """
+
+    def __init__(self, engine, stats, ability=0.0, rng=None, seed=None):
+        super().__init__(engine, shuffle=True, rng=rng, seed=seed)
+        self.stats = stats
+        self.ability = ability
+
+    def next_question(self):
+        if self.position < self.total:
+            questions, order = self.engine.questions, self.order
+            remaining = order[self.position:]
+            best = self.stats.most_informative([questions[i].id for i in remaining], self.ability)
+            chosen = self.position + next(i for i, q in enumerate(remaining) if questions[q].id == best)
+            order[self.position], order[chosen] = order[chosen], order[self.position]
+        return super().next_question()
+
+    def answer(self, answer_id):
+        result = super().answer(answer_id)
+        a = self.stats.get(result.question_id)[1]
+        p = self.stats.update(result.question_id, self.ability, result.is_correct)
+        step = _step(ABILITY_STEP, self.answered - 1)
+        self.ability += step * a * ((1.0 if result.is_correct else 0.0) - p)
+        return result
+
+
+# Statistics of each database (the default one and each tenant), written out when dropped and at exit
+_stats = PerEngine(lambda engine: ItemStats(engine=engine).load(get_db_session().connection()),
+                   on_drop=lambda stats: stats.flush())
+atexit.register(lambda: [stats.flush() for stats in _stats.values()])
+
+
+def get_item_stats():
+    """Returns this process's ItemStats for the current engine, loading them on first use."""
+    return _stats.get()
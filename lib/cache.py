@@ -0,0 +1,190 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy.orm import Session as _Session
+from lib.database import get_db_session, get_engine
+
+CACHE_MAX_SIZE = int(os.environ.get("QUIZ_CACHE_SIZE", 4096))
+CACHE_TTL = float(os.environ.get("QUIZ_CACHE_TTL", 60)) # Seconds; bounds staleness from other processes
+ENGINE_CACHE_SIZE = 32 # Databases (the default one and open tenants) whose in-memory indexes are kept
+
+_MISSING = object()
+
+
+class TTLCache:
+    """A thread-safe, size-bounded LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, max_size=CACHE_MAX_SIZE, ttl=CACHE_TTL, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Returns the cached value for key, or default if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Stores value under key, evicting the least recently used entry if full."""
+        with self._lock:
+            self._data[key] = (self._clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key=_MISSING):
+        """Drops one key, or every entry when called without a key."""
+        with self._lock:
+            if key is _MISSING:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self):
+        """Returns hit/miss counters and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "size": len(self._data),
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+
+class PerEngine:
+    """One lazily built object per database engine, e.g. an index or statistics of that database.
+
+    Threads working on different tenants each get their own database's object, and
+    switching back and forth rebuilds nothing. The max_engines most recently used are
+    kept; on_drop(obj), if given, runs on the ones dropped (e.g. to write them out).
+    """
+
+    def __init__(self, build, max_engines=ENGINE_CACHE_SIZE, on_drop=None):
+        self._build = build # build(engine) -> object
+        self.max_engines = max_engines
+        self._on_drop = on_drop
+        self._values = OrderedDict() # engine -> object, least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, engine=None):
+        """Returns the object for engine (default: the active one), building it on first use."""
+        engine = engine or get_engine()
+        with self._lock:
+            value = self._values.get(engine, _MISSING)
+            if value is not _MISSING:
+                self._values.move_to_end(engine)
+                return value
+            value = self._values[engine] = self._build(engine)
+            dropped = []
+            while len(self._values) > self.max_engines:
+                dropped.append(self._values.popitem(last=False)[1])
+        for old in dropped:
+            if self._on_drop:
+                self._on_drop(old)
+        return value
+
+    def peek(self, engine):
+        """Returns the object for engine if one was built, without building it."""
+        with self._lock:
+            return self._values.get(engine)
+
+    def values(self):
+        with self._lock:
+            return list(self._values.values())
+
+
+class ModelCache:
+    """Read-through cache for model lookups, shared by all threads.
+
+    Keys include the engine the value was read from, so results from one database (or
+    tenant) are never served for another, even while threads work on different tenants.
+
+    Cached values are detached copies of ORM instances, so commits in one session never
+    expire them. A hit is merged into the caller's session without a SELECT, which keeps
+    lazy relationships (e.g. question.answers) working as with an uncached lookup.
+    """
+
+    def __init__(self, max_size=CACHE_MAX_SIZE, ttl=CACHE_TTL):
+        self._entries = TTLCache(max_size=max_size, ttl=ttl)
+
+    def fetch(self, key, loader):
+        """Returns the cached result for key, calling loader(session) on a miss."""
+        key = (get_engine(), key)
+        session = get_db_session()
+        cached = self._entries.get(key, _MISSING)
+        if cached is not _MISSING:
+            return self._attach(session, cached)
+        value = loader(session)
+        self._entries.set(key, self._detach(value))
+        return value
+
+    def fetch_value(self, key, loader):
+        """Like fetch, for immutable non-ORM values (tuples, arrays) that need no session handling."""
+        key = (get_engine(), key)
+        cached = self._entries.get(key, _MISSING)
+        if cached is not _MISSING:
+            return cached
+        value = loader(get_db_session())
+        self._entries.set(key, value)
+        return value
+
+    def invalidate(self):
+        """Drops every cached entry; called after any write to quiz content."""
+        self._entries.invalidate()
+
+    def stats(self):
+        return self._entries.stats()
+
+    @staticmethod
+    def _detach(value):
+        if value is None:
+            return None
+        scratch = _Session() # Unbound; only used to copy instance state
+        if isinstance(value, list):
+            copies = [scratch.merge(obj, load=False) for obj in value]
+        else:
+            copies = scratch.merge(value, load=False)
+        scratch.expunge_all()
+        return copies
+
+    @staticmethod
+    def _attach(session, value):
+        if value is None:
+            return None
+        if isinstance(value, list):
+            return [session.merge(obj, load=False) for obj in value]
+        return session.merge(value, load=False)
+
+
+model_cache = ModelCache()
+
+
+def invalidate_cache():
+    """Invalidates all cached categories, questions and answers."""
+    model_cache.invalidate()
+
+
+def cache_stats():
+    """Returns hit-rate counters for the model cache."""
+    return model_cache.stats()
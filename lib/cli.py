@@ -1,11 +1,14 @@
+import sys
 from colorama import Fore, Style, init # Optional: for colored output
-from lib.models.category import Category
-from lib.models.question import Question
-from lib.models.answer import Answer
-import random
+from lib.profiling import operation
+
+# Models (and with them SQLAlchemy) are imported by the actions that use them, so the
+# main menu is drawn before any of them load; tests/test_startup.py keeps it that way.
 
 init(autoreset=True) # Initialize Colorama for auto-resetting colors
 
+MAX_BULK_IDS = 10000 # IDs one bulk command may list, ranges included
+
 def print_menu(title, options):
     """Prints a generic menu."""
     print(f"\n{Fore.CYAN}--- {title} ---{Style.RESET_ALL}")
@@ -27,9 +30,47 @@ def get_user_choice(max_choice):
         except ValueError:
             print(f"{Fore.RED}Invalid input. Please enter a number.{Style.RESET_ALL}")
 
+def profiled(menu, options, choice):
+    """Groups a menu action's queries for the profiler (a no-op unless QUIZ_PROFILE or --profile is set)."""
+    return operation(f"{menu}: {options[choice - 1]}" if 0 < choice <= len(options) else None, summary=True)
+
+def parse_ids(text):
+    """Parses "4, 7, 10-20" into a list of IDs; None when blank, False when malformed or over MAX_BULK_IDS."""
+    ids = []
+    for part in text.replace(" ", "").split(","):
+        if not part:
+            continue
+        low, dash, high = part.partition("-")
+        if not low.isdigit() or (dash and not high.isdigit()):
+            return False
+        low, high = int(low), int(high) if dash else int(low)
+        if len(ids) + max(0, high - low + 1) > MAX_BULK_IDS: # Checked before expanding the range
+            return False
+        ids.extend(range(low, high + 1))
+    return ids or None
+
 def take_quiz_menu():
     """Handles the 'Take Quiz' functionality."""
-    categories = Category.get_all()
+    from lib.snapshot_file import open_current_snapshot
+
+    # A binary snapshot matching the current content serves every read; otherwise use the database
+    snapshot = open_current_snapshot()
+    try:
+        run_quiz(snapshot)
+    finally:
+        if snapshot:
+            snapshot.close()
+
+def run_quiz(snapshot=None):
+    """Runs one quiz, reading content from snapshot when given."""
+    from lib.models.category import Category
+    from lib.models.question import Question
+    from lib.models.attempt import Attempt
+    from lib.quiz import QuizEngine
+    from lib.adaptive import AdaptiveQuizSession, get_item_stats
+    from lib.recorder import get_recorder
+
+    categories = snapshot.list_categories() if snapshot else Category.get_all()
     if not categories:
         print(f"{Fore.RED}No quiz categories available. Please add some first.{Style.RESET_ALL}")
         return
@@ -44,221 +85,428 @@ def take_quiz_menu():
     selected_category = categories[choice - 1]
     print(f"\n{Fore.CYAN}--- Starting Quiz in '{selected_category.name}' Category ---{Style.RESET_ALL}")
 
-    questions = selected_category.questions
-    if not questions:
+    if snapshot:
+        available = selected_category.question_count
+    else:
+        available = len(Question.ids_for_category(selected_category.id))
+    if not available:
         print(f"{Fore.RED}No questions available in '{selected_category.name}'.{Style.RESET_ALL}")
         return
 
-    random.shuffle(questions) # Randomize question order
-    score = 0
-    total_questions = len(questions)
+    quiz_length = input(f"{Fore.GREEN}How many questions? (1-{available}, leave blank for all): {Style.RESET_ALL}").strip()
+    if quiz_length.isdigit() and 0 < int(quiz_length) < available:
+        # Loads only the sampled questions
+        quiz = (snapshot or Question).sample(selected_category.id, int(quiz_length))
+    else:
+        quiz = (snapshot or Category).load_quiz(selected_category.id) # The whole category at once
+    if not quiz or not quiz.questions:
+        print(f"{Fore.RED}No questions available in '{selected_category.name}'.{Style.RESET_ALL}")
+        return
 
-    for i, question in enumerate(questions):
-        print(f"\n{Fore.BLUE}Question {i+1}/{total_questions}: {question.text}{Style.RESET_ALL}")
-        answers = question.answers
-        if not answers:
-            print(f"{Fore.YELLOW}  (No answers available for this question. Skipping.){Style.RESET_ALL}")
-            continue
+    player = input(f"{Fore.GREEN}Enter your name (leave blank for Anonymous): {Style.RESET_ALL}").strip()
+    adaptive = input(f"{Fore.GREEN}Adapt questions to your level as you answer? (y/N): {Style.RESET_ALL}").strip().lower() == "y"
+    if adaptive:
+        quiz_session = AdaptiveQuizSession(QuizEngine(quiz), get_item_stats())
+    else:
+        quiz_session = QuizEngine(quiz).start() # Shuffles questions and answers
+    total_questions = quiz_session.total
+    attempt = Attempt.start(quiz.category_id, total_questions, player)
+    recorder = get_recorder() # Responses are written in batches by a background thread
 
-        random.shuffle(answers) # Randomize answer order
-        answer_options = [(ans.text, ans.is_correct) for ans in answers]
+    try:
+        while (question := quiz_session.next_question()) is not None:
+            print(f"\n{Fore.BLUE}Question {quiz_session.position}/{total_questions}: {question.text}{Style.RESET_ALL}")
+            if not question.answers:
+                print(f"{Fore.YELLOW}  (No answers available for this question. Skipping.){Style.RESET_ALL}")
+                quiz_session.skip()
+                continue
 
-        for j, (ans_text, _) in enumerate(answer_options):
-            print(f"  {Fore.YELLOW}{j+1}. {ans_text}{Style.RESET_ALL}")
+            for j, ans in enumerate(question.answers):
+                print(f"  {Fore.YELLOW}{j+1}. {ans.text}{Style.RESET_ALL}")
 
-        answer_choice = get_user_choice(len(answer_options))
-        if answer_choice == 0:
-            print(f"{Fore.YELLOW}Quiz interrupted. Final score: {score}/{total_questions}{Style.RESET_ALL}")
-            return
+            answer_choice = get_user_choice(len(question.answers))
+            if answer_choice == 0:
+                print(f"{Fore.YELLOW}Quiz interrupted. Final score: {quiz_session.score}/{total_questions}{Style.RESET_ALL}")
+                finish_attempt(attempt, quiz_session, recorder, completed=False)
+                return
 
-        selected_answer_is_correct = answer_options[answer_choice - 1][1]
+            result = quiz_session.answer(question.answers[answer_choice - 1].id)
+            if attempt:
+                recorder.record(attempt.id, result.question_id, result.answer_id, result.is_correct)
+            if result.is_correct:
+                print(f"{Fore.GREEN}Correct!{Style.RESET_ALL}")
+            else:
+                correct_answer_text = result.correct_answer.text if result.correct_answer else "N/A"
+                print(f"{Fore.RED}Incorrect. The correct answer was: {correct_answer_text}{Style.RESET_ALL}")
+    except KeyboardInterrupt:
+        finish_attempt(attempt, quiz_session, recorder, completed=False)
+        raise
 
-        if selected_answer_is_correct:
-            print(f"{Fore.GREEN}Correct!{Style.RESET_ALL}")
-            score += 1
-        else:
-            correct_answer_text = next((a for a, is_corr in answer_options if is_corr), "N/A")
-            print(f"{Fore.RED}Incorrect. The correct answer was: {correct_answer_text}{Style.RESET_ALL}")
-    
+    finish_attempt(attempt, quiz_session, recorder, completed=True)
     print(f"\n{Fore.CYAN}--- Quiz Finished! ---{Style.RESET_ALL}")
-    print(f"{Fore.MAGENTA}You scored: {score} out of {total_questions}{Style.RESET_ALL}")
+    print(f"{Fore.MAGENTA}You scored: {quiz_session.score} out of {total_questions}{Style.RESET_ALL}")
     if total_questions > 0:
-        percentage = (score / total_questions) * 100
-        print(f"{Fore.MAGENTA}Percentage: {percentage:.2f}%{Style.RESET_ALL}")
+        print(f"{Fore.MAGENTA}Percentage: {quiz_session.percentage:.2f}%{Style.RESET_ALL}")
+    if adaptive:
+        print(f"{Fore.MAGENTA}Estimated ability: {quiz_session.ability:+.2f} (0 is average){Style.RESET_ALL}")
+
+def finish_attempt(attempt, quiz_session, recorder, completed):
+    """Durably stores buffered responses and the final score of a quiz attempt."""
+    from lib.adaptive import AdaptiveQuizSession
+
+    if not recorder.flush():
+        print(f"{Fore.RED}Some of your answers could not be saved.{Style.RESET_ALL}")
+    if isinstance(quiz_session, AdaptiveQuizSession):
+        quiz_session.stats.flush()
+    if attempt:
+        attempt.finish(quiz_session.score, completed=completed)
+
+
+def leaderboard_menu():
+    """Shows the top players overall or in one category, and that category's hardest questions."""
+    from lib.models.category import Category
+    from lib.leaderboard import hardest_questions, top_players
+
+    category_id_str = input(f"{Fore.GREEN}Enter category ID (leave blank for all categories): {Style.RESET_ALL}").strip()
+    category = None
+    if category_id_str:
+        if not category_id_str.isdigit() or (category := Category.find_by_id(int(category_id_str))) is None:
+            print(f"{Fore.RED}Category not found.{Style.RESET_ALL}")
+            return
+
+    entries = top_players(category_id=category.id if category else None)
+    print(f"\n{Fore.CYAN}--- Top Players{f' in {category.name}' if category else ''} ---{Style.RESET_ALL}")
+    if not entries:
+        print(f"{Fore.YELLOW}No completed quizzes yet.{Style.RESET_ALL}")
+    for entry in entries:
+        print(f"{Fore.YELLOW}{entry.rank}. {entry.player}: {entry.points} points "
+              f"({entry.accuracy:.0%} of {entry.answered} answered, {entry.attempts} quizzes){Style.RESET_ALL}")
+
+    if category:
+        hardest = hardest_questions(category.id)
+        if hardest:
+            print(f"\n{Fore.CYAN}--- Hardest Questions in {category.name} ---{Style.RESET_ALL}")
+            for question in hardest:
+                print(f"{Fore.YELLOW}{question.rate:.0%} correct ({question.answered} answers): "
+                      f"{question.question_text}{Style.RESET_ALL}")
+
+def study_menu():
+    """Reviews the player's due questions on a spaced-repetition schedule."""
+    import random
+    from lib.models.category import Category
+    from lib.models.review_card import ReviewCard
+    from lib.study import GRADE_AGAIN, GRADE_EASY, GRADE_GOOD, GRADE_HARD, MINUTES_PER_DAY, StudyDeck, now_minutes
+
+    categories = Category.get_all()
+    if not categories:
+        print(f"{Fore.RED}No quiz categories available. Please add some first.{Style.RESET_ALL}")
+        return
+    player = input(f"{Fore.GREEN}Enter your name (leave blank for Anonymous): {Style.RESET_ALL}").strip() or "Anonymous"
+    print_menu("Study Which Questions?", ["All categories"] + [cat.name for cat in categories])
+    choice = get_user_choice(len(categories) + 1)
+    if choice == 0:
+        return
+    category = categories[choice - 2] if choice > 1 else None
+
+    deck = StudyDeck(player, category.id if category else None)
+    print(f"\n{Fore.CYAN}--- Studying{f' {category.name}' if category else ''}: {deck.due_count} due, "
+          f"{deck.new_count} new ---{Style.RESET_ALL}")
+    try:
+        while (question := deck.next_card()) is not None:
+            print(f"\n{Fore.BLUE}{question.text}{Style.RESET_ALL}")
+            if not question.answers:
+                print(f"{Fore.YELLOW}  (No answers available for this question. Skipping.){Style.RESET_ALL}")
+                continue
+            answers = random.sample(question.answers, len(question.answers))
+            for j, ans in enumerate(answers):
+                print(f"  {Fore.YELLOW}{j+1}. {ans.text}{Style.RESET_ALL}")
+            answer_choice = get_user_choice(len(answers))
+            if answer_choice == 0:
+                break
+            if answers[answer_choice - 1].is_correct:
+                rating = input(f"{Fore.GREEN}Correct! How well did you know it? "
+                               f"1. Hard  2. Good  3. Easy (blank for Good): {Style.RESET_ALL}").strip()
+                grade = {"1": GRADE_HARD, "3": GRADE_EASY}.get(rating, GRADE_GOOD)
+            else:
+                correct = next((a.text for a in answers if a.is_correct), "N/A")
+                print(f"{Fore.RED}Incorrect. The correct answer was: {correct}. You will see it again soon.{Style.RESET_ALL}")
+                grade = GRADE_AGAIN
+            card = deck.review(question.id, grade)
+            if card.interval:
+                print(f"{Fore.MAGENTA}Next review in {card.interval} day{'s' if card.interval != 1 else ''}.{Style.RESET_ALL}")
+    finally:
+        deck.close()
+
+    cards, due, next_due = ReviewCard.summary(player, now_minutes())
+    print(f"\n{Fore.CYAN}--- Reviewed {deck.reviewed} cards ---{Style.RESET_ALL}")
+    if due:
+        print(f"{Fore.MAGENTA}{due} of your {cards} cards are still due.{Style.RESET_ALL}")
+    elif next_due is not None:
+        wait = next_due - now_minutes()
+        when = f"{wait // MINUTES_PER_DAY} days" if wait >= MINUTES_PER_DAY else f"{max(wait, 1)} minutes"
+        print(f"{Fore.MAGENTA}All {cards} cards done; the next is due in {when}.{Style.RESET_ALL}")
+
+def page_through(title, fetch_page, show):
+    """Lists rows from fetch_page(after_id, limit) one screen at a time; returns False if there were none.
+
+    Only the starting ID of each page seen is kept, so paging either way is one keyset
+    query and memory stays constant however large the table is.
+    """
+    from lib.database import close_db_session
+    from lib.models.base import PAGE_SIZE
+
+    starts = [0]
+    while True:
+        rows = fetch_page(starts[-1], PAGE_SIZE + 1) # One extra row tells whether a next page exists
+        if not rows:
+            return len(starts) > 1
+        has_next = len(rows) > PAGE_SIZE
+        print(f"\n{Fore.CYAN}--- {title} (page {len(starts)}) ---{Style.RESET_ALL}")
+        for row in rows[:PAGE_SIZE]:
+            show(row)
+        if not has_next and len(starts) == 1:
+            return True
+        choice = input(f"{Fore.GREEN}'n'/'p' for next/previous page, or blank to return: {Style.RESET_ALL}").strip().lower()
+        if choice == "n" and has_next:
+            starts.append(rows[PAGE_SIZE - 1].id)
+        elif choice == "p" and len(starts) > 1:
+            starts.pop()
+        elif not choice:
+            return True
+        close_db_session() # Let the finished page go
+
+
+def show_category(cat):
+    print(f"ID: {cat.id}, Name: {cat.name}")
+
+
+def show_question(q):
+    category_name = q.category.name if q.category else "N/A"
+    print(f"ID: {q.id}, Category: {category_name}, Question: {q.text}")
+    for ans in q.answers:
+        correct_status = " (Correct)" if ans.is_correct else ""
+        print(f"  - Answer ID: {ans.id}, Text: {ans.text}{correct_status}")
 
 
 def manage_categories_menu():
     """Handles category management."""
+    from lib.models.category import Category
+    from lib.models.question import Question
+
     while True:
-        options = ["View Categories", "Add Category", "Update Category", "Delete Category"]
+        options = ["View Categories", "Add Category", "Update Category", "Delete Category",
+                   "Move All Questions to Another Category", "Rename Categories in Bulk"]
         print_menu("Manage Categories", options)
         choice = get_user_choice(len(options))
 
-        if choice == 1: # View Categories
-            categories = Category.get_all()
-            if not categories:
-                print(f"{Fore.YELLOW}No categories found.{Style.RESET_ALL}")
-            else:
-                print(f"\n{Fore.CYAN}--- All Categories ---{Style.RESET_ALL}")
-                for cat in categories:
-                    print(f"ID: {cat.id}, Name: {cat.name}")
-
-        elif choice == 2: # Add Category
-            name = input(f"{Fore.GREEN}Enter new category name: {Style.RESET_ALL}")
-            if name:
-                new_cat = Category.create(name)
-                if new_cat:
-                    print(f"{Fore.GREEN}Category '{new_cat.name}' added successfully!{Style.RESET_ALL}")
+        with profiled("Manage Categories", options, choice):
+            if choice == 1: # View Categories
+                if not page_through("All Categories", Category.iter_page, show_category):
+                    print(f"{Fore.YELLOW}No categories found.{Style.RESET_ALL}")
+
+            elif choice == 2: # Add Category
+                name = input(f"{Fore.GREEN}Enter new category name: {Style.RESET_ALL}")
+                if name:
+                    new_cat = Category.create(name)
+                    if new_cat:
+                        print(f"{Fore.GREEN}Category '{new_cat.name}' added successfully!{Style.RESET_ALL}")
+                    else:
+                        print(f"{Fore.RED}Failed to add category. Name might already exist.{Style.RESET_ALL}")
                 else:
-                    print(f"{Fore.RED}Failed to add category. Name might already exist.{Style.RESET_ALL}")
-            else:
-                print(f"{Fore.RED}Category name cannot be empty.{Style.RESET_ALL}")
+                    print(f"{Fore.RED}Category name cannot be empty.{Style.RESET_ALL}")
 
-        elif choice == 3: # Update Category
-            categories = Category.get_all()
-            if not categories:
-                print(f"{Fore.RED}No categories to update.{Style.RESET_ALL}")
-                continue
-            print(f"\n{Fore.CYAN}--- Select Category to Update ---{Style.RESET_ALL}")
-            for cat in categories:
-                print(f"ID: {cat.id}, Name: {cat.name}")
+            elif choice == 3: # Update Category
+                categories = Category.get_all()
+                if not categories:
+                    print(f"{Fore.RED}No categories to update.{Style.RESET_ALL}")
+                    continue
+                print(f"\n{Fore.CYAN}--- Select Category to Update ---{Style.RESET_ALL}")
+                for cat in categories:
+                    print(f"ID: {cat.id}, Name: {cat.name}")
             
-            try:
-                cat_id = int(input(f"{Fore.GREEN}Enter ID of category to update: {Style.RESET_ALL}"))
-                category = Category.find_by_id(cat_id)
-                if category:
-                    new_name = input(f"{Fore.GREEN}Enter new name for '{category.name}': {Style.RESET_ALL}")
-                    if new_name:
-                        if category.update(new_name):
-                            print(f"{Fore.GREEN}Category updated successfully!{Style.RESET_ALL}")
+                try:
+                    cat_id = int(input(f"{Fore.GREEN}Enter ID of category to update: {Style.RESET_ALL}"))
+                    category = Category.find_by_id(cat_id)
+                    if category:
+                        new_name = input(f"{Fore.GREEN}Enter new name for '{category.name}': {Style.RESET_ALL}")
+                        if new_name:
+                            if category.update(new_name):
+                                print(f"{Fore.GREEN}Category updated successfully!{Style.RESET_ALL}")
+                            else:
+                                print(f"{Fore.RED}Failed to update category.{Style.RESET_ALL}")
                         else:
-                            print(f"{Fore.RED}Failed to update category.{Style.RESET_ALL}")
+                            print(f"{Fore.RED}New name cannot be empty.{Style.RESET_ALL}")
                     else:
-                        print(f"{Fore.RED}New name cannot be empty.{Style.RESET_ALL}")
-                else:
-                    print(f"{Fore.RED}Category not found.{Style.RESET_ALL}")
-            except ValueError:
-                print(f"{Fore.RED}Invalid ID. Please enter a number.{Style.RESET_ALL}")
-
-        elif choice == 4: # Delete Category
-            categories = Category.get_all()
-            if not categories:
-                print(f"{Fore.RED}No categories to delete.{Style.RESET_ALL}")
-                continue
-            print(f"\n{Fore.CYAN}--- Select Category to Delete ---{Style.RESET_ALL}")
-            for cat in categories:
-                print(f"ID: {cat.id}, Name: {cat.name}")
+                        print(f"{Fore.RED}Category not found.{Style.RESET_ALL}")
+                except ValueError:
+                    print(f"{Fore.RED}Invalid ID. Please enter a number.{Style.RESET_ALL}")
+
+            elif choice == 4: # Delete Category
+                categories = Category.get_all()
+                if not categories:
+                    print(f"{Fore.RED}No categories to delete.{Style.RESET_ALL}")
+                    continue
+                print(f"\n{Fore.CYAN}--- Select Category to Delete ---{Style.RESET_ALL}")
+                for cat in categories:
+                    print(f"ID: {cat.id}, Name: {cat.name}")
             
-            try:
-                cat_id = int(input(f"{Fore.GREEN}Enter ID of category to delete: {Style.RESET_ALL}"))
-                category = Category.find_by_id(cat_id)
-                if category:
-                    confirm = input(f"{Fore.YELLOW}Deleting '{category.name}' will also delete ALL its questions and answers. Continue? (y/N): {Style.RESET_ALL}").lower()
-                    if confirm == 'y':
-                        if category.delete():
-                            print(f"{Fore.GREEN}Category '{category.name}' deleted successfully!{Style.RESET_ALL}")
+                try:
+                    cat_id = int(input(f"{Fore.GREEN}Enter ID of category to delete: {Style.RESET_ALL}"))
+                    category = Category.find_by_id(cat_id)
+                    if category:
+                        confirm = input(f"{Fore.YELLOW}Deleting '{category.name}' will also delete ALL its questions and answers. Continue? (y/N): {Style.RESET_ALL}").lower()
+                        if confirm == 'y':
+                            if category.delete():
+                                print(f"{Fore.GREEN}Category '{category.name}' deleted successfully!{Style.RESET_ALL}")
+                            else:
+                                print(f"{Fore.RED}Failed to delete category.{Style.RESET_ALL}")
                         else:
-                            print(f"{Fore.RED}Failed to delete category.{Style.RESET_ALL}")
+                            print(f"{Fore.BLUE}Deletion cancelled.{Style.RESET_ALL}")
                     else:
-                        print(f"{Fore.BLUE}Deletion cancelled.{Style.RESET_ALL}")
-                else:
-                    print(f"{Fore.RED}Category not found.{Style.RESET_ALL}")
-            except ValueError:
-                print(f"{Fore.RED}Invalid ID. Please enter a number.{Style.RESET_ALL}")
+                        print(f"{Fore.RED}Category not found.{Style.RESET_ALL}")
+                except ValueError:
+                    print(f"{Fore.RED}Invalid ID. Please enter a number.{Style.RESET_ALL}")
 
-        elif choice == 0:
-            break
-        else:
-            print(f"{Fore.RED}Invalid choice.{Style.RESET_ALL}")
+            elif choice == 5: # Move All Questions to Another Category
+                try:
+                    from_id = int(input(f"{Fore.GREEN}Move questions from category ID: {Style.RESET_ALL}"))
+                    to_id = int(input(f"{Fore.GREEN}To category ID: {Style.RESET_ALL}"))
+                except ValueError:
+                    print(f"{Fore.RED}Invalid ID. Please enter a number.{Style.RESET_ALL}")
+                    continue
+                moved = Question.move_all(from_id, to_id)
+                if moved is not None:
+                    print(f"{Fore.GREEN}Moved {moved} questions.{Style.RESET_ALL}")
+
+            elif choice == 6: # Rename Categories in Bulk
+                print(f"{Fore.CYAN}Enter one 'ID=New Name' per line; leave blank to finish.{Style.RESET_ALL}")
+                names = {}
+                while (line := input(f"{Fore.GREEN}> {Style.RESET_ALL}").strip()):
+                    category_id, _, new_name = line.partition("=")
+                    if not category_id.strip().isdigit() or not new_name.strip():
+                        print(f"{Fore.RED}Expected 'ID=New Name'.{Style.RESET_ALL}")
+                        continue
+                    names[int(category_id)] = new_name.strip()
+                if names:
+                    renamed = Category.bulk_rename(names)
+                    if renamed is not None:
+                        print(f"{Fore.GREEN}Renamed {renamed} categories.{Style.RESET_ALL}")
+
+            elif choice == 0:
+                break
+            else:
+                print(f"{Fore.RED}Invalid choice.{Style.RESET_ALL}")
 
 
+def select_question(action):
+    """Prompts for a question by ID or by searching question and answer text; returns it or None."""
+    from lib.models.question import Question
+    from lib.search import search_questions
+
+    while True:
+        query = input(f"{Fore.GREEN}Search for the question to {action} (words or an ID, blank to cancel): {Style.RESET_ALL}").strip()
+        if not query:
+            return None
+        if query.isdigit():
+            question = Question.find_by_id(int(query))
+            if question:
+                return question
+            print(f"{Fore.RED}Question not found.{Style.RESET_ALL}")
+            continue
+
+        page = 1
+        while True:
+            results = search_questions(query, page=page)
+            if not results.hits:
+                print(f"{Fore.YELLOW}No questions match '{query}'.{Style.RESET_ALL}")
+                break
+            print(f"\n{Fore.CYAN}--- Matches for '{query}' (page {results.page} of {results.pages}, {results.total} total) ---{Style.RESET_ALL}")
+            for hit in results.hits:
+                print(f"ID: {hit.question_id}, Question: {hit.question_text}")
+            choice = input(f"{Fore.GREEN}Enter a question ID, 'n'/'p' for next/previous page, or blank to search again: {Style.RESET_ALL}").strip().lower()
+            if choice == "n" and results.has_next:
+                page += 1
+            elif choice == "p" and page > 1:
+                page -= 1
+            elif choice.isdigit():
+                question = Question.find_by_id(int(choice))
+                if question:
+                    return question
+                print(f"{Fore.RED}Question not found.{Style.RESET_ALL}")
+            elif not choice:
+                break
+
 def manage_questions_menu():
     """Handles question management."""
+    from lib.models.category import Category
+    from lib.models.question import Question
+    from lib.models.answer import Answer
+
     while True:
-        options = ["View Questions", "Add Question", "Update Question", "Delete Question", "Manage Answers for Question"]
+        options = ["View Questions", "Add Question", "Update Question", "Delete Question", "Manage Answers for Question",
+                   "Delete Questions in Bulk", "Mark Answers Correct/Incorrect in Bulk", "Find and Replace in Question Text"]
         print_menu("Manage Questions", options)
         choice = get_user_choice(len(options))
 
-        if choice == 1: # View Questions
-            questions = Question.get_all()
-            if not questions:
-                print(f"{Fore.YELLOW}No questions found.{Style.RESET_ALL}")
-            else:
-                print(f"\n{Fore.CYAN}--- All Questions ---{Style.RESET_ALL}")
-                for q in questions:
-                    category_name = q.category.name if q.category else "N/A"
-                    print(f"ID: {q.id}, Category: {category_name}, Question: {q.text}")
-                    for ans in q.answers:
-                        correct_status = " (Correct)" if ans.is_correct else ""
-                        print(f"  - Answer ID: {ans.id}, Text: {ans.text}{correct_status}")
-
-        elif choice == 2: # Add Question
-            categories = Category.get_all()
-            if not categories:
-                print(f"{Fore.RED}No categories available. Please add a category first.{Style.RESET_ALL}")
-                continue
+        with profiled("Manage Questions", options, choice):
+            if choice == 1: # View Questions
+                category_filter = input(f"{Fore.GREEN}Category ID to list (blank for all): {Style.RESET_ALL}").strip()
+                if category_filter and not category_filter.isdigit():
+                    print(f"{Fore.RED}Invalid ID. Please enter a number.{Style.RESET_ALL}")
+                    continue
+                category_id = int(category_filter) if category_filter else None
+                fetch_page = lambda after_id, limit: Question.iter_page(after_id, limit, category_id)
+                if not page_through("All Questions", fetch_page, show_question):
+                    print(f"{Fore.YELLOW}No questions found.{Style.RESET_ALL}")
+
+            elif choice == 2: # Add Question
+                categories = Category.get_all()
+                if not categories:
+                    print(f"{Fore.RED}No categories available. Please add a category first.{Style.RESET_ALL}")
+                    continue
 
-            print(f"\n{Fore.CYAN}--- Select Category for New Question ---{Style.RESET_ALL}")
-            for cat in categories:
-                print(f"ID: {cat.id}, Name: {cat.name}")
+                print(f"\n{Fore.CYAN}--- Select Category for New Question ---{Style.RESET_ALL}")
+                for cat in categories:
+                    print(f"ID: {cat.id}, Name: {cat.name}")
             
-            try:
-                cat_id = int(input(f"{Fore.GREEN}Enter category ID for the new question: {Style.RESET_ALL}"))
-                category = Category.find_by_id(cat_id)
-                if not category:
-                    print(f"{Fore.RED}Category not found.{Style.RESET_ALL}")
-                    continue
+                try:
+                    cat_id = int(input(f"{Fore.GREEN}Enter category ID for the new question: {Style.RESET_ALL}"))
+                    category = Category.find_by_id(cat_id)
+                    if not category:
+                        print(f"{Fore.RED}Category not found.{Style.RESET_ALL}")
+                        continue
                 
-                question_text = input(f"{Fore.GREEN}Enter new question text: {Style.RESET_ALL}")
-                if question_text:
-                    new_q = Question.create(question_text, category.id)
-                    if new_q:
-                        print(f"{Fore.GREEN}Question added successfully!{Style.RESET_ALL}")
+                    question_text = input(f"{Fore.GREEN}Enter new question text: {Style.RESET_ALL}")
+                    if question_text:
+                        new_q = Question.create(question_text, category.id)
+                        if new_q:
+                            print(f"{Fore.GREEN}Question added successfully!{Style.RESET_ALL}")
+                        else:
+                            print(f"{Fore.RED}Failed to add question.{Style.RESET_ALL}")
                     else:
-                        print(f"{Fore.RED}Failed to add question.{Style.RESET_ALL}")
-                else:
-                    print(f"{Fore.RED}Question text cannot be empty.{Style.RESET_ALL}")
-            except ValueError:
-                print(f"{Fore.RED}Invalid ID. Please enter a number.{Style.RESET_ALL}")
-
-        elif choice == 3: # Update Question
-            questions = Question.get_all()
-            if not questions:
-                print(f"{Fore.RED}No questions to update.{Style.RESET_ALL}")
-                continue
-            print(f"\n{Fore.CYAN}--- Select Question to Update ---{Style.RESET_ALL}")
-            for q in questions:
-                print(f"ID: {q.id}, Question: {q.text}")
-            
-            try:
-                q_id = int(input(f"{Fore.GREEN}Enter ID of question to update: {Style.RESET_ALL}"))
-                question = Question.find_by_id(q_id)
-                if question:
-                    new_text = input(f"{Fore.GREEN}Enter new text for '{question.text}' (leave blank to keep current): {Style.RESET_ALL}")
-                    new_cat_id_str = input(f"{Fore.GREEN}Enter new category ID (leave blank to keep current): {Style.RESET_ALL}")
-                    new_cat_id = int(new_cat_id_str) if new_cat_id_str else None
+                        print(f"{Fore.RED}Question text cannot be empty.{Style.RESET_ALL}")
+                except ValueError:
+                    print(f"{Fore.RED}Invalid ID. Please enter a number.{Style.RESET_ALL}")
 
-                    if question.update(new_text=new_text if new_text else None, new_category_id=new_cat_id):
-                        print(f"{Fore.GREEN}Question updated successfully!{Style.RESET_ALL}")
-                    else:
-                        print(f"{Fore.RED}Failed to update question.{Style.RESET_ALL}")
-                else:
-                    print(f"{Fore.RED}Question not found.{Style.RESET_ALL}")
-            except ValueError:
-                print(f"{Fore.RED}Invalid ID or category ID. Please enter numbers.{Style.RESET_ALL}")
-
-        elif choice == 4: # Delete Question
-            questions = Question.get_all()
-            if not questions:
-                print(f"{Fore.RED}No questions to delete.{Style.RESET_ALL}")
-                continue
-            print(f"\n{Fore.CYAN}--- Select Question to Delete ---{Style.RESET_ALL}")
-            for q in questions:
-                    print(f"ID: {q.id}, Question: {q.text}")
-            
-            try:
-                q_id = int(input(f"{Fore.GREEN}Enter ID of question to delete: {Style.RESET_ALL}"))
-                question = Question.find_by_id(q_id)
+            elif choice == 3: # Update Question
+                print(f"\n{Fore.CYAN}--- Select Question to Update ---{Style.RESET_ALL}")
+                try:
+                    question = select_question("update")
+                    if question:
+                        new_text = input(f"{Fore.GREEN}Enter new text for '{question.text}' (leave blank to keep current): {Style.RESET_ALL}")
+                        new_cat_id_str = input(f"{Fore.GREEN}Enter new category ID (leave blank to keep current): {Style.RESET_ALL}")
+                        new_cat_id = int(new_cat_id_str) if new_cat_id_str else None
+
+                        if question.update(new_text=new_text if new_text else None, new_category_id=new_cat_id):
+                            print(f"{Fore.GREEN}Question updated successfully!{Style.RESET_ALL}")
+                        else:
+                            print(f"{Fore.RED}Failed to update question.{Style.RESET_ALL}")
+                except ValueError:
+                    print(f"{Fore.RED}Invalid category ID. Please enter a number.{Style.RESET_ALL}")
+
+            elif choice == 4: # Delete Question
+                print(f"\n{Fore.CYAN}--- Select Question to Delete ---{Style.RESET_ALL}")
+                question = select_question("delete")
                 if question:
                     confirm = input(f"{Fore.YELLOW}Deleting '{question.text}' will also delete ALL its answers. Continue? (y/N): {Style.RESET_ALL}").lower()
                     if confirm == 'y':
@@ -268,35 +516,62 @@ def manage_questions_menu():
                             print(f"{Fore.RED}Failed to delete question.{Style.RESET_ALL}")
                     else:
                         print(f"{Fore.BLUE}Deletion cancelled.{Style.RESET_ALL}")
+
+            elif choice == 5: # Manage Answers for Question
+                manage_answers_menu()
+
+            elif choice == 6: # Delete Questions in Bulk
+                question_ids = parse_ids(input(f"{Fore.GREEN}Question IDs, e.g. 4,7,10-20 (blank for any): {Style.RESET_ALL}"))
+                category_filter = input(f"{Fore.GREEN}Only in category ID (blank for any): {Style.RESET_ALL}").strip()
+                text_filter = input(f"{Fore.GREEN}Only questions containing (blank for any): {Style.RESET_ALL}").strip()
+                if question_ids is False or (category_filter and not category_filter.isdigit()):
+                    print(f"{Fore.RED}Invalid ID. Please enter numbers (at most {MAX_BULK_IDS} IDs).{Style.RESET_ALL}")
+                    continue
+                if question_ids is None and not category_filter and not text_filter:
+                    print(f"{Fore.RED}Give at least one filter.{Style.RESET_ALL}")
+                    continue
+                confirm = input(f"{Fore.RED}Delete every matching question and its answers? (y/N): {Style.RESET_ALL}").lower()
+                if confirm == 'y':
+                    deleted = Question.bulk_delete(question_ids, int(category_filter) if category_filter else None, text_filter or None)
+                    if deleted is not None:
+                        print(f"{Fore.GREEN}Deleted {deleted} questions.{Style.RESET_ALL}")
                 else:
-                    print(f"{Fore.RED}Question not found.{Style.RESET_ALL}")
-            except ValueError:
-                print(f"{Fore.RED}Invalid ID. Please enter a number.{Style.RESET_ALL}")
+                    print(f"{Fore.BLUE}Deletion cancelled.{Style.RESET_ALL}")
 
-        elif choice == 5: # Manage Answers for Question
-            manage_answers_menu()
+            elif choice == 7: # Mark Answers Correct/Incorrect in Bulk
+                answer_ids = parse_ids(input(f"{Fore.GREEN}Answer IDs, e.g. 4,7,10-20: {Style.RESET_ALL}"))
+                if not answer_ids:
+                    print(f"{Fore.RED}Invalid or empty ID list (at most {MAX_BULK_IDS} IDs).{Style.RESET_ALL}")
+                    continue
+                is_correct = input(f"{Fore.GREEN}Mark them correct? (y = correct, n = incorrect): {Style.RESET_ALL}").lower() == 'y'
+                changed = Answer.bulk_set_correct(answer_ids, is_correct)
+                if changed is not None:
+                    print(f"{Fore.GREEN}Marked {changed} answers {'correct' if is_correct else 'incorrect'}.{Style.RESET_ALL}")
+
+            elif choice == 8: # Find and Replace in Question Text
+                old = input(f"{Fore.GREEN}Text to find: {Style.RESET_ALL}")
+                new = input(f"{Fore.GREEN}Replace with: {Style.RESET_ALL}")
+                category_filter = input(f"{Fore.GREEN}Only in category ID (blank for all): {Style.RESET_ALL}").strip()
+                if category_filter and not category_filter.isdigit():
+                    print(f"{Fore.RED}Invalid ID. Please enter a number.{Style.RESET_ALL}")
+                    continue
+                changed = Question.bulk_replace_text(old, new, int(category_filter) if category_filter else None)
+                if changed is not None:
+                    print(f"{Fore.GREEN}Updated {changed} questions.{Style.RESET_ALL}")
 
-        elif choice == 0:
-            break
-        else:
-            print(f"{Fore.RED}Invalid choice.{Style.RESET_ALL}")
+            elif choice == 0:
+                break
+            else:
+                print(f"{Fore.RED}Invalid choice.{Style.RESET_ALL}")
 
 def manage_answers_menu():
     """Handles answer management for a selected question."""
-    questions = Question.get_all()
-    if not questions:
-        print(f"{Fore.RED}No questions to manage answers for.{Style.RESET_ALL}")
-        return
-    
+    from lib.models.answer import Answer
+
     print(f"\n{Fore.CYAN}--- Select Question to Manage Answers For ---{Style.RESET_ALL}")
-    for q in questions:
-        print(f"ID: {q.id}, Question: {q.text}")
-    
     try:
-        q_id = int(input(f"{Fore.GREEN}Enter ID of question: {Style.RESET_ALL}"))
-        question = Question.find_by_id(q_id)
+        question = select_question("manage answers for")
         if not question:
-            print(f"{Fore.RED}Question not found.{Style.RESET_ALL}")
             return
         
         while True:
@@ -313,67 +588,68 @@ def manage_answers_menu():
             print_menu(f"Answers for Q ID {question.id}", answer_options)
             ans_choice = get_user_choice(len(answer_options))
 
-            if ans_choice == 1: # Add Answer
-                ans_text = input(f"{Fore.GREEN}Enter new answer text: {Style.RESET_ALL}")
-                is_correct_str = input(f"{Fore.GREEN}Is this the correct answer? (y/N): {Style.RESET_ALL}").lower()
-                is_correct = (is_correct_str == 'y')
+            with profiled("Manage Answers", answer_options, ans_choice):
+                if ans_choice == 1: # Add Answer
+                    ans_text = input(f"{Fore.GREEN}Enter new answer text: {Style.RESET_ALL}")
+                    is_correct_str = input(f"{Fore.GREEN}Is this the correct answer? (y/N): {Style.RESET_ALL}").lower()
+                    is_correct = (is_correct_str == 'y')
                 
-                if ans_text:
-                    new_ans = question.add_answer(ans_text, is_correct)
-                    if new_ans:
-                        print(f"{Fore.GREEN}Answer added successfully!{Style.RESET_ALL}")
+                    if ans_text:
+                        new_ans = question.add_answer(ans_text, is_correct)
+                        if new_ans:
+                            print(f"{Fore.GREEN}Answer added successfully!{Style.RESET_ALL}")
+                        else:
+                            print(f"{Fore.RED}Failed to add answer.{Style.RESET_ALL}")
                     else:
-                        print(f"{Fore.RED}Failed to add answer.{Style.RESET_ALL}")
-                else:
-                    print(f"{Fore.RED}Answer text cannot be empty.{Style.RESET_ALL}")
-
-            elif ans_choice == 2: # Update Answer
-                if not current_answers:
-                    print(f"{Fore.RED}No answers to update.{Style.RESET_ALL}")
-                    continue
-                try:
-                    ans_id = int(input(f"{Fore.GREEN}Enter ID of answer to update: {Style.RESET_ALL}"))
-                    answer_to_update = Answer.find_by_id(ans_id)
-                    if answer_to_update and answer_to_update.question_id == question.id:
-                        new_ans_text = input(f"{Fore.GREEN}Enter new text for '{answer_to_update.text}' (leave blank to keep current): {Style.RESET_ALL}")
-                        new_is_correct_str = input(f"{Fore.GREEN}Is it now correct? (y/N, leave blank to keep current): {Style.RESET_ALL}").lower()
+                        print(f"{Fore.RED}Answer text cannot be empty.{Style.RESET_ALL}")
+
+                elif ans_choice == 2: # Update Answer
+                    if not current_answers:
+                        print(f"{Fore.RED}No answers to update.{Style.RESET_ALL}")
+                        continue
+                    try:
+                        ans_id = int(input(f"{Fore.GREEN}Enter ID of answer to update: {Style.RESET_ALL}"))
+                        answer_to_update = Answer.find_by_id(ans_id)
+                        if answer_to_update and answer_to_update.question_id == question.id:
+                            new_ans_text = input(f"{Fore.GREEN}Enter new text for '{answer_to_update.text}' (leave blank to keep current): {Style.RESET_ALL}")
+                            new_is_correct_str = input(f"{Fore.GREEN}Is it now correct? (y/N, leave blank to keep current): {Style.RESET_ALL}").lower()
                         
-                        new_is_correct = None
-                        if new_is_correct_str == 'y':
-                            new_is_correct = True
-                        elif new_is_correct_str == 'n':
-                            new_is_correct = False
-
-                        if answer_to_update.update(new_text=new_ans_text if new_ans_text else None, new_is_correct=new_is_correct):
-                            print(f"{Fore.GREEN}Answer updated successfully!{Style.RESET_ALL}")
+                            new_is_correct = None
+                            if new_is_correct_str == 'y':
+                                new_is_correct = True
+                            elif new_is_correct_str == 'n':
+                                new_is_correct = False
+
+                            if answer_to_update.update(new_text=new_ans_text if new_ans_text else None, new_is_correct=new_is_correct):
+                                print(f"{Fore.GREEN}Answer updated successfully!{Style.RESET_ALL}")
+                            else:
+                                print(f"{Fore.RED}Failed to update answer.{Style.RESET_ALL}")
                         else:
-                            print(f"{Fore.RED}Failed to update answer.{Style.RESET_ALL}")
-                    else:
-                        print(f"{Fore.RED}Answer not found for this question.{Style.RESET_ALL}")
-                except ValueError:
-                    print(f"{Fore.RED}Invalid ID. Please enter a number.{Style.RESET_ALL}")
-
-            elif ans_choice == 3: # Delete Answer
-                if not current_answers:
-                    print(f"{Fore.RED}No answers to delete.{Style.RESET_ALL}")
-                    continue
-                try:
-                    ans_id = int(input(f"{Fore.GREEN}Enter ID of answer to delete: {Style.RESET_ALL}"))
-                    answer_to_delete = Answer.find_by_id(ans_id)
-                    if answer_to_delete and answer_to_delete.question_id == question.id:
-                        if answer_to_delete.delete():
-                            print(f"{Fore.GREEN}Answer deleted successfully!{Style.RESET_ALL}")
+                            print(f"{Fore.RED}Answer not found for this question.{Style.RESET_ALL}")
+                    except ValueError:
+                        print(f"{Fore.RED}Invalid ID. Please enter a number.{Style.RESET_ALL}")
+
+                elif ans_choice == 3: # Delete Answer
+                    if not current_answers:
+                        print(f"{Fore.RED}No answers to delete.{Style.RESET_ALL}")
+                        continue
+                    try:
+                        ans_id = int(input(f"{Fore.GREEN}Enter ID of answer to delete: {Style.RESET_ALL}"))
+                        answer_to_delete = Answer.find_by_id(ans_id)
+                        if answer_to_delete and answer_to_delete.question_id == question.id:
+                            if answer_to_delete.delete():
+                                print(f"{Fore.GREEN}Answer deleted successfully!{Style.RESET_ALL}")
+                            else:
+                                print(f"{Fore.RED}Failed to delete answer.{Style.RESET_ALL}")
                         else:
-                            print(f"{Fore.RED}Failed to delete answer.{Style.RESET_ALL}")
-                    else:
-                        print(f"{Fore.RED}Answer not found for this question.{Style.RESET_ALL}")
-                except ValueError:
-                    print(f"{Fore.RED}Invalid ID. Please enter a number.{Style.RESET_ALL}")
+                            print(f"{Fore.RED}Answer not found for this question.{Style.RESET_ALL}")
+                    except ValueError:
+                        print(f"{Fore.RED}Invalid ID. Please enter a number.{Style.RESET_ALL}")
 
-            elif ans_choice == 0:
-                break
-            else:
-                print(f"{Fore.RED}Invalid choice.{Style.RESET_ALL}")
+                elif ans_choice == 0:
+                    break
+                else:
+                    print(f"{Fore.RED}Invalid choice.{Style.RESET_ALL}")
 
     except ValueError:
         print(f"{Fore.RED}Invalid question ID. Please enter a number.{Style.RESET_ALL}")
@@ -381,18 +657,28 @@ def manage_answers_menu():
 def main_menu():
     """Displays the main application menu."""
     while True:
-        options = ["Take Quiz", "Manage Categories", "Manage Questions"]
+        # New entries go at the end: operators script this menu by number
+        options = ["Take Quiz", "Manage Categories", "Manage Questions", "Leaderboards", "Study (Spaced Repetition)"]
         print_menu("Main Menu", options)
         choice = get_user_choice(len(options))
 
-        if choice == 1:
-            take_quiz_menu()
-        elif choice == 2:
-            manage_categories_menu()
-        elif choice == 3:
-            manage_questions_menu()
-        elif choice == 0:
-            print(f"{Fore.CYAN}Exiting Quiz App. Goodbye!{Style.RESET_ALL}")
-            break
-        else:
-            print(f"{Fore.RED}Invalid choice. Please try again.{Style.RESET_ALL}")
\ No newline at end of file
+        with profiled("Main Menu", options, choice):
+            if choice == 1:
+                take_quiz_menu()
+            elif choice == 2:
+                manage_categories_menu()
+            elif choice == 3:
+                manage_questions_menu()
+            elif choice == 4:
+                leaderboard_menu()
+            elif choice == 5:
+                study_menu()
+            elif choice == 0:
+                print(f"{Fore.CYAN}Exiting Quiz App. Goodbye!{Style.RESET_ALL}")
+                break
+            else:
+                print(f"{Fore.RED}Invalid choice. Please try again.{Style.RESET_ALL}")
+
+        if "lib.database" in sys.modules: # Nothing to release if the action never touched the database
+            from lib.database import close_db_session
+            close_db_session() # Each action shares one session; release it before the next menu
\ No newline at end of file
@@ -0,0 +1,282 @@
+import os
+import random
+import threading
+import time
+import zlib
+from collections import namedtuple
+from itertools import chain
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from lib.cache import PerEngine
+from lib.database import get_db_session
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.models.content_revision import ContentRevision, CONTENT_TABLES
+from lib.search import tokenize
+
+DUPLICATE_THRESHOLD = float(os.environ.get("QUIZ_DUPLICATE_THRESHOLD", 0.8)) # Jaccard similarity of word shingles
+DUPLICATE_POLICY = os.environ.get("QUIZ_DUPLICATE_POLICY", "flag") # "flag", "reject" or "off"
+# Bulk imports are checked only on request: the check makes them about 2.5x slower
+IMPORT_DUPLICATE_POLICY = os.environ.get("QUIZ_IMPORT_DUPLICATE_POLICY", "off")
+
+# 10 bands of 4 MinHash values: texts sharing ~55% of their shingles become candidates, and a
+# pair at the 0.8 default threshold is found with probability 1 - (1 - 0.8**4)**10 > 99.4%.
+NUM_PERM, BAND_ROWS = 40, 4
+BANDS = NUM_PERM // BAND_ROWS
+# Questions from one template ("Which river is described by clue 12?") share most of their
+# shingles, so some band values are common to all of them. A bucket stops taking questions
+# once this full: a lookup then compares against at most BANDS * MAX_BUCKET_SIZE questions,
+# and a near-duplicate is still found through its other, rarer band values.
+MAX_BUCKET_SIZE = 16
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1) # Fixed, so results are the same in every process
+_PERMUTATIONS = tuple((_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(NUM_PERM))
+
+DuplicateMatch = namedtuple("DuplicateMatch", ["question_id", "question_text", "similarity"])
+DuplicateGroup = namedtuple("DuplicateGroup", ["category_id", "category_name", "question_id", "question_text", "duplicates"])
+
+
+class DedupeReport(namedtuple("DedupeReport", ["categories", "questions", "groups", "seconds"])):
+    """Result of a whole-bank scan; each group is an original question and its near-duplicates."""
+
+    @property
+    def duplicates(self):
+        return sum(len(group.duplicates) for group in self.groups)
+
+
+def shingles(text):
+    """Returns the hashed word pairs of normalized text (case, accents and punctuation ignored).
+
+    Pairs rather than single words, so word order counts. Questions built from one
+    template still share most of their pairs, so they often become candidates of each
+    other; CategoryIndex bounds that work with MAX_BUCKET_SIZE.
+    """
+    words = tokenize(text)
+    pairs = map(" ".join, zip(words, words[1:])) if len(words) > 1 else words
+    return {zlib.crc32(pair.encode("utf-8")) for pair in pairs}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared) # Without building the union
+
+
+_HASHES_CACHE_SIZE = 1 << 16 # Shingles whose permuted hashes are kept; common word pairs repeat a lot
+_hashes = {}
+
+
+def _permuted(shingle):
+    values = _hashes.get(shingle)
+    if values is None:
+        if len(_hashes) >= _HASHES_CACHE_SIZE:
+            _hashes.clear()
+        values = _hashes[shingle] = tuple([(a * shingle + b) % _PRIME for a, b in _PERMUTATIONS])
+    return values
+
+
+def minhash(shingle_set):
+    """MinHash signature: the smallest value of each hash permutation over the shingles."""
+    return list(map(min, zip(*map(_permuted, shingle_set))))
+
+
+class CategoryIndex:
+    """Locality-sensitive hash index of one category's question texts.
+
+    Each question's signature is cut into bands and filed under one bucket per band, so a
+    lookup only compares against questions sharing a bucket (near-duplicate candidates)
+    rather than the whole category; buckets hold at most MAX_BUCKET_SIZE questions, so a
+    lookup costs the same in a category of a thousand questions or a million. Candidates
+    are confirmed by exact Jaccard similarity against their stored shingle sets.
+    A question that duplicates an indexed one is not indexed itself: its original already
+    stands for it, which keeps buckets small when a bank holds many copies of a question.
+    """
+
+    def __init__(self, threshold=DUPLICATE_THRESHOLD, revision=None):
+        self.threshold = threshold
+        self.revision = revision # Content revision the index reflects (for cached indexes)
+        self.buckets = [{} for _ in range(BANDS)] # band value -> question ID, or list of IDs
+        self.texts = {}
+        self.shingles = {} # question ID -> shingle set, so candidates are not re-tokenized
+
+    def __len__(self):
+        return len(self.texts)
+
+    @staticmethod
+    def _bands(signature):
+        return [hash(tuple(signature[i:i + BAND_ROWS])) for i in range(0, NUM_PERM, BAND_ROWS)]
+
+    def _match(self, shingle_set, bands):
+        candidates = set()
+        for bucket, key in zip(self.buckets, bands):
+            found = bucket.get(key)
+            if isinstance(found, list):
+                candidates.update(found)
+            elif found is not None:
+                candidates.add(found)
+        best = None
+        for question_id in sorted(candidates):
+            similarity = jaccard(shingle_set, self.shingles[question_id])
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                best = DuplicateMatch(question_id, self.texts[question_id], similarity)
+                if similarity == 1.0:
+                    break
+        return best
+
+    def _add(self, question_id, text, shingle_set, bands):
+        self.texts[question_id] = text
+        self.shingles[question_id] = shingle_set
+        for bucket, key in zip(self.buckets, bands):
+            found = bucket.get(key)
+            if found is None:
+                bucket[key] = question_id
+            elif isinstance(found, list):
+                if len(found) < MAX_BUCKET_SIZE:
+                    found.append(question_id)
+            else:
+                bucket[key] = [found, question_id]
+
+    def match(self, text):
+        """Returns a DuplicateMatch for the most similar indexed question, or None."""
+        shingle_set = shingles(text)
+        if not shingle_set:
+            return None
+        return self._match(shingle_set, self._bands(minhash(shingle_set)))
+
+    def check(self, question_id, text):
+        """Matches text against the index, then indexes it if it is not a duplicate; returns the match."""
+        shingle_set = shingles(text)
+        if not shingle_set:
+            return None
+        bands = self._bands(minhash(shingle_set))
+        found = self._match(shingle_set, bands)
+        if found is None:
+            self._add(question_id, text, shingle_set, bands)
+        return found
+
+
+def _load_index(connection, category_id, threshold=DUPLICATE_THRESHOLD, revision=None):
+    index = CategoryIndex(threshold, revision)
+    rows = connection.execute(select(Question.id, Question.text)
+                              .where(Question.category_id == category_id).order_by(Question.id))
+    for question_id, text in rows:
+        index.check(question_id, text)
+    return index
+
+
+# Per database: indexes of categories that recently had questions created, kept in step with ORM writes
+_indexes = PerEngine(lambda engine: {})
+_indexes_lock = threading.Lock()
+
+
+def find_duplicate(text, category_id):
+    """Returns a DuplicateMatch for an existing question in the category that text nearly repeats, or None.
+
+    The category's index is built on first use and reused while the content revision
+    shows no changes other than this process's own writes.
+    """
+    session = get_db_session()
+    revision = ContentRevision.current()
+    indexes = _indexes.get()
+    with _indexes_lock:
+        index = indexes.get(category_id)
+        if index is None or index.revision != revision:
+            index = indexes[category_id] = _load_index(session.connection(), category_id, revision=revision)
+        return index.match(text)
+
+
+class DuplicateFinder:
+    """Checks a stream of new questions (e.g. an import) against each category's existing ones.
+
+    Category indexes are loaded on first use and grow with the accepted questions, so
+    duplicates within the stream are caught too. Memory grows with the distinct questions
+    of the categories touched.
+    """
+
+    def __init__(self, session, threshold=DUPLICATE_THRESHOLD):
+        self.session = session
+        self.threshold = threshold
+        self.indexes = {}
+        self._next_key = 0
+
+    def check(self, category_id, text):
+        """Returns the DuplicateMatch for text, or None (and remembers text as a new question)."""
+        index = self.indexes.get(category_id)
+        if index is None:
+            index = self.indexes[category_id] = _load_index(self.session.connection(), category_id, self.threshold)
+        self._next_key -= 1 # Not inserted yet; negative keys never clash with question IDs
+        return index.check(self._next_key, text)
+
+
+def scan_duplicates(threshold=DUPLICATE_THRESHOLD, category_id=None):
+    """Finds near-duplicate questions within each category of the whole bank (or one category).
+
+    Questions are streamed in (category, ID) order and only one category's index is held
+    at a time. Each question is looked up before being indexed, so the work per question
+    depends on its bucket neighbours rather than on the size of the bank.
+    """
+    started = time.perf_counter()
+    session = get_db_session()
+    query = (select(Question.category_id, Category.name, Question.id, Question.text)
+             .join(Category, Category.id == Question.category_id)
+             .order_by(Question.category_id, Question.id)
+             .execution_options(yield_per=10000))
+    if category_id is not None:
+        query = query.where(Question.category_id == category_id)
+
+    groups, categories, questions = [], 0, 0
+    current, index, found = None, None, {}
+
+    def finish():
+        for original_id, duplicates in found.items():
+            groups.append(DuplicateGroup(current[0], current[1], original_id, index.texts[original_id], tuple(duplicates)))
+
+    for question_category, category_name, question_id, text in session.execute(query):
+        if current is None or current[0] != question_category:
+            if current is not None:
+                finish()
+            current, index, found = (question_category, category_name), CategoryIndex(threshold), {}
+            categories += 1
+        questions += 1
+        match = index.check(question_id, text)
+        if match is not None:
+            found.setdefault(match.question_id, []).append(DuplicateMatch(question_id, text, match.similarity))
+    if current is not None:
+        finish()
+    return DedupeReport(categories, questions, groups, time.perf_counter() - started)
+
+
+@event.listens_for(Session, "after_flush")
+def _update_duplicate_indexes(session, flush_context):
+    """Adds newly created questions to cached indexes; drops indexes of categories otherwise changed."""
+    indexes = _indexes.peek(session.get_bind())
+    if not indexes:
+        return
+    created, changed = [], set()
+    content_changed = False
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if getattr(obj, "__tablename__", None) not in CONTENT_TABLES:
+            continue
+        content_changed = True
+        if isinstance(obj, Question):
+            if obj in session.new:
+                created.append(obj)
+            else:
+                changed.add(obj.category_id)
+                changed.update(inspect(obj).attrs.category_id.history.deleted or ()) # Moved from another category
+        elif isinstance(obj, Category) and obj in session.deleted:
+            changed.add(obj.id)
+    if not content_changed:
+        return
+    with _indexes_lock:
+        for category_id in list(indexes):
+            index = indexes[category_id]
+            if category_id in changed or index.revision is None:
+                del indexes[category_id] # Rebuilt on next use
+            else:
+                index.revision += 1 # Matches the bump made by this flush
+        for question in created:
+            index = indexes.get(question.category_id)
+            if index is not None:
+                index.check(question.id, question.text)
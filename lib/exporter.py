@@ -0,0 +1,144 @@
+import csv
+import gzip
+import json
+import sys
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from sqlalchemy import select
+from lib.database import get_db_session, close_db_session
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.models.answer import Answer
+
+DEFAULT_CHUNK_SIZE = 1000 # Questions per query; each chunk is its own short read transaction
+FORMATS = ("jsonl", "csv", "columnar")
+
+ExportResult = namedtuple("ExportResult", ["questions", "answers", "seconds"])
+
+
+def iter_question_chunks(category_id=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields lists of question records in ID order, using keyset pagination.
+
+    Records use the import schema: {"category", "question", "answers": [{"text", "is_correct"}]}.
+    The session is released after every chunk, so no read transaction is held open between
+    chunks and writers (and WAL checkpoints) are never blocked for the whole export.
+    """
+    last_id = 0
+    while True:
+        session = get_db_session()
+        try:
+            query = (
+                select(Question.id, Category.name, Question.text)
+                .join(Category, Question.category_id == Category.id)
+                .where(Question.id > last_id)
+                .order_by(Question.id)
+                .limit(chunk_size)
+            )
+            if category_id is not None:
+                query = query.where(Question.category_id == category_id)
+            questions = session.execute(query).all()
+            if not questions:
+                return
+
+            question_ids = [q_id for q_id, _, _ in questions]
+            answers = {}
+            answer_rows = session.execute(
+                select(Answer.question_id, Answer.text, Answer.is_correct)
+                .where(Answer.question_id.in_(question_ids))
+                .order_by(Answer.question_id, Answer.id)
+            )
+            for question_id, text, is_correct in answer_rows:
+                answers.setdefault(question_id, []).append({"text": text, "is_correct": bool(is_correct)})
+        finally:
+            close_db_session()
+
+        yield [
+            {"category": category, "question": text, "answers": answers.get(q_id, [])}
+            for q_id, category, text in questions
+        ]
+        last_id = question_ids[-1]
+
+
+def write_jsonl(chunk, out):
+    for record in chunk:
+        out.write(json.dumps(record, ensure_ascii=False))
+        out.write("\n")
+
+
+def write_csv(chunk, out):
+    writer = csv.writer(out)
+    for record in chunk:
+        if not record["answers"]:
+            writer.writerow([record["category"], record["question"], "", ""])
+        for answer in record["answers"]:
+            writer.writerow([record["category"], record["question"], answer["text"], int(answer["is_correct"])])
+
+
+def write_columnar(chunk, out):
+    """Writes one row group per chunk as a JSON line of column arrays (one row per answer).
+
+    Columns: category (dictionary-encoded), question_index, question, answer, is_correct.
+    """
+    categories = []
+    category_index = {}
+    columns = {"category": [], "question_index": [], "question": [], "answer": [], "is_correct": []}
+    for q_index, record in enumerate(chunk):
+        c_index = category_index.get(record["category"])
+        if c_index is None:
+            c_index = category_index[record["category"]] = len(categories)
+            categories.append(record["category"])
+        columns["question"].append(record["question"])
+        for answer in record["answers"]:
+            columns["category"].append(c_index)
+            columns["question_index"].append(q_index)
+            columns["answer"].append(answer["text"])
+            columns["is_correct"].append(int(answer["is_correct"]))
+    out.write(json.dumps({"rows": len(columns["answer"]), "dictionary": {"category": categories}, "columns": columns},
+                         ensure_ascii=False))
+    out.write("\n")
+
+
+WRITERS = {"jsonl": write_jsonl, "csv": write_csv, "columnar": write_columnar}
+
+
+@contextmanager
+def open_output(path=None, compress=False):
+    """Opens the export destination as text; '-' or None means stdout."""
+    if path in (None, "-"):
+        if compress:
+            with gzip.open(sys.stdout.buffer, "wt", encoding="utf-8", newline="") as out:
+                yield out
+        else:
+            yield sys.stdout
+        return
+    if compress or path.endswith(".gz"):
+        with gzip.open(path, "wt", encoding="utf-8", newline="") as out:
+            yield out
+    else:
+        with open(path, "w", encoding="utf-8", newline="") as out:
+            yield out
+
+
+def export_questions(out, fmt="jsonl", category_id=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Streams the question bank to a text stream in fixed-size chunks."""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+    write = WRITERS[fmt]
+    start = time.perf_counter()
+    total_questions = total_answers = 0
+
+    if fmt == "csv":
+        csv.writer(out).writerow(["category", "question", "answer", "is_correct"])
+    for chunk in iter_question_chunks(category_id=category_id, chunk_size=chunk_size):
+        write(chunk, out)
+        total_questions += len(chunk)
+        total_answers += sum(len(record["answers"]) for record in chunk)
+
+    return ExportResult(total_questions, total_answers, time.perf_counter() - start)
+
+
+def export_file(path=None, fmt="jsonl", category_id=None, compress=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Exports the question bank to path (stdout when None or '-'), optionally gzipped."""
+    with open_output(path, compress=compress) as out:
+        return export_questions(out, fmt=fmt, category_id=category_id, chunk_size=chunk_size)
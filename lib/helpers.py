@@ -1,16 +1,22 @@
 import os
-from lib.database import Base, engine, get_db_session
+import sys
+from lib.database import get_engine, get_db_session
 from lib.models.category import Category
 from lib.models.question import Question
 from lib.models.answer import Answer
+from lib.models.attempt import Attempt
+from lib.models.response import Response
+from lib.cache import invalidate_cache
 
 def create_database_and_tables():
-    """Creates the database file and all tables defined by SQLAlchemy Base."""
+    """Creates the database file and brings the schema up to date via migrations."""
+    from lib.migrations import upgrade # Import locally to avoid circular dependency
+
     # Ensure the instance directory exists
     instance_dir = os.path.join(os.getcwd(), 'instance')
     os.makedirs(instance_dir, exist_ok=True)
 
-    Base.metadata.create_all(engine)
+    upgrade(get_engine(), log=lambda message: None)
     print("Database tables created/ensured.")
 
 def seed_database():
@@ -18,6 +24,8 @@ def seed_database():
     session = get_db_session()
     try:
         # Clear existing data for idempotency in seeding
+        session.query(Response).delete()
+        session.query(Attempt).delete()
         session.query(Answer).delete()
         session.query(Question).delete()
         session.query(Category).delete()
@@ -82,6 +90,7 @@ def seed_database():
         ])
 
         session.commit()
+        invalidate_cache()
         print("Database seeded with sample data.")
     except Exception as e:
         session.rollback()
@@ -94,4 +103,164 @@ def initialize_database():
     print("Initializing database...")
     create_database_and_tables()
     seed_database()
-    print("Database initialization complete.")
\ No newline at end of file
+    print("Database initialization complete.")
+
+def import_question_bank(path, fmt=None):
+    """Imports a CSV/JSON/JSONL question bank and reports throughput."""
+    from lib.importer import import_file # Import locally; only needed for this command
+
+    def report(result):
+        rate = (result.questions + result.answers) / result.seconds if result.seconds else 0
+        print(f"  {result.questions} questions, {result.answers} answers ({rate:,.0f} rows/s)", end="\r")
+
+    create_database_and_tables()
+    print(f"Importing {path}...")
+    try:
+        result = import_file(path, fmt=fmt, progress=report)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"\nError importing {path}: {e}")
+        return None
+
+    rows = result.questions + result.answers
+    rate = rows / result.seconds if result.seconds else 0
+    print(f"\nImported {result.questions} questions and {result.answers} answers "
+          f"({result.categories} new categories) in {result.seconds:.2f}s - {rate:,.0f} rows/s.")
+    if result.duplicates:
+        print(f"{result.duplicates} near-duplicate questions found; run 'python main.py dedupe' for details.")
+    return result
+
+
+def report_duplicates(threshold=None, category=None):
+    """Prints groups of near-duplicate questions across the bank (or one category, by name or ID)."""
+    from lib.dedupe import DUPLICATE_THRESHOLD, scan_duplicates # Import locally; only needed for this command
+
+    category_id = None
+    if category is not None:
+        found = Category.find_by_id(int(category)) if str(category).isdigit() else Category.find_by_name(category)
+        if not found:
+            print(f"Category '{category}' not found.")
+            return None
+        category_id = found.id
+
+    report = scan_duplicates(threshold or DUPLICATE_THRESHOLD, category_id)
+    current = None
+    for group in report.groups:
+        if group.category_id != current:
+            current = group.category_id
+            print(f"\nCategory '{group.category_name}' (ID {group.category_id}):")
+        print(f"  ID {group.question_id}: {group.question_text}")
+        for duplicate in group.duplicates:
+            print(f"    ~ ID {duplicate.question_id} ({duplicate.similarity:.0%}): {duplicate.question_text}")
+    print(f"\nChecked {report.questions} questions in {report.categories} categories in {report.seconds:.2f}s: "
+          f"{report.duplicates} near-duplicates of {len(report.groups)} questions.")
+    return report
+
+
+def create_tenant(tenant_id):
+    """Opens a tenant's database, creating it and its schema if needed."""
+    from lib.migrations import current_version # Import locally to avoid circular dependency
+    from lib.tenants import get_router, use_tenant
+
+    with use_tenant(tenant_id) as engine:
+        print(f"Tenant '{tenant_id}' is ready at {get_router().url_for(tenant_id)} "
+              f"(schema version {current_version(engine)}).")
+
+
+def report_tenants(tenants=None):
+    """Prints the schema version and content counts of every tenant (or the given ones)."""
+    from lib.tenants import tenant_stats # Import locally; only needed for this command
+
+    rows = tenant_stats(tenants)
+    if not rows:
+        print("No tenants found.")
+        return rows
+    print(f"{'tenant':<24} {'schema':>6} {'categories':>10} {'questions':>10} {'answers':>10} {'attempts':>10}")
+    for row in rows:
+        print(f"{row.tenant:<24} {row.schema_version:>6} {row.categories:>10} {row.questions:>10} "
+              f"{row.answers:>10} {row.attempts:>10}")
+    return rows
+
+
+def migrate_all_tenants(tenants=None):
+    """Applies pending migrations to every tenant (or the given ones)."""
+    from lib.tenants import migrate_tenants # Import locally; only needed for this command
+
+    results = migrate_tenants(tenants)
+    for tenant_id, applied in results.items():
+        if isinstance(applied, Exception):
+            continue # Already reported
+        print(f"{tenant_id}: {'applied ' + ', '.join(map(str, applied)) if applied else 'up to date'}")
+    return results
+
+
+def copy_tenant_content(source, target, category=None):
+    """Copies questions and answers (all, or one category by name) from one tenant to another."""
+    from lib.tenants import copy_content # Import locally; only needed for this command
+
+    copied = copy_content(source, target, category)
+    if copied is not None:
+        print(f"Copied {copied} questions from '{source}' to '{target}'.")
+    return copied
+
+
+def report_load_test(**options):
+    """Runs a load test (see lib.loadtest.run_load_test for the options) and prints per-operation latencies."""
+    from lib.loadtest import run_load_test # Import locally; only needed for this command
+
+    report = run_load_test(**options)
+    print(f"\n{report.users} virtual users ({report.mode}) finished {report.quizzes} quizzes in {report.seconds:.2f}s "
+          f"({report.quizzes / report.seconds if report.seconds else 0:.1f} quizzes/s)")
+    print(f"{'operation':<16} {'count':>8} {'errors':>7} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for op in report.operations:
+        print(f"{op.name:<16} {op.count:>8} {op.errors:>7} {op.throughput:>9.1f} {op.p50:>9.2f} {op.p95:>9.2f} "
+              f"{op.p99:>9.2f} {op.max:>9.2f}")
+    return report
+
+
+def export_question_bank(path=None, fmt="jsonl", category=None, compress=False):
+    """Exports the question bank, optionally limited to one category (name or ID)."""
+    from lib.exporter import export_file # Import locally; only needed for this command
+
+    category_id = None
+    if category is not None:
+        found = Category.find_by_id(int(category)) if str(category).isdigit() else Category.find_by_name(category)
+        if not found:
+            print(f"Category '{category}' not found.", file=sys.stderr)
+            return None
+        category_id = found.id
+
+    result = export_file(path, fmt=fmt, category_id=category_id, compress=compress)
+    rows = result.questions + result.answers
+    rate = rows / result.seconds if result.seconds else 0
+    # Progress goes to stderr so exporting to stdout stays clean
+    print(f"Exported {result.questions} questions and {result.answers} answers "
+          f"in {result.seconds:.2f}s - {rate:,.0f} rows/s.", file=sys.stderr)
+    return result
+
+
+def build_snapshot(path=None):
+    """Writes the binary quiz snapshot used by the quiz menu and multi-worker server."""
+    from lib.snapshot_file import write_snapshot # Import locally; only needed for this command
+
+    result = write_snapshot(path)
+    print(f"Wrote {result.path}: {result.categories} categories, {result.questions} questions, "
+          f"{result.answers} answers ({result.size:,} bytes, content revision {result.revision}) "
+          f"in {result.seconds:.2f}s.")
+    return result
+
+
+def migrate_database(target=None):
+    """Applies pending schema migrations without touching existing data."""
+    from lib.migrations import current_version, head_version, upgrade
+
+    instance_dir = os.path.join(os.getcwd(), 'instance')
+    os.makedirs(instance_dir, exist_ok=True)
+
+    engine = get_engine()
+    print(f"Current schema version: {current_version(engine)} (latest: {head_version()})")
+    applied = upgrade(engine, target=target)
+    if applied:
+        print(f"Migrated to schema version {applied[-1]}.")
+    else:
+        print("Database schema is up to date.")
+    return applied
\ No newline at end of file
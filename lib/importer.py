@@ -0,0 +1,225 @@
+import csv
+import gzip
+import json
+import os
+import time
+from collections import namedtuple
+from itertools import groupby
+from sqlalchemy import insert, select
+from lib.database import get_db_session
+from lib.cache import invalidate_cache
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.models.answer import Answer
+from lib.models.content_revision import ContentRevision
+from lib.search import sync_search_index
+
+DEFAULT_BATCH_SIZE = 2000 # Questions per INSERT batch / transaction
+JSON_READ_CHUNK = 1 << 16
+
+# duplicates counts near-duplicate questions found (imported anyway when flagged, skipped when rejected)
+ImportResult = namedtuple("ImportResult", ["categories", "questions", "answers", "seconds", "duplicates"], defaults=[0])
+
+# Every reader yields one record per question:
+# {"category": str, "question": str, "answers": [{"text": str, "is_correct": bool}, ...]}
+
+
+def parse_bool(value):
+    """Parses CSV/JSON truthy values such as 1, "true", "yes" or "y"."""
+    if isinstance(value, bool):
+        return value
+    if value is None:
+        return False
+    return str(value).strip().lower() in ("1", "true", "t", "yes", "y")
+
+
+def _normalize_record(record):
+    answers = record.get("answers") or []
+    return {
+        "category": str(record["category"]).strip(),
+        "question": str(record["question"]).strip(),
+        "answers": [{"text": str(a["text"]), "is_correct": parse_bool(a.get("is_correct"))} for a in answers],
+    }
+
+
+def iter_csv_records(fp):
+    """Reads CSV with columns category,question,answer,is_correct (one row per answer).
+
+    Consecutive rows with the same category and question form one question.
+    """
+    rows = csv.DictReader(fp)
+    for (category, question), group in groupby(rows, key=lambda row: (row["category"], row["question"])):
+        answers = [{"text": row["answer"], "is_correct": row.get("is_correct")} for row in group if row.get("answer")]
+        yield _normalize_record({"category": category, "question": question, "answers": answers})
+
+
+def iter_jsonl_records(fp):
+    """Reads one JSON question object per line."""
+    for line in fp:
+        line = line.strip()
+        if line:
+            yield _normalize_record(json.loads(line))
+
+
+def iter_json_records(fp):
+    """Reads a top-level JSON array of question objects without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and separators, refilling the buffer as needed
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            chunk = fp.read(JSON_READ_CHUNK)
+            buffer, pos = buffer[pos:] + chunk, 0
+            eof = not chunk
+
+        if pos >= len(buffer):
+            if started:
+                raise ValueError("Unexpected end of JSON input: missing ']'")
+            return
+        if not started:
+            if buffer[pos] != "[":
+                raise ValueError("JSON import file must contain a top-level array")
+            started = True
+            pos += 1
+            continue
+        if buffer[pos] == "]":
+            return
+
+        try:
+            obj, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = fp.read(JSON_READ_CHUNK) # Object spans the chunk boundary
+            buffer, pos = buffer[pos:] + chunk, 0
+            eof = not chunk
+            continue
+        yield _normalize_record(obj)
+        pos = end
+
+
+READERS = {
+    "csv": iter_csv_records,
+    "json": iter_json_records,
+    "jsonl": iter_jsonl_records,
+}
+
+
+def detect_format(path):
+    """Infers the import format from the file extension (ignoring a trailing .gz)."""
+    if path.lower().endswith(".gz"):
+        path = path[:-3]
+    ext = os.path.splitext(path)[1].lstrip(".").lower()
+    if ext == "ndjson":
+        ext = "jsonl"
+    if ext not in READERS:
+        raise ValueError(f"Unsupported import format '{ext}'. Use one of: {', '.join(sorted(READERS))}")
+    return ext
+
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _CategoryResolver:
+    """Maps category names to IDs, creating missing categories once."""
+
+    def __init__(self, session):
+        self.session = session
+        self.ids = dict(session.execute(select(Category.name, Category.id)).all())
+        self.created = 0
+
+    def resolve(self, name):
+        category_id = self.ids.get(name)
+        if category_id is None:
+            category_id = self.session.execute(
+                insert(Category.__table__).values(name=name).returning(Category.__table__.c.id)
+            ).scalar_one()
+            self.ids[name] = category_id
+            self.created += 1
+        return category_id
+
+
+def import_records(records, batch_size=DEFAULT_BATCH_SIZE, progress=None, duplicates=None):
+    """Inserts question records in batches: one executemany for questions and one for answers.
+
+    Each batch is committed on its own, so memory stays bounded by batch_size (plus the
+    near-duplicate indexes of the categories touched, unless duplicates is "off").
+    duplicates ("flag", "reject" or "off"; default QUIZ_IMPORT_DUPLICATE_POLICY, "off") says whether
+    questions nearly repeating one already in their category (or earlier in the input)
+    are just counted or skipped.
+    progress, if given, is called with the running ImportResult after every batch.
+    """
+    from lib.dedupe import IMPORT_DUPLICATE_POLICY, DuplicateFinder # Import locally; dedupe imports the search module
+
+    session = get_db_session()
+    start = time.perf_counter()
+    question_table = Question.__table__
+    answer_table = Answer.__table__
+    insert_questions = insert(question_table).returning(question_table.c.id, sort_by_parameter_order=True)
+    total_questions = total_answers = total_duplicates = 0
+    duplicates = duplicates or IMPORT_DUPLICATE_POLICY
+
+    try:
+        categories = _CategoryResolver(session)
+        finder = DuplicateFinder(session) if duplicates != "off" else None
+        for batch in _batched(records, batch_size):
+            question_rows = [
+                {"text": record["question"], "category_id": categories.resolve(record["category"])}
+                for record in batch
+            ]
+            if finder:
+                flagged = [finder.check(row["category_id"], row["text"]) is not None for row in question_rows]
+                total_duplicates += sum(flagged)
+                if duplicates == "reject" and any(flagged):
+                    question_rows = [row for row, skip in zip(question_rows, flagged) if not skip]
+                    batch = [record for record, skip in zip(batch, flagged) if not skip]
+            question_ids = session.execute(insert_questions, question_rows).scalars().all() if question_rows else []
+
+            answer_rows = [
+                {"text": answer["text"], "is_correct": answer["is_correct"], "question_id": question_id}
+                for question_id, record in zip(question_ids, batch)
+                for answer in record["answers"]
+            ]
+            if answer_rows:
+                session.execute(insert(answer_table), answer_rows)
+            ContentRevision.bump(session.connection()) # Bulk inserts bypass the ORM flush hook
+            sync_search_index(session) # Index the batch with one set-based statement
+            session.commit()
+
+            total_questions += len(question_rows)
+            total_answers += len(answer_rows)
+            if progress:
+                progress(ImportResult(categories.created, total_questions, total_answers,
+                                      time.perf_counter() - start, total_duplicates))
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        invalidate_cache()
+
+    return ImportResult(categories.created, total_questions, total_answers, time.perf_counter() - start, total_duplicates)
+
+
+def import_file(path, fmt=None, batch_size=DEFAULT_BATCH_SIZE, progress=None, duplicates=None):
+    """Streams questions and answers from a CSV, JSON or JSONL file (optionally gzipped) into the database."""
+    fmt = fmt or detect_format(path)
+    reader = READERS[fmt]
+    opener = gzip.open if path.lower().endswith(".gz") else open
+    with opener(path, "rt", newline="" if fmt == "csv" else None, encoding="utf-8") as fp:
+        return import_records(reader(fp), batch_size=batch_size, progress=progress, duplicates=duplicates)
@@ -0,0 +1,95 @@
+import os
+from collections import namedtuple
+from sqlalchemy import func, select
+from lib.database import get_db_session
+from lib.models.base import upsert
+from lib.models.category_score import CategoryScore
+from lib.models.player_score import PlayerScore
+from lib.models.question import Question
+from lib.models.question_stat import QuestionStat
+
+LEADERBOARD_SIZE = int(os.environ.get("QUIZ_LEADERBOARD_SIZE", 10)) # Default number of entries shown
+ANONYMOUS_PLAYER = "Anonymous" # Attempts without a name stay off the leaderboards
+
+# Scores and answer counts are pre-aggregated as results arrive: a finished attempt adds to
+# its player's global and category totals, and each batch of recorded responses adds to
+# per-question counters. Leaderboard reads walk an index kept in ranking order, so they
+# touch K rows however many attempts and responses are stored.
+
+
+class LeaderboardEntry(namedtuple("LeaderboardEntry", ["rank", "player", "points", "attempts", "answered"])):
+    """One leaderboard row; points are correct answers over the player's completed attempts."""
+
+    @property
+    def accuracy(self):
+        return self.points / self.answered if self.answered else 0.0
+
+
+class QuestionCorrectness(namedtuple("QuestionCorrectness", ["question_id", "question_text", "answered", "correct"])):
+    """Recorded responses to one question and how many were correct."""
+
+    @property
+    def rate(self):
+        return self.correct / self.answered if self.answered else None
+
+
+def record_attempt(connection, player, category_id, score, answered):
+    """Adds a completed attempt to its player's global and category totals (in the caller's transaction)."""
+    if not player or player == ANONYMOUS_PLAYER:
+        return
+    totals = {"player": player, "attempts": 1, "points": score, "answered": answered}
+    counters = ("attempts", "points", "answered")
+    upsert(connection, PlayerScore.__table__, ["player"], [totals], increment=counters)
+    upsert(connection, CategoryScore.__table__, ["category_id", "player"],
+           [{"category_id": category_id, **totals}], increment=counters)
+
+
+def record_responses(connection, responses):
+    """Adds a batch of response rows (question_id, is_correct) to the per-question counters."""
+    counts = {}
+    for response in responses:
+        answered, correct = counts.get(response["question_id"], (0, 0))
+        counts[response["question_id"]] = (answered + 1, correct + bool(response["is_correct"]))
+    rows = [{"question_id": q, "answered": answered, "correct": correct}
+            for q, (answered, correct) in sorted(counts.items())]
+    upsert(connection, QuestionStat.__table__, ["question_id"], rows, increment=("answered", "correct"))
+
+
+def top_players(limit=LEADERBOARD_SIZE, category_id=None):
+    """Returns the leaderboard (global, or for one category) as LeaderboardEntry rows, best first.
+
+    Ranked by points, then by fewer questions needed for them, then by name.
+    """
+    model = PlayerScore if category_id is None else CategoryScore
+    query = select(model.player, model.points, model.attempts, model.answered)
+    if category_id is not None:
+        query = query.where(CategoryScore.category_id == category_id)
+    query = query.order_by(model.points.desc(), model.answered, model.player).limit(limit)
+    rows = get_db_session().execute(query).all()
+    return [LeaderboardEntry(rank, *row) for rank, row in enumerate(rows, start=1)]
+
+
+def question_correctness(question_ids):
+    """Returns {question_id: QuestionCorrectness} for the given questions (one keyed query)."""
+    rows = get_db_session().execute(
+        select(Question.id, Question.text, func.coalesce(QuestionStat.answered, 0), func.coalesce(QuestionStat.correct, 0))
+        .outerjoin(QuestionStat, QuestionStat.question_id == Question.id)
+        .where(Question.id.in_(list(question_ids)))
+    ).all()
+    return {row[0]: QuestionCorrectness(*row) for row in rows}
+
+
+def hardest_questions(category_id, limit=LEADERBOARD_SIZE, min_answers=1):
+    """Returns the category's answered questions with the lowest correctness rates.
+
+    Reads the category's counter rows, never the responses themselves.
+    """
+    rate = QuestionStat.correct * 1.0 / QuestionStat.answered
+    rows = get_db_session().execute(
+        select(Question.id, Question.text, QuestionStat.answered, QuestionStat.correct)
+        .join(QuestionStat, QuestionStat.question_id == Question.id)
+        .where(Question.category_id == category_id, QuestionStat.answered >= max(1, min_answers))
+        .order_by(rate, QuestionStat.answered.desc(), Question.id)
+        .limit(limit)
+    ).all()
+    return [QuestionCorrectness(*row) for row in rows]
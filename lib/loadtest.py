@@ -0,0 +1,287 @@
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from lib.database import close_db_session
+from lib.models.attempt import Attempt
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.quiz import QuizEngine
+from lib.recorder import get_recorder
+
+MODES = ("threads", "asyncio", "processes")
+THINK_DISTRIBUTIONS = ("lognormal", "exponential", "fixed", "none")
+THINK_SIGMA = 0.6 # Spread of lognormal think times: most answers take 0.4-2.5x the median, a few much longer
+
+OperationReport = namedtuple("OperationReport", ["name", "count", "errors", "throughput", "p50", "p95", "p99", "max"])
+LoadTestReport = namedtuple("LoadTestReport", ["mode", "users", "quizzes", "seconds", "operations"])
+Settings = namedtuple("Settings", ["questions", "quizzes", "think", "distribution", "accuracy", "ramp_up", "seed"])
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def think_time(rng, median, distribution="lognormal"):
+    """Seconds a virtual user spends reading a question before answering."""
+    if distribution == "none" or median <= 0:
+        return 0.0
+    if distribution == "fixed":
+        return median
+    if distribution == "exponential":
+        return rng.expovariate(1 / median)
+    return rng.lognormvariate(math.log(median), THINK_SIGMA) # Median of the lognormal is exp(mu)
+
+
+class LatencyLog:
+    """Durations of every operation by name, shared by the virtual users of one process."""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.quizzes = 0
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, error=False):
+        with self._lock:
+            if error:
+                self.errors[name] = self.errors.get(name, 0) + 1
+            else:
+                self.samples.setdefault(name, []).append(seconds)
+
+    @contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.add(name, time.perf_counter() - start, error=True)
+            raise
+        self.add(name, time.perf_counter() - start)
+
+    def merge(self, other):
+        with self._lock:
+            for name, samples in other.samples.items():
+                self.samples.setdefault(name, []).extend(samples)
+            for name, count in other.errors.items():
+                self.errors[name] = self.errors.get(name, 0) + count
+            self.quizzes += other.quizzes
+
+    def report(self, seconds):
+        """Returns an OperationReport (latencies in ms) per operation, in first-seen order."""
+        reports = []
+        for name in dict.fromkeys([*self.samples, *self.errors]):
+            ordered = sorted(self.samples.get(name, ()))
+            reports.append(OperationReport(
+                name, len(ordered), self.errors.get(name, 0), len(ordered) / seconds if seconds else 0.0,
+                *(percentile(ordered, f) * 1000 for f in (0.5, 0.95, 0.99)), (ordered[-1] if ordered else 0.0) * 1000,
+            ))
+        return reports
+
+
+def _pick_answer(rng, answers, accuracy):
+    correct = [a for a in answers if a.is_correct]
+    if correct and rng.random() < accuracy:
+        return rng.choice(correct)
+    return rng.choice(answers)
+
+
+# --- Virtual users on the model layer (threads and processes modes) ---
+
+def _model_user(user_id, settings, log):
+    """One quiz taker doing what "Take Quiz" does, through the same models and recorder."""
+    rng = random.Random(f"{settings.seed}-{user_id}")
+    time.sleep(rng.uniform(0, settings.ramp_up))
+    recorder = get_recorder()
+    try:
+        for _ in range(settings.quizzes):
+            with log.timed("list_categories"):
+                categories = Category.get_all()
+            if not categories:
+                return
+            category = rng.choice(categories)
+            with log.timed("load_quiz"):
+                quiz = Question.sample(category.id, settings.questions, seed=rng.random())
+            if not quiz or not quiz.questions:
+                continue
+            quiz_session = QuizEngine(quiz).start(seed=rng.getrandbits(62))
+            with log.timed("start_attempt"):
+                attempt = Attempt.start(quiz.category_id, quiz_session.total, f"Load Tester {user_id}")
+            while (question := quiz_session.next_question()) is not None:
+                time.sleep(think_time(rng, settings.think, settings.distribution))
+                if not question.answers:
+                    quiz_session.skip()
+                    continue
+                with log.timed("answer"):
+                    result = quiz_session.answer(_pick_answer(rng, question.answers, settings.accuracy).id)
+                    if attempt:
+                        recorder.record(attempt.id, result.question_id, result.answer_id, result.is_correct)
+            with log.timed("finish"):
+                recorder.flush()
+                if attempt:
+                    attempt.finish(quiz_session.score, completed=True)
+            with log._lock:
+                log.quizzes += 1
+            close_db_session()
+    except Exception:
+        pass # Counted as an error of the operation that failed; the user gives up
+    finally:
+        close_db_session()
+
+
+def _run_threads(users, settings, first_user=0):
+    log = LatencyLog()
+    with ThreadPoolExecutor(max_workers=max(1, users), thread_name_prefix="virtual-user") as pool:
+        for user_id in range(first_user, first_user + users):
+            pool.submit(_model_user, user_id, settings, log)
+    return log
+
+
+def _process_worker(args):
+    users, settings, first_user = args
+    log = _run_threads(users, settings, first_user)
+    return log.samples, log.errors, log.quizzes
+
+
+def _run_processes(users, settings, processes):
+    processes = max(1, min(processes, users))
+    shares = [users // processes + (1 if i < users % processes else 0) for i in range(processes)]
+    starts = [sum(shares[:i]) for i in range(processes)]
+    method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    log = LatencyLog()
+    with multiprocessing.get_context(method).Pool(processes) as pool:
+        for samples, errors, quizzes in pool.map(_process_worker, [(n, settings, s) for n, s in zip(shares, starts)]):
+            other = LatencyLog()
+            other.samples, other.errors, other.quizzes = samples, errors, quizzes
+            log.merge(other)
+    return log
+
+
+# --- Virtual users over the HTTP API (asyncio mode) ---
+
+class HTTPClient:
+    """A minimal keep-alive JSON client for the quiz API, one connection per virtual user."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, payload=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        await self.writer.drain()
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection")
+        length = 0
+        while (line := await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        data = json.loads(await self.reader.readexactly(length)) if length else None
+        status = int(status_line.split()[1])
+        if status >= 400:
+            raise RuntimeError(f"{method} {path}: {status} {data}")
+        return data
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def _timed(log, name, awaitable):
+    with log.timed(name):
+        return await awaitable
+
+
+async def _http_user(user_id, host, port, settings, log):
+    rng = random.Random(f"{settings.seed}-{user_id}")
+    await asyncio.sleep(rng.uniform(0, settings.ramp_up))
+    client = HTTPClient(host, port)
+    try:
+        for _ in range(settings.quizzes):
+            categories = [c for c in await _timed(log, "list_categories", client.request("GET", "/categories"))
+                          if c["questions"]]
+            if not categories:
+                return
+            started = await _timed(log, "start_quiz", client.request("POST", "/quizzes", {
+                "category_id": rng.choice(categories)["id"], "questions": settings.questions,
+                "player": f"Load Tester {user_id}"}))
+            session_id, question = started["session_id"], started["question"]
+            while question:
+                await asyncio.sleep(think_time(rng, settings.think, settings.distribution))
+                if not question["answers"]:
+                    break
+                answer_id = rng.choice(question["answers"])["id"] # The API does not reveal correct answers
+                result = await _timed(log, "answer", client.request(
+                    "POST", f"/quizzes/{session_id}/answers", {"answer_id": answer_id}))
+                question = result["question"]
+            await _timed(log, "results", client.request("GET", f"/quizzes/{session_id}/results"))
+            log.quizzes += 1
+    except Exception:
+        pass # Counted against the failing operation
+    finally:
+        await client.close()
+
+
+async def _run_asyncio(users, settings, url=None):
+    """Runs virtual users as tasks against url, or against a server started in this process."""
+    log = LatencyLog()
+    server = service = None
+    if url:
+        host, _, port = url.split("://", 1)[-1].rstrip("/").partition(":")
+        port = int(port or 80)
+    else:
+        from lib.server import QuizService, start_server # Import locally; only needed for this mode
+        service = QuizService()
+        server = await start_server(service, "127.0.0.1", 0)
+        host, port = server.sockets[0].getsockname()[:2]
+    try:
+        await asyncio.gather(*(_http_user(user_id, host, port, settings, log) for user_id in range(users)))
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+            service.close()
+            get_recorder().flush()
+    return log
+
+
+def run_load_test(users=50, mode="threads", questions=10, quizzes=1, think=0.5, distribution="lognormal",
+                  accuracy=0.7, ramp_up=1.0, processes=None, url=None, seed=0):
+    """Simulates `users` concurrent quiz takers and returns a LoadTestReport.
+
+    threads: one thread per user calling the models directly, as the CLI does.
+    processes: the users split across processes, each running them on threads.
+    asyncio: one task per user driving the HTTP API (a server at url, or one started here).
+    Each user takes `quizzes` quizzes of `questions` questions, pausing a think time
+    (median `think` seconds) before every answer. Attempts and responses are written to
+    the configured database.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}'. Use one of: {', '.join(MODES)}")
+    if distribution not in THINK_DISTRIBUTIONS:
+        raise ValueError(f"Unknown think time distribution '{distribution}'. Use one of: {', '.join(THINK_DISTRIBUTIONS)}")
+    settings = Settings(questions, quizzes, think, distribution, accuracy, ramp_up, seed)
+    start = time.perf_counter()
+    if mode == "threads":
+        log = _run_threads(users, settings)
+    elif mode == "processes":
+        log = _run_processes(users, settings, processes or os.cpu_count() or 1)
+    else:
+        log = asyncio.run(_run_asyncio(users, settings, url))
+    seconds = time.perf_counter() - start
+    return LoadTestReport(mode, users, log.quizzes, seconds, log.report(seconds))
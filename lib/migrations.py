@@ -0,0 +1,269 @@
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from lib.database import Base, get_engine
+# Every model must be imported so the baseline migration sees all tables
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.models.answer import Answer
+from lib.models.attempt import Attempt
+from lib.models.response import Response
+from lib.models.content_revision import ContentRevision
+from lib.models.question_stat import QuestionStat
+from lib.models.player_score import PlayerScore
+from lib.models.category_score import CategoryScore
+from lib.models.review_card import ReviewCard
+from lib.search import create_search_index
+
+BACKFILL_BATCH_SIZE = int(os.environ.get("QUIZ_BACKFILL_BATCH_SIZE", 5000)) # Rows per backfill transaction
+
+# Kept out of Base.metadata so create_all/drop_all never touch the version history
+migration_metadata = MetaData()
+schema_version = Table(
+    "schema_version", migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# upgrade(conn) runs inside the migration's transaction together with the version stamp.
+# backfill(engine), if given, runs afterwards in its own short batches; it must be idempotent
+# so an interrupted migration can simply be re-run.
+Migration = namedtuple("Migration", ["version", "description", "upgrade", "backfill"])
+MIGRATIONS = []
+
+
+def migration(version, description, backfill=None):
+    """Registers an upgrade function as schema version `version`."""
+    def register(upgrade):
+        MIGRATIONS.append(Migration(version, description, upgrade, backfill))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return upgrade
+    return register
+
+
+# --- Helpers for writing migrations ---
+
+def has_column(conn, table_name, column_name):
+    return any(col["name"] == column_name for col in inspect(conn).get_columns(table_name))
+
+
+def add_column_if_missing(conn, table_name, column_ddl):
+    """Adds a nullable (or defaulted) column; a metadata-only change, no table rebuild."""
+    column_name = column_ddl.split()[0]
+    if not has_column(conn, table_name, column_name):
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_ddl}"))
+
+
+def create_indexes_if_missing(conn, table):
+    for index in table.indexes:
+        index.create(conn, checkfirst=True)
+
+
+def backfill_in_batches(engine, table_name, set_clause, where_clause, params=None, batch_size=BACKFILL_BATCH_SIZE):
+    """Runs `UPDATE table SET ... WHERE ...` over primary key ranges of batch_size rows.
+
+    Each range commits separately, so locks are held only briefly and readers keep working.
+    Returns the number of rows updated.
+    """
+    statement = f"UPDATE {table_name} SET {set_clause} WHERE id >= :_low AND id < :_high AND ({where_clause})"
+    return run_in_key_ranges(engine, table_name, "id", statement, params, batch_size)
+
+
+def run_in_key_ranges(engine, table_name, key, statement, params=None, batch_size=BACKFILL_BATCH_SIZE):
+    """Runs statement once per range of batch_size values of table_name's integer column key,
+    each in its own transaction; the statement bounds itself with `:_low <= key < :_high`.
+
+    For backfills (UPDATE, or INSERT ... SELECT grouped by key) that must not hold the
+    write lock for the whole table. Returns the number of rows affected.
+    """
+    with engine.connect() as conn:
+        low, high = conn.execute(text(f"SELECT MIN({key}), MAX({key}) FROM {table_name}")).one()
+    if low is None:
+        return 0
+
+    affected = 0
+    statement = text(statement)
+    for start in range(low, high + 1, batch_size):
+        with engine.begin() as conn:
+            affected += conn.execute(statement, {**(params or {}), "_low": start, "_high": start + batch_size}).rowcount
+    return affected
+
+
+# --- Migrations ---
+
+@migration(1, "Baseline schema: categories, questions, answers, attempts, responses")
+def _baseline(conn):
+    Base.metadata.create_all(conn) # Only creates missing tables
+
+
+@migration(2, "Indexes for category/question/attempt lookups")
+def _lookup_indexes(conn):
+    for table in (Question.__table__, Answer.__table__, Attempt.__table__, Response.__table__):
+        create_indexes_if_missing(conn, table)
+
+
+# Child tables that must follow their parent on delete: (child, fk column, parent, action)
+_CASCADES = (
+    ("questions", "category_id", "categories", "DELETE"),
+    ("attempts", "category_id", "categories", "DELETE"),
+    ("answers", "question_id", "questions", "DELETE"),
+    ("responses", "question_id", "questions", "DELETE"),
+    ("responses", "answer_id", "answers", "SET NULL"),
+    ("responses", "attempt_id", "attempts", "DELETE"),
+)
+
+
+@migration(3, "ON DELETE behaviour for tables created without it")
+def _cascade_triggers(conn):
+    # SQLite cannot alter a foreign key without rebuilding the table. For tables created
+    # before ON DELETE CASCADE was declared, BEFORE DELETE triggers give the same result.
+    if conn.dialect.name != "sqlite":
+        return
+    inspector = inspect(conn)
+    for child, column, parent, action in _CASCADES:
+        foreign_keys = inspector.get_foreign_keys(child)
+        declared = next((fk for fk in foreign_keys if fk["constrained_columns"] == [column]), None)
+        if declared and declared.get("options", {}).get("ondelete"):
+            continue
+        body = (f"DELETE FROM {child} WHERE {column} = OLD.id" if action == "DELETE"
+                else f"UPDATE {child} SET {column} = NULL WHERE {column} = OLD.id")
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{parent}_delete_{child}_{column} "
+            f"BEFORE DELETE ON {parent} FOR EACH ROW BEGIN {body}; END"
+        ))
+
+
+@migration(4, "Content revision counter for snapshot reloads")
+def _content_revision(conn):
+    ContentRevision.__table__.create(conn, checkfirst=True)
+
+
+@migration(5, "Full-text search index over questions and answers")
+def _search_index(conn):
+    create_search_index(conn) # No-op where FTS5 is unavailable; searches then use an in-memory index
+
+
+@migration(6, "Per-question difficulty statistics for adaptive quizzes")
+def _question_stats(conn):
+    QuestionStat.__table__.create(conn, checkfirst=True)
+
+
+def _backfill_aggregates(engine, batch_size=BACKFILL_BATCH_SIZE):
+    """Recomputes leaderboard totals and per-question counters from stored attempts and responses.
+
+    Batched by the aggregate's key (category IDs, then players, then question IDs): each
+    batch replaces its keys' totals with ones computed from the source rows in the same
+    transaction, so a rerun after a failure never counts an attempt twice and live
+    increments made between batches are kept.
+    """
+    replace = "DO UPDATE SET attempts = excluded.attempts, points = excluded.points, answered = excluded.answered"
+    rows = run_in_key_ranges(engine, "attempts", "category_id", (
+        "INSERT INTO category_scores (category_id, player, attempts, points, answered) "
+        "SELECT category_id, player, COUNT(*), SUM(score), SUM(total_questions) FROM attempts "
+        "WHERE category_id >= :_low AND category_id < :_high AND status = 'completed' AND player != 'Anonymous' "
+        f"GROUP BY category_id, player ON CONFLICT (category_id, player) {replace}"
+    ), batch_size=batch_size)
+
+    # Players are not integers: read the next batch of names (a read takes no write lock), then write it
+    after = ""
+    while True:
+        with engine.connect() as conn:
+            players = conn.execute(text("SELECT DISTINCT player FROM category_scores WHERE player > :after "
+                                        "ORDER BY player LIMIT :limit"), {"after": after, "limit": batch_size}).scalars().all()
+        if not players:
+            break
+        with engine.begin() as conn:
+            rows += conn.execute(text(
+                "INSERT INTO player_scores (player, attempts, points, answered) "
+                "SELECT player, SUM(attempts), SUM(points), SUM(answered) FROM category_scores "
+                f"WHERE player >= :first AND player <= :last GROUP BY player ON CONFLICT (player) {replace}"
+            ), {"first": players[0], "last": players[-1]}).rowcount
+        after = players[-1]
+
+    # Questions answered only outside adaptive quizzes get a row with default IRT parameters
+    rows += run_in_key_ranges(engine, "responses", "question_id", (
+        "INSERT INTO question_stats (question_id, answered, correct) "
+        "SELECT question_id, COUNT(*), SUM(CASE WHEN is_correct THEN 1 ELSE 0 END) FROM responses "
+        "WHERE question_id >= :_low AND question_id < :_high GROUP BY question_id "
+        "ON CONFLICT (question_id) DO UPDATE SET answered = excluded.answered, correct = excluded.correct"
+    ), batch_size=batch_size)
+    return rows
+
+
+@migration(7, "Leaderboard totals and per-question answer counters", backfill=_backfill_aggregates)
+def _aggregates(conn):
+    PlayerScore.__table__.create(conn, checkfirst=True)
+    CategoryScore.__table__.create(conn, checkfirst=True)
+    create_indexes_if_missing(conn, PlayerScore.__table__)
+    create_indexes_if_missing(conn, CategoryScore.__table__)
+    add_column_if_missing(conn, "question_stats", "answered INTEGER NOT NULL DEFAULT 0")
+    add_column_if_missing(conn, "question_stats", "correct INTEGER NOT NULL DEFAULT 0")
+
+
+@migration(8, "Spaced-repetition review cards")
+def _review_cards(conn):
+    ReviewCard.__table__.create(conn, checkfirst=True)
+    create_indexes_if_missing(conn, ReviewCard.__table__)
+
+
+# --- Runner ---
+
+def current_version(engine=None):
+    """Returns the highest applied schema version (0 for an unversioned database)."""
+    engine = engine or get_engine()
+    with engine.begin() as conn:
+        migration_metadata.create_all(conn)
+        return conn.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc())).scalar() or 0
+
+
+def pending_migrations(engine=None):
+    version = current_version(engine)
+    return [m for m in MIGRATIONS if m.version > version]
+
+
+@contextmanager
+def migration_transaction(engine):
+    """Yields a connection whose statements, including DDL, commit or roll back together."""
+    with engine.connect() as conn:
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("BEGIN IMMEDIATE") # pysqlite does not open a transaction for DDL itself
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def _stamp(conn, m):
+    conn.execute(schema_version.insert().values(
+        version=m.version, description=m.description, applied_at=datetime.now(timezone.utc)
+    ))
+
+
+def upgrade(engine=None, target=None, log=print):
+    """Applies pending migrations in order, each in its own transaction. Returns versions applied."""
+    engine = engine or get_engine()
+    applied = []
+    for m in pending_migrations(engine):
+        if target is not None and m.version > target:
+            break
+        log(f"Applying migration {m.version}: {m.description}")
+        with migration_transaction(engine) as conn:
+            m.upgrade(conn)
+            if not m.backfill:
+                _stamp(conn, m)
+        if m.backfill:
+            rows = m.backfill(engine)
+            log(f"  Backfilled {rows} rows")
+            with migration_transaction(engine) as conn:
+                _stamp(conn, m)
+        applied.append(m.version)
+    return applied
+
+
+def head_version():
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
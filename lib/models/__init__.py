@@ -0,0 +1,4 @@
+# Importing any model registers all of them, so relationships declared by name ("Answer",
+# "Response") resolve when SQLAlchemy configures the mappers on first use, whichever
+# model a lazily imported CLI action happens to load first.
+from lib.models import category, question, answer, attempt, response, question_stat, player_score, category_score, review_card
@@ -1,15 +1,21 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Index, update
 from sqlalchemy.orm import relationship
 from lib.database import Base, get_db_session
+from lib.cache import model_cache, invalidate_cache
 from lib.models.question import Question # Import Question
+from lib.models.base import PAGE_SIZE, keyset_page, iter_keyset, id_chunks, run_bulk_write
 
 class Answer(Base):
     __tablename__ = 'answers'
+    __table_args__ = (
+        # Serves both question.answers loads (leftmost column) and correct-answer lookups
+        Index('ix_answers_question_id_is_correct', 'question_id', 'is_correct'),
+    )
 
     id = Column(Integer, primary_key=True)
     text = Column(String, nullable=False)
     is_correct = Column(Boolean, nullable=False, default=False)
-    question_id = Column(Integer, ForeignKey('questions.id'), nullable=False)
+    question_id = Column(Integer, ForeignKey('questions.id', ondelete='CASCADE'), nullable=False)
 
     # Define relationship to Question
     question = relationship("Question", back_populates="answers")
@@ -29,29 +35,46 @@ class Answer(Base):
             new_answer = cls(text=text, is_correct=is_correct, question_id=question_id)
             session.add(new_answer)
             session.commit()
+            invalidate_cache()
             return new_answer
         except Exception as e:
             session.rollback()
             print(f"Error creating answer: {e}")
             return None
-        finally:
-            session.close()
 
     @classmethod
     def get_all(cls):
         """Returns all answers."""
-        session = get_db_session()
-        answers = session.query(cls).all()
-        session.close()
-        return answers
+        return model_cache.fetch((cls.__tablename__, "all"), lambda session: session.query(cls).all())
+
+    @classmethod
+    def iter_page(cls, after_id=0, limit=PAGE_SIZE, question_id=None):
+        """Returns up to `limit` answers (optionally of one question) with IDs above after_id, in ID order."""
+        query = get_db_session().query(cls)
+        if question_id is not None:
+            query = query.filter(cls.question_id == question_id)
+        return keyset_page(query, cls.id, after_id, limit)
+
+    @classmethod
+    def iter_all(cls, question_id=None, batch_size=PAGE_SIZE):
+        """Yields every answer (optionally of one question), loading one page at a time."""
+        return iter_keyset(lambda after_id, limit: cls.iter_page(after_id, limit, question_id), batch_size)
 
     @classmethod
     def find_by_id(cls, answer_id):
         """Finds an answer by its ID."""
-        session = get_db_session()
-        answer = session.query(cls).filter_by(id=answer_id).first()
-        session.close()
-        return answer
+        return model_cache.fetch(
+            (cls.__tablename__, answer_id), lambda session: session.query(cls).filter_by(id=answer_id).first()
+        )
+
+    @classmethod
+    def bulk_set_correct(cls, answer_ids, is_correct):
+        """Marks the given answers correct or incorrect in one UPDATE; returns the number changed."""
+        table = cls.__table__
+        def write(connection):
+            return sum(connection.execute(update(table).where(table.c.id.in_(ids)).values(is_correct=is_correct)).rowcount
+                       for ids in id_chunks(answer_ids))
+        return run_bulk_write("updating answers", write)
 
     def update(self, new_text=None, new_is_correct=None):
         """Updates the answer's text or correctness."""
@@ -63,13 +86,12 @@ class Answer(Base):
                 self.is_correct = new_is_correct
             session.merge(self)
             session.commit()
+            invalidate_cache()
             return True
         except Exception as e:
             session.rollback()
             print(f"Error updating answer: {e}")
             return False
-        finally:
-            session.close()
 
     def delete(self):
         """Deletes the answer."""
@@ -77,10 +99,9 @@ class Answer(Base):
         try:
             session.delete(self)
             session.commit()
+            invalidate_cache()
             return True
         except Exception as e:
             session.rollback()
             print(f"Error deleting answer: {e}")
-            return False
-        finally:
-            session.close()
\ No newline at end of file
+            return False
\ No newline at end of file
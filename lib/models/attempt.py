@@ -0,0 +1,88 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, inspect, update
+from sqlalchemy.orm import relationship
+from sqlalchemy.orm.attributes import set_committed_value
+from lib.database import Base, get_db_session
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+class Attempt(Base):
+    __tablename__ = 'attempts'
+
+    STATUS_IN_PROGRESS = "in_progress"
+    STATUS_COMPLETED = "completed"
+    STATUS_INTERRUPTED = "interrupted"
+
+    id = Column(Integer, primary_key=True)
+    player = Column(String, nullable=False, default="Anonymous")
+    category_id = Column(Integer, ForeignKey('categories.id', ondelete='CASCADE'), nullable=False, index=True)
+    status = Column(String, nullable=False, default=STATUS_IN_PROGRESS)
+    score = Column(Integer, nullable=False, default=0)
+    total_questions = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, nullable=False, default=utcnow)
+    finished_at = Column(DateTime)
+
+    # Define relationships
+    category = relationship("Category")
+    responses = relationship("Response", back_populates="attempt", cascade="all, delete-orphan", passive_deletes=True)
+
+    def __repr__(self):
+        return f"<Attempt(id={self.id}, player='{self.player}', category_id={self.category_id}, score={self.score}/{self.total_questions}, status='{self.status}')>"
+
+    @classmethod
+    def start(cls, category_id, total_questions, player=None):
+        """Records the start of a quiz attempt."""
+        session = get_db_session()
+        try:
+            new_attempt = cls(player=player or "Anonymous", category_id=category_id, total_questions=total_questions)
+            session.add(new_attempt)
+            session.commit()
+            return new_attempt
+        except Exception as e:
+            session.rollback()
+            print(f"Error starting attempt: {e}")
+            return None
+
+    @classmethod
+    def get_all(cls):
+        """Returns all attempts."""
+        session = get_db_session()
+        return session.query(cls).all()
+
+    @classmethod
+    def find_by_id(cls, attempt_id):
+        """Finds an attempt by its ID."""
+        session = get_db_session()
+        return session.query(cls).filter_by(id=attempt_id).first()
+
+    def finish(self, score, completed=True):
+        """Stores the final score and marks the attempt completed or interrupted.
+
+        Only an attempt still in progress in the database is changed, so however many calls
+        (or copies of the attempt) finish it, it is finished and added to the leaderboard
+        totals once, in the same transaction.
+        """
+        from lib.leaderboard import record_attempt # Import locally to avoid circular dependency
+
+        table = self.__table__
+        attempt_id = inspect(self).identity[0] # Without loading: self may be detached
+        values = {"score": score, "status": self.STATUS_COMPLETED if completed else self.STATUS_INTERRUPTED,
+                  "finished_at": utcnow()}
+        session = get_db_session()
+        try:
+            finished = session.execute(
+                update(table).where(table.c.id == attempt_id, table.c.status == self.STATUS_IN_PROGRESS).values(values)
+            ).rowcount == 1
+            if finished and completed:
+                attempt = session.get(Attempt, attempt_id) # Player, category and total never change
+                record_attempt(session.connection(), attempt.player, attempt.category_id, score, attempt.total_questions)
+            session.commit()
+            if finished:
+                for name, value in values.items():
+                    set_committed_value(self, name, value)
+            return True
+        except Exception as e:
+            session.rollback()
+            print(f"Error finishing attempt: {e}")
+            return False
@@ -1,5 +1,89 @@
-# This file can be mostly empty if using declarative_base directly in database.py
-# It serves as a placeholder if you needed common methods/attributes for all models.
-from lib.database import Base
+# Query and write helpers shared by the models: keyset_page, iter_keyset, upsert, id_chunks, run_bulk_write
+import os
+from importlib import import_module
+from sqlalchemy import and_, insert, update
+from lib.database import Base, get_db_session
+from lib.cache import invalidate_cache
+from lib.models.content_revision import ContentRevision
 # You might put common columns here if you have many models sharing them
-# For this project, Base from database.py is sufficient.
\ No newline at end of file
+# For this project, Base from database.py is sufficient.
+
+PAGE_SIZE = int(os.environ.get("QUIZ_PAGE_SIZE", 20)) # Rows per listing page (and per CLI screen)
+
+
+def keyset_page(query, id_column, after_id, limit):
+    """Returns up to `limit` rows of query with IDs above after_id, in ID order.
+
+    Seeks straight to after_id through the primary key, so page 10,000 costs the same
+    as page 1 (unlike OFFSET, which reads and discards every earlier row).
+    """
+    return query.filter(id_column > (after_id or 0)).order_by(id_column).limit(limit).all()
+
+
+def iter_keyset(fetch_page, batch_size=PAGE_SIZE):
+    """Yields every row from fetch_page(after_id, limit), one page at a time.
+
+    Only one page is held in memory: the session's identity map holds rows weakly, so
+    pages the caller has finished with are freed.
+    """
+    after_id = 0
+    while True:
+        rows = fetch_page(after_id, batch_size)
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        after_id = rows[-1].id
+
+
+def upsert(connection, table, keys, rows, increment=()):
+    """Writes rows keyed by the `keys` columns: existing rows get the new values, others are inserted.
+
+    Columns named in `increment` are added to the stored value instead of replacing it, so
+    counters can be maintained with one statement per batch. Uses INSERT ... ON CONFLICT
+    where the database has it (SQLite, PostgreSQL); elsewhere an UPDATE, then an INSERT if
+    no row matched, per row.
+    """
+    if not rows:
+        return
+    columns = [c for c in rows[0] if c not in keys]
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        statement = import_module(f"sqlalchemy.dialects.{dialect}").insert(table)
+        changes = {c: table.c[c] + statement.excluded[c] if c in increment else statement.excluded[c] for c in columns}
+        connection.execute(statement.on_conflict_do_update(index_elements=list(keys), set_=changes), rows)
+        return
+    for row in rows:
+        match = and_(*(table.c[k] == row[k] for k in keys))
+        changes = {c: table.c[c] + row[c] if c in increment else row[c] for c in columns}
+        if connection.execute(update(table).where(match).values(changes)).rowcount == 0:
+            connection.execute(insert(table).values(row))
+
+
+BULK_CHUNK_SIZE = 10000 # IDs per statement; keeps IN lists under SQLite's bound-parameter limit
+
+
+def id_chunks(ids):
+    """Splits IDs (deduplicated, sorted) into lists of at most BULK_CHUNK_SIZE."""
+    ids = sorted(set(ids))
+    return [ids[start:start + BULK_CHUNK_SIZE] for start in range(0, len(ids), BULK_CHUNK_SIZE)]
+
+
+def run_bulk_write(description, write):
+    """Runs write(connection) -> rows affected as one transaction; returns the count, or None on error.
+
+    For set-based UPDATE/DELETE statements, which bypass the ORM flush: the content
+    revision is bumped in the same transaction (so snapshots, search and duplicate
+    indexes notice) and the model cache is cleared after the commit.
+    """
+    session = get_db_session()
+    try:
+        count = write(session.connection())
+        if count:
+            ContentRevision.bump(session.connection())
+        session.commit()
+        invalidate_cache()
+        return count
+    except Exception as e:
+        session.rollback()
+        print(f"Error {description}: {e}")
+        return None
@@ -1,6 +1,9 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, case, cast, literal, update
 from sqlalchemy.orm import relationship
 from lib.database import Base, get_db_session
+from lib.cache import model_cache, invalidate_cache
+from lib.models.base import PAGE_SIZE, keyset_page, iter_keyset, id_chunks, run_bulk_write
+import lib.models.content_revision # Registers the content revision flush hook
 
 class Category(Base):
     __tablename__ = 'categories'
@@ -9,7 +12,8 @@ class Category(Base):
     name = Column(String, unique=True, nullable=False)
 
     # Define relationship to Question
-    questions = relationship("Question", back_populates="category", cascade="all, delete-orphan")
+    # passive_deletes: the database cascades deletes, so unloaded questions are never fetched
+    questions = relationship("Question", back_populates="category", cascade="all, delete-orphan", passive_deletes=True)
 
     def __repr__(self):
         return f"<Category(id={self.id}, name='{self.name}')>"
@@ -22,37 +26,82 @@ class Category(Base):
             new_category = cls(name=name)
             session.add(new_category)
             session.commit()
+            invalidate_cache()
             return new_category
         except Exception as e:
             session.rollback()
             print(f"Error creating category: {e}")
             return None
-        finally:
-            session.close()
 
     @classmethod
     def get_all(cls):
         """Returns all categories."""
-        session = get_db_session()
-        categories = session.query(cls).all()
-        session.close()
-        return categories
+        return model_cache.fetch((cls.__tablename__, "all"), lambda session: session.query(cls).all())
+
+    @classmethod
+    def iter_page(cls, after_id=0, limit=PAGE_SIZE):
+        """Returns up to `limit` categories with IDs above after_id, in ID order."""
+        return keyset_page(get_db_session().query(cls), cls.id, after_id, limit)
+
+    @classmethod
+    def iter_all(cls, batch_size=PAGE_SIZE):
+        """Yields every category, loading one page at a time."""
+        return iter_keyset(cls.iter_page, batch_size)
 
     @classmethod
     def find_by_id(cls, category_id):
         """Finds a category by its ID."""
-        session = get_db_session()
-        category = session.query(cls).filter_by(id=category_id).first()
-        session.close()
-        return category
+        return model_cache.fetch(
+            (cls.__tablename__, category_id), lambda session: session.query(cls).filter_by(id=category_id).first()
+        )
 
     @classmethod
     def find_by_name(cls, name):
         """Finds a category by its name."""
         session = get_db_session()
-        category = session.query(cls).filter_by(name=name).first()
-        session.close()
-        return category
+        return session.query(cls).filter_by(name=name).first()
+
+    @classmethod
+    def load_quiz(cls, category_id):
+        """Loads a category's questions and answers in a single query as an immutable Quiz.
+
+        Returns None if the category does not exist.
+        """
+        from lib.models.question import Question # Import locally to avoid circular dependency
+        from lib.models.answer import Answer
+        from lib.quiz import build_quiz
+
+        session = get_db_session()
+        rows = (
+            session.query(cls.name, Question.id, Question.text, Answer.id, Answer.text, Answer.is_correct)
+            .outerjoin(Question, Question.category_id == cls.id)
+            .outerjoin(Answer, Answer.question_id == Question.id)
+            .filter(cls.id == category_id)
+            .order_by(Question.id, Answer.id)
+            .all()
+        )
+        if not rows:
+            return None
+        return build_quiz(category_id, rows[0][0], (row[1:] for row in rows))
+
+    @classmethod
+    def bulk_rename(cls, names):
+        """Renames categories from a {category_id: new_name} mapping; returns the number renamed.
+
+        Names are unique, so the categories first get temporary names (one UPDATE) and then
+        their new ones (another): swapping or rotating names never collides midway.
+        """
+        table = cls.__table__
+        temporary = literal("\x01renaming ", String) + cast(table.c.id, String) # Unique per category
+        def write(connection):
+            for ids in id_chunks(names):
+                connection.execute(update(table).where(table.c.id.in_(ids)).values(name=temporary))
+            renamed = 0
+            for ids in id_chunks(names):
+                new_name = case({category_id: names[category_id] for category_id in ids}, value=table.c.id)
+                renamed += connection.execute(update(table).where(table.c.id.in_(ids)).values(name=new_name)).rowcount
+            return renamed
+        return run_bulk_write("renaming categories", write)
 
     def update(self, new_name):
         """Updates the category's name."""
@@ -61,13 +110,12 @@ class Category(Base):
             self.name = new_name
             session.merge(self) # Re-attach and update
             session.commit()
+            invalidate_cache()
             return True
         except Exception as e:
             session.rollback()
             print(f"Error updating category: {e}")
             return False
-        finally:
-            session.close()
 
     def delete(self):
         """Deletes the category and its associated questions and answers."""
@@ -75,10 +123,9 @@ class Category(Base):
         try:
             session.delete(self)
             session.commit()
+            invalidate_cache()
             return True
         except Exception as e:
             session.rollback()
             print(f"Error deleting category: {e}")
-            return False
-        finally:
-            session.close()
\ No newline at end of file
+            return False
\ No newline at end of file
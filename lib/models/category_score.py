@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from lib.database import Base
+
+class CategoryScore(Base):
+    __tablename__ = 'category_scores'
+
+    # Running totals over each player's completed attempts in one category (category leaderboards)
+    category_id = Column(Integer, ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True)
+    player = Column(String, primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    points = Column(Integer, nullable=False, default=0) # Correct answers
+    answered = Column(Integer, nullable=False, default=0) # Questions in those attempts
+
+    def __repr__(self):
+        return (f"<CategoryScore(category_id={self.category_id}, player='{self.player}', "
+                f"points={self.points}, attempts={self.attempts})>")
+
+# Leaderboard order within each category, so a category's top K rows are K consecutive index entries
+Index('ix_category_scores_rank', CategoryScore.category_id, CategoryScore.points.desc(),
+      CategoryScore.answered, CategoryScore.player)
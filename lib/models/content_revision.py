@@ -0,0 +1,39 @@
+from itertools import chain
+from sqlalchemy import Column, Integer, event, insert, update
+from sqlalchemy.orm import Session
+from lib.database import Base, get_db_session
+
+# Tables whose changes alter quiz content (and so invalidate snapshots built from it)
+CONTENT_TABLES = ("categories", "questions", "answers")
+
+class ContentRevision(Base):
+    __tablename__ = 'content_revision'
+
+    id = Column(Integer, primary_key=True) # Single row, id 1
+    revision = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ContentRevision(revision={self.revision})>"
+
+    @classmethod
+    def current(cls):
+        """Returns the current content revision (0 if content was never changed)."""
+        session = get_db_session()
+        return session.query(cls.revision).filter_by(id=1).scalar() or 0
+
+    @classmethod
+    def bump(cls, connection):
+        """Increments the revision inside the caller's transaction."""
+        table = cls.__table__
+        result = connection.execute(update(table).where(table.c.id == 1).values(revision=table.c.revision + 1))
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(id=1, revision=1))
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_revision_on_content_change(session, flush_context, instances):
+    """Any ORM write to categories, questions or answers bumps the revision in the same transaction."""
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if getattr(obj, "__tablename__", None) in CONTENT_TABLES:
+            ContentRevision.bump(session.connection())
+            return
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Index
+from lib.database import Base
+
+class PlayerScore(Base):
+    __tablename__ = 'player_scores'
+
+    # Running totals over each player's completed attempts in all categories (global leaderboard)
+    player = Column(String, primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    points = Column(Integer, nullable=False, default=0) # Correct answers
+    answered = Column(Integer, nullable=False, default=0) # Questions in those attempts
+
+    def __repr__(self):
+        return f"<PlayerScore(player='{self.player}', points={self.points}, attempts={self.attempts})>"
+
+# Leaderboard order, so the top K rows are the first K index entries
+Index('ix_player_scores_rank', PlayerScore.points.desc(), PlayerScore.answered, PlayerScore.player)
@@ -1,57 +1,175 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, delete, func, update
+import random
+from array import array
+from sqlalchemy.orm import relationship, joinedload, selectinload
 from lib.database import Base, get_db_session
+from lib.cache import model_cache, invalidate_cache
 from lib.models.category import Category # Import Category
+from lib.models.base import PAGE_SIZE, keyset_page, iter_keyset, id_chunks, run_bulk_write
 
 class Question(Base):
     __tablename__ = 'questions'
 
     id = Column(Integer, primary_key=True)
     text = Column(String, nullable=False)
-    category_id = Column(Integer, ForeignKey('categories.id'), nullable=False)
+    category_id = Column(Integer, ForeignKey('categories.id', ondelete='CASCADE'), nullable=False, index=True)
 
     # Define relationships
     category = relationship("Category", back_populates="questions")
-    answers = relationship("Answer", back_populates="question", cascade="all, delete-orphan")
+    answers = relationship("Answer", back_populates="question", cascade="all, delete-orphan", passive_deletes=True,
+                           order_by="Answer.id")
 
     def __repr__(self):
         return f"<Question(id={self.id}, text='{self.text[:30]}...', category_id={self.category_id})>"
 
     @classmethod
-    def create(cls, text, category_id):
-        """Creates a new question."""
+    def create(cls, text, category_id, duplicates=None):
+        """Creates a new question.
+
+        duplicates ("flag", "reject" or "off"; default QUIZ_DUPLICATE_POLICY) says what to do
+        when the text nearly repeats a question already in the category.
+        """
+        from lib.dedupe import DUPLICATE_POLICY, find_duplicate # Import locally to avoid circular dependency
+
         session = get_db_session()
         try:
             # Optional: Check if category_id exists
             if not Category.find_by_id(category_id):
                 raise ValueError(f"Category with ID {category_id} does not exist.")
 
+            duplicates = duplicates or DUPLICATE_POLICY
+            match = find_duplicate(text, category_id) if duplicates != "off" else None
+            if match:
+                message = (f"near-duplicate of question {match.question_id} "
+                           f"('{match.question_text}', {match.similarity:.0%} similar)")
+                if duplicates == "reject":
+                    raise ValueError(f"Question is a {message}.")
+                print(f"Warning: new question is a {message}.")
+
             new_question = cls(text=text, category_id=category_id)
             session.add(new_question)
             session.commit()
+            invalidate_cache()
             return new_question
         except Exception as e:
             session.rollback()
             print(f"Error creating question: {e}")
             return None
-        finally:
-            session.close()
 
     @classmethod
     def get_all(cls):
         """Returns all questions."""
-        session = get_db_session()
-        questions = session.query(cls).all()
-        session.close()
-        return questions
+        return model_cache.fetch((cls.__tablename__, "all"), lambda session: session.query(cls).all())
+
+    @classmethod
+    def iter_page(cls, after_id=0, limit=PAGE_SIZE, category_id=None):
+        """Returns up to `limit` questions with IDs above after_id, in ID order.
+
+        Each question's category is joined in and its answers are loaded with one extra
+        IN query, so a page costs two queries however many questions and answers it holds.
+        """
+        query = get_db_session().query(cls).options(joinedload(cls.category), selectinload(cls.answers))
+        if category_id is not None:
+            query = query.filter(cls.category_id == category_id)
+        return keyset_page(query, cls.id, after_id, limit)
+
+    @classmethod
+    def iter_all(cls, category_id=None, batch_size=PAGE_SIZE):
+        """Yields every question (optionally of one category) with its category and answers, a page at a time."""
+        return iter_keyset(lambda after_id, limit: cls.iter_page(after_id, limit, category_id), batch_size)
 
     @classmethod
     def find_by_id(cls, question_id):
         """Finds a question by its ID."""
+        return model_cache.fetch(
+            (cls.__tablename__, question_id), lambda session: session.query(cls).filter_by(id=question_id).first()
+        )
+
+    @classmethod
+    def ids_for_category(cls, category_id):
+        """Returns the category's question IDs as a compact, cached array (read from the category_id index)."""
+        return model_cache.fetch_value(
+            ("question_ids", category_id),
+            lambda session: array("q", (row[0] for row in
+                                        session.query(cls.id).filter_by(category_id=category_id).order_by(cls.id))),
+        )
+
+    @classmethod
+    def sample(cls, category_id, n, seed=None):
+        """Returns a Quiz of n random questions from a category, with their answers.
+
+        Picks IDs from the cached ID array, then loads only those questions in one query per
+        500 IDs. The same seed over the same content yields the same questions in the same order.
+        Returns None if the category does not exist.
+        """
+        from lib.models.answer import Answer # Import locally to avoid circular dependency
+        from lib.quiz import Quiz, build_quiz
+
+        category = Category.find_by_id(category_id)
+        if not category:
+            return None
+        ids = cls.ids_for_category(category_id)
+        chosen = random.Random(seed).sample(ids, max(0, min(n, len(ids)))) # n < 1 gives an empty quiz
+
         session = get_db_session()
-        question = session.query(cls).filter_by(id=question_id).first()
-        session.close()
-        return question
+        loaded = {}
+        for start in range(0, len(chosen), 500):
+            rows = (
+                session.query(cls.id, cls.text, Answer.id, Answer.text, Answer.is_correct)
+                .outerjoin(Answer, Answer.question_id == cls.id)
+                .filter(cls.id.in_(chosen[start:start + 500]))
+                .order_by(cls.id, Answer.id)
+                .all()
+            )
+            loaded.update((q.id, q) for q in build_quiz(category_id, category.name, rows).questions)
+        # Questions deleted since the ID array was cached are simply left out
+        return Quiz(category_id, category.name, tuple(loaded[q_id] for q_id in chosen if q_id in loaded))
+
+    @classmethod
+    def move_all(cls, from_category_id, to_category_id):
+        """Moves every question of one category to another in one UPDATE; returns the number moved."""
+        if not Category.find_by_id(to_category_id):
+            print(f"Error moving questions: Category with ID {to_category_id} does not exist.")
+            return None
+        table = cls.__table__
+        statement = update(table).where(table.c.category_id == from_category_id).values(category_id=to_category_id)
+        return run_bulk_write("moving questions", lambda connection: connection.execute(statement).rowcount)
+
+    @classmethod
+    def bulk_delete(cls, question_ids=None, category_id=None, text_contains=None):
+        """Deletes the questions matching every given filter (IDs, category, text) with their answers.
+
+        One DELETE (per 10,000 IDs) in one transaction; the database cascades to answers,
+        responses and statistics. At least one filter is required. Returns the number deleted.
+        """
+        if question_ids is None and category_id is None and not text_contains:
+            print("Error deleting questions: give question IDs, a category or text to match.")
+            return None
+        table = cls.__table__
+        statement = delete(table)
+        if category_id is not None:
+            statement = statement.where(table.c.category_id == category_id)
+        if text_contains:
+            statement = statement.where(table.c.text.contains(text_contains, autoescape=True))
+        def write(connection):
+            if question_ids is None:
+                return connection.execute(statement).rowcount
+            return sum(connection.execute(statement.where(table.c.id.in_(ids))).rowcount for ids in id_chunks(question_ids))
+        return run_bulk_write("deleting questions", write)
+
+    @classmethod
+    def bulk_replace_text(cls, old, new, category_id=None):
+        """Replaces `old` with `new` in every question's text (or one category's) in one UPDATE; returns the number changed."""
+        if not old:
+            print("Error replacing question text: the text to replace cannot be empty.")
+            return None
+        table = cls.__table__
+        replaced = func.replace(table.c.text, old, new)
+        statement = update(table).where(table.c.text.contains(old, autoescape=True), replaced != table.c.text)
+        if category_id is not None:
+            statement = statement.where(table.c.category_id == category_id)
+        statement = statement.values(text=replaced)
+        return run_bulk_write("replacing question text", lambda connection: connection.execute(statement).rowcount)
 
     def update(self, new_text=None, new_category_id=None):
         """Updates the question's text or category."""
@@ -65,13 +183,12 @@ class Question(Base):
                 self.category_id = new_category_id
             session.merge(self)
             session.commit()
+            invalidate_cache()
             return True
         except Exception as e:
             session.rollback()
             print(f"Error updating question: {e}")
             return False
-        finally:
-            session.close()
 
     def delete(self):
         """Deletes the question and its associated answers."""
@@ -79,13 +196,12 @@ class Question(Base):
         try:
             session.delete(self)
             session.commit()
+            invalidate_cache()
             return True
         except Exception as e:
             session.rollback()
             print(f"Error deleting question: {e}")
             return False
-        finally:
-            session.close()
 
     def add_answer(self, text, is_correct):
         """Adds an answer to this question."""
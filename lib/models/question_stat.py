@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, Float, ForeignKey, text
+from lib.database import Base, get_db_session
+
+class QuestionStat(Base):
+    __tablename__ = 'question_stats'
+
+    # One row per question that has been answered: IRT 2PL parameters fitted from adaptive
+    # quizzes, and counts of all recorded responses
+    question_id = Column(Integer, ForeignKey('questions.id', ondelete='CASCADE'), primary_key=True)
+    difficulty = Column(Float, nullable=False, default=0.0, server_default=text("0.0"))
+    discrimination = Column(Float, nullable=False, default=1.0, server_default=text("1.0"))
+    responses = Column(Integer, nullable=False, default=0, server_default=text("0")) # Adaptive responses
+    answered = Column(Integer, nullable=False, default=0, server_default=text("0"))
+    correct = Column(Integer, nullable=False, default=0, server_default=text("0"))
+
+    def __repr__(self):
+        return (f"<QuestionStat(question_id={self.question_id}, difficulty={self.difficulty:.2f}, "
+                f"discrimination={self.discrimination:.2f}, correct={self.correct}/{self.answered})>")
+
+    @property
+    def correct_rate(self):
+        """Share of recorded responses that were correct (None before the first one)."""
+        return self.correct / self.answered if self.answered else None
+
+    @classmethod
+    def find_by_question_id(cls, question_id):
+        """Finds the statistics row of a question."""
+        session = get_db_session()
+        return session.query(cls).filter_by(question_id=question_id).first()
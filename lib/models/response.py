@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, Boolean, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from lib.database import Base, get_db_session
+from lib.models.attempt import Attempt, utcnow # Import Attempt
+
+class Response(Base):
+    __tablename__ = 'responses'
+
+    id = Column(Integer, primary_key=True)
+    attempt_id = Column(Integer, ForeignKey('attempts.id', ondelete='CASCADE'), nullable=False, index=True)
+    question_id = Column(Integer, ForeignKey('questions.id', ondelete='CASCADE'), nullable=False, index=True)
+    answer_id = Column(Integer, ForeignKey('answers.id', ondelete='SET NULL'))
+    is_correct = Column(Boolean, nullable=False, default=False)
+    answered_at = Column(DateTime, nullable=False, default=utcnow)
+
+    # Define relationship to Attempt
+    attempt = relationship("Attempt", back_populates="responses")
+
+    def __repr__(self):
+        return f"<Response(id={self.id}, attempt_id={self.attempt_id}, question_id={self.question_id}, answer_id={self.answer_id}, correct={self.is_correct})>"
+
+    @classmethod
+    def for_attempt(cls, attempt_id):
+        """Returns the responses recorded for an attempt, in answer order."""
+        session = get_db_session()
+        return session.query(cls).filter_by(attempt_id=attempt_id).order_by(cls.id).all()
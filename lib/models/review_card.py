@@ -0,0 +1,80 @@
+from sqlalchemy import Column, Integer, SmallInteger, String, ForeignKey, Index, exists, func, select
+from lib.database import Base, get_db_session
+from lib.models.base import upsert
+
+class ReviewCard(Base):
+    __tablename__ = 'review_cards'
+    # Clustered on (player, question_id): a card is one short row of small integers, with no rowid
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    # Spaced-repetition state of one question for one player (see lib/study.py)
+    player = Column(String, primary_key=True)
+    question_id = Column(Integer, ForeignKey('questions.id', ondelete='CASCADE'), primary_key=True)
+    due = Column(Integer, nullable=False) # Minutes since the Unix epoch
+    interval = Column(Integer, nullable=False, default=0) # Days; 0 while (re)learning
+    ease = Column(SmallInteger, nullable=False, default=2500) # SM-2 ease factor x 1000
+    reps = Column(SmallInteger, nullable=False, default=0) # Successful reviews in a row
+    lapses = Column(SmallInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return (f"<ReviewCard(player='{self.player}', question_id={self.question_id}, due={self.due}, "
+                f"interval={self.interval}, ease={self.ease})>")
+
+    @classmethod
+    def due_cards(cls, player, until, limit, category_id=None):
+        """Returns up to `limit` of the player's cards due by `until`, most overdue first.
+
+        Rows are (question_id, due, interval, ease, reps, lapses), read in due order from the
+        (player, due) index, so the cost depends on `limit`, not on how many cards exist.
+        """
+        # Import locally to avoid circular dependency
+        from lib.models.question import Question
+
+        query = (select(cls.question_id, cls.due, cls.interval, cls.ease, cls.reps, cls.lapses)
+                 .where(cls.player == player, cls.due <= until).order_by(cls.due, cls.question_id).limit(limit))
+        if category_id is not None:
+            query = query.join(Question, Question.id == cls.question_id).where(Question.category_id == category_id)
+        return get_db_session().execute(query).all()
+
+    @classmethod
+    def unseen_question_ids(cls, player, limit, category_id=None):
+        """Returns up to `limit` IDs of questions the player has no card for yet, lowest first."""
+        # Import locally to avoid circular dependency
+        from lib.models.question import Question
+
+        has_card = exists().where(cls.player == player, cls.question_id == Question.id)
+        query = select(Question.id).where(~has_card).order_by(Question.id).limit(limit)
+        if category_id is not None:
+            query = query.where(Question.category_id == category_id)
+        return list(get_db_session().execute(query).scalars())
+
+    @classmethod
+    def summary(cls, player, now):
+        """Returns (cards, due by now, earliest due time or None) for a player, from the index."""
+        cards, due, next_due = get_db_session().execute(
+            select(func.count(), func.count().filter(cls.due <= now), func.min(cls.due)).where(cls.player == player)
+        ).one()
+        return cards, due, next_due
+
+    @classmethod
+    def save_all(cls, player, cards):
+        """Writes a batch of card states (objects with the column attributes) in one statement.
+
+        Returns the number of cards written (0 on error).
+        """
+        rows = [{"player": player, "question_id": c.question_id, "due": c.due, "interval": c.interval,
+                 "ease": c.ease, "reps": c.reps, "lapses": c.lapses} for c in cards]
+        if not rows:
+            return 0
+        session = get_db_session()
+        try:
+            upsert(session.connection(), cls.__table__, ["player", "question_id"], rows)
+            session.commit()
+            return len(rows)
+        except Exception as e:
+            session.rollback()
+            print(f"Error saving review cards: {e}")
+            return 0
+
+# Due cards of a player in due order: the next reviews are the first entries of the player's range
+Index('ix_review_cards_due', ReviewCard.player, ReviewCard.due)
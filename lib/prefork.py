@@ -0,0 +1,155 @@
+import asyncio
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from lib.database import close_db_session, get_engine
+from lib.models.content_revision import ContentRevision
+from lib.recorder import close_recorder
+from lib.server import serve
+from lib.session_store import SharedSessionStore
+from lib.snapshot import ContentSnapshot
+from lib.snapshot_file import open_current_snapshot
+
+SNAPSHOT_POLL_INTERVAL = float(os.environ.get("QUIZ_SNAPSHOT_POLL_INTERVAL", 5)) # Seconds between revision checks
+TICK = 0.5 # Seconds between checks for exited workers
+
+
+class PreforkServer:
+    """Runs the quiz API in several forked worker processes sharing one listening socket.
+
+    The parent loads all quiz content into a ContentSnapshot and forks the workers, which
+    share it copy-on-write and serve every read from memory. Sessions live in a
+    SharedSessionStore, so any worker can answer any request. When the content revision
+    changes (any admin write or import), the parent builds a new snapshot, forks a new
+    generation of workers and tells the old one to finish its requests and exit.
+    SIGHUP forces a reload; SIGINT/SIGTERM stop everything.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8000, workers=2, poll_interval=SNAPSHOT_POLL_INTERVAL, sessions=None):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.sessions = sessions if sessions is not None else SharedSessionStore()
+        self.snapshot = None
+        self.generation = 0
+        self.children = {} # pid -> generation
+        self._stopping = False
+        self._reload_requested = False
+
+    def _load_snapshot(self):
+        previous = self.snapshot
+        try:
+            # A current snapshot file is mapped rather than loaded; workers share its pages
+            self.snapshot = open_current_snapshot() or ContentSnapshot.build()
+        finally:
+            get_engine().dispose() # No open connections may be inherited by the workers
+        if previous is not None and hasattr(previous, "close"):
+            previous.close() # Workers already forked keep their own mapping
+        gc.freeze() # Keep the collector from touching (and so copying) the shared snapshot pages
+
+    def _current_revision(self):
+        try:
+            return ContentRevision.current()
+        finally:
+            close_db_session()
+
+    def _spawn(self, sock):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = self.generation
+            return
+        code = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_IGN) # The parent decides when workers stop
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGHUP, signal.SIG_DFL)
+            asyncio.run(serve(sock=sock, content=self.snapshot, sessions=self.sessions))
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            close_recorder()
+            sys.stdout.flush()
+            os._exit(code) # Never return into the parent's loop
+
+    def _spawn_generation(self, sock):
+        self.generation += 1
+        for _ in range(self.workers):
+            self._spawn(sock)
+
+    def _stop_generation(self, generation=None):
+        """Sends SIGTERM to every worker of an older generation (or all workers)."""
+        for pid, worker_generation in self.children.items():
+            if generation is None or worker_generation < generation:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+    def _reap(self, sock):
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if not pid:
+                return
+            generation = self.children.pop(pid, None)
+            if generation == self.generation and not self._stopping:
+                print(f"Worker {pid} exited unexpectedly (status {status}); starting a replacement.")
+                self._spawn(sock)
+
+    def _reload(self, sock):
+        revision = self.snapshot.revision
+        self._load_snapshot()
+        print(f"Content revision {revision} -> {self.snapshot.revision}; reloading workers.")
+        self._spawn_generation(sock)
+        self._stop_generation(self.generation)
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+
+    def _request_reload(self, signum, frame):
+        self._reload_requested = True
+
+    def run(self):
+        sock = socket.create_server((self.host, self.port), backlog=1024)
+        self._load_snapshot()
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGHUP, self._request_reload)
+        print(f"Starting {self.workers} workers on {sock.getsockname()} (content revision {self.snapshot.revision})")
+        self._spawn_generation(sock)
+
+        next_poll = time.monotonic() + self.poll_interval
+        try:
+            while not self._stopping:
+                time.sleep(TICK)
+                self._reap(sock)
+                if self._reload_requested or time.monotonic() >= next_poll:
+                    next_poll = time.monotonic() + self.poll_interval
+                    try:
+                        if self._reload_requested or self._current_revision() != self.snapshot.revision:
+                            self._reload_requested = False
+                            self._reload(sock)
+                    except Exception as e:
+                        print(f"Could not reload quiz content: {e}") # Keep serving the old snapshot
+        finally:
+            self._stop_generation()
+            while self.children:
+                try:
+                    pid, _ = os.waitpid(-1, 0)
+                except ChildProcessError:
+                    break
+                self.children.pop(pid, None)
+            sock.close()
+            print("Quiz API stopped.")
+
+
+def run_prefork(host="127.0.0.1", port=8000, workers=2):
+    """Runs the quiz API with `workers` processes until interrupted."""
+    if not hasattr(os, "fork"):
+        raise SystemExit("Multiple workers need os.fork(); run with --workers 1 on this platform.")
+    PreforkServer(host, port, workers).run()
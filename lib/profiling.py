@@ -0,0 +1,265 @@
+import atexit
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+PROFILE_ENABLED = os.environ.get("QUIZ_PROFILE", "").lower() in ("1", "true", "yes", "on")
+SLOW_QUERY_MS = float(os.environ.get("QUIZ_SLOW_QUERY_MS", 100)) # Statements at least this slow are logged
+SLOW_QUERY_LOG_SIZE = 100 # Most recent slow statements kept for the report
+
+# Upper bounds of the latency histogram buckets, in milliseconds; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LatencyHistogram:
+    """Counts durations into fixed buckets, so percentiles cost constant memory however many are recorded."""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0 # Seconds
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction):
+        """Returns the upper bound (ms) of the bucket holding the given fraction of durations."""
+        if not self.count:
+            return 0.0
+        rank, seen = fraction * self.count, 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max * 1000
+
+
+class OperationStats:
+    """Database activity of one logical operation (a CLI action, a quiz, a server call)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.queries = 0 # Statements executed (an executemany counts once)
+        self.round_trips = 0 # Cursor executions; bulk inserts may take several per statement
+        self.latency = LatencyHistogram()
+        self.slow = []
+        self.statements = []
+
+    def __repr__(self):
+        return (f"<OperationStats {self.name}: {self.queries} queries, {self.round_trips} round trips, "
+                f"{self.latency.total * 1000:.1f} ms>")
+
+
+class SlowQuery:
+    def __init__(self, operation, statement, seconds, call_site):
+        self.operation = operation
+        self.statement = statement
+        self.seconds = seconds
+        self.call_site = call_site
+
+    def __str__(self):
+        statement = " ".join(self.statement.split())
+        return f"{self.seconds * 1000:.1f} ms at {self.call_site} ({self.operation}): {statement[:200]}"
+
+
+def call_site():
+    """Returns "file:line in function" for the innermost frame of this app outside this module."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_PACKAGE_ROOT) and filename != __file__ and "site-packages" not in filename:
+            return f"{os.path.relpath(filename, _PACKAGE_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class Profiler:
+    """Attributes every statement run through any engine to the operations open on its thread.
+
+    Operations nest: a statement counts towards every open operation, so a quiz includes
+    the lookups made inside it. Totals per operation name are kept for the final report.
+    """
+
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS, keep_statements=False):
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.keep_statements = keep_statements
+        self.totals = {} # Operation name -> (runs, queries, round trips, LatencyHistogram)
+        self.latency = LatencyHistogram()
+        self.slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def operation(self, name):
+        stats = OperationStats(name)
+        stack = self._stack()
+        stack.append(stats)
+        try:
+            yield stats
+        finally:
+            stack.remove(stats)
+            with self._lock:
+                runs, queries, round_trips, latency = self.totals.get(name) or (0, 0, 0, LatencyHistogram())
+                latency.merge(stats.latency)
+                self.totals[name] = (runs + 1, queries + stats.queries, round_trips + stats.round_trips, latency)
+
+    # --- Engine event handlers ---
+
+    def _before_execute(self, conn, clauseelement, multiparams, params, execution_options):
+        for stats in self._stack():
+            stats.queries += 1
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - getattr(self._local, "started", time.perf_counter())
+        stack = self._stack()
+        for stats in stack:
+            stats.round_trips += 1
+            stats.latency.add(seconds)
+            if self.keep_statements:
+                stats.statements.append(statement)
+        slow = None
+        if seconds >= self.slow_query_seconds:
+            slow = SlowQuery(stack[-1].name if stack else "-", statement, seconds, call_site())
+            for stats in stack:
+                stats.slow.append(slow)
+        with self._lock:
+            self.latency.add(seconds)
+            if slow:
+                self.slow_queries.append(slow)
+
+    def install(self):
+        from sqlalchemy import event # Import locally; the CLI starts without SQLAlchemy
+        from sqlalchemy.engine import Engine
+        event.listen(Engine, "before_execute", self._before_execute)
+        event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def uninstall(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+        event.remove(Engine, "before_execute", self._before_execute)
+        event.remove(Engine, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(Engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def report(self, out=None):
+        """Prints totals per operation, the overall latency histogram and the slow query log."""
+        out = out or sys.stderr
+        print("\n--- Database profile ---", file=out)
+        print(f"{'operation':<40} {'runs':>6} {'queries':>8} {'trips':>8} {'db ms':>10} {'p50 ms':>8} {'p95 ms':>8}", file=out)
+        with self._lock:
+            for name, (runs, queries, round_trips, latency) in sorted(self.totals.items()):
+                print(f"{name[:40]:<40} {runs:>6} {queries:>8} {round_trips:>8} {latency.total * 1000:>10.1f} "
+                      f"{latency.percentile(0.5):>8} {latency.percentile(0.95):>8}", file=out)
+            print(f"\nAll statements: {self.latency.count}, {self.latency.total * 1000:.1f} ms", file=out)
+            for bound, count in zip(LATENCY_BUCKETS_MS + (float("inf"),), self.latency.counts):
+                if count:
+                    print(f"  <= {bound:>6} ms: {count}", file=out)
+            if self.slow_queries:
+                print(f"\nSlow statements (>= {self.slow_query_seconds * 1000:g} ms):", file=out)
+                for slow in self.slow_queries:
+                    print(f"  {slow}", file=out)
+
+
+_profiler = None
+
+
+def enable(slow_query_ms=SLOW_QUERY_MS, report_at_exit=True):
+    """Starts profiling every engine in this process; the report is printed to stderr at exit."""
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(slow_query_ms)
+        _profiler.install()
+        if report_at_exit:
+            atexit.register(lambda: _profiler and _profiler.report())
+    return _profiler
+
+
+def disable():
+    global _profiler
+    if _profiler is not None:
+        _profiler.uninstall()
+        _profiler = None
+
+
+def get_profiler():
+    """Returns the active Profiler, or None when profiling is off."""
+    return _profiler
+
+
+@contextmanager
+def operation(name, summary=False):
+    """Groups the statements run inside the block under `name` (a no-op unless profiling is on).
+
+    With summary=True a one-line count is printed to stderr when the block ends. A name of
+    None also makes the block a no-op.
+    """
+    if _profiler is None or name is None:
+        yield None
+        return
+    with _profiler.operation(name) as stats:
+        yield stats
+    if summary:
+        print(f"[profile] {name}: {stats.queries} queries, {stats.round_trips} round trips, "
+              f"{stats.latency.total * 1000:.1f} ms in the database", file=sys.stderr)
+        for slow in stats.slow:
+            print(f"[profile] slow: {slow}", file=sys.stderr)
+
+
+@contextmanager
+def count_queries(name="counted"):
+    """Counts the statements run inside the block, whether or not profiling is on; yields OperationStats.
+
+    Statements are kept in stats.statements for error messages.
+    """
+    profiler = Profiler(keep_statements=True)
+    profiler.install()
+    try:
+        with profiler.operation(name) as stats:
+            yield stats
+    finally:
+        profiler.uninstall()
+
+
+@contextmanager
+def assert_max_queries(budget, round_trips=None):
+    """Fails with AssertionError if the block runs more than `budget` queries (or `round_trips` cursor executions).
+
+        with assert_max_queries(2):
+            Category.load_quiz(category_id)
+    """
+    with count_queries() as stats:
+        yield stats
+    listing = "\n".join(f"  {i}. {' '.join(s.split())[:160]}" for i, s in enumerate(stats.statements, start=1))
+    assert stats.queries <= budget, f"Expected at most {budget} queries, ran {stats.queries}:\n{listing}"
+    if round_trips is not None:
+        assert stats.round_trips <= round_trips, \
+            f"Expected at most {round_trips} round trips, made {stats.round_trips}:\n{listing}"
+
+
+if PROFILE_ENABLED:
+    enable()
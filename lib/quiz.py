@@ -0,0 +1,137 @@
+import random
+from collections import namedtuple
+
+# Immutable, session-independent quiz content. Safe to keep after the session is closed
+# and to share between threads.
+QuizAnswer = namedtuple("QuizAnswer", ["id", "text", "is_correct"])
+QuizQuestion = namedtuple("QuizQuestion", ["id", "text", "answers"]) # answers: tuple of QuizAnswer
+Quiz = namedtuple("Quiz", ["category_id", "category_name", "questions"]) # questions: tuple of QuizQuestion
+
+
+def build_quiz(category_id, category_name, rows):
+    """Builds a Quiz from (question_id, question_text, answer_id, answer_text, is_correct) rows.
+
+    Rows must be ordered by question ID; answer columns are None for questions without answers.
+    """
+    questions = []
+    current_id, current_text, answers = None, None, []
+    for question_id, question_text, answer_id, answer_text, is_correct in rows:
+        if question_id is None:
+            continue
+        if question_id != current_id:
+            if current_id is not None:
+                questions.append(QuizQuestion(current_id, current_text, tuple(answers)))
+            current_id, current_text, answers = question_id, question_text, []
+        if answer_id is not None:
+            answers.append(QuizAnswer(answer_id, answer_text, bool(is_correct)))
+    if current_id is not None:
+        questions.append(QuizQuestion(current_id, current_text, tuple(answers)))
+    return Quiz(category_id, category_name, tuple(questions))
+
+
+AnswerResult = namedtuple("AnswerResult", ["question_id", "answer_id", "is_correct", "correct_answer"])
+
+
+class QuizEngine:
+    """Read-only lookup tables for one Quiz, shared by any number of QuizSessions.
+
+    Correct answers are precomputed per question, so scoring an answer is a set lookup.
+    """
+
+    def __init__(self, quiz):
+        self.quiz = quiz
+        self.questions = quiz.questions
+        self.correct_answer_ids = {
+            q.id: frozenset(a.id for a in q.answers if a.is_correct) for q in quiz.questions
+        }
+        self.first_correct_answer = {
+            q.id: next((a for a in q.answers if a.is_correct), None) for q in quiz.questions
+        }
+
+    def __len__(self):
+        return len(self.questions)
+
+    def is_correct(self, question_id, answer_id):
+        return answer_id in self.correct_answer_ids.get(question_id, ())
+
+    def start(self, shuffle=True, rng=None, seed=None):
+        """Starts a new QuizSession.
+
+        rng (a random.Random) makes the order reproducible; seed additionally makes the session
+        resumable from its counters alone (see resume()).
+        """
+        return QuizSession(self, shuffle=shuffle, rng=rng, seed=seed)
+
+    def resume(self, seed, position, score, answered, awaiting, shuffle=True):
+        """Rebuilds a seeded session from its counters, e.g. in another worker process."""
+        quiz_session = QuizSession(self, shuffle=shuffle, seed=seed)
+        quiz_session.score = score
+        quiz_session.answered = answered
+        quiz_session.position = position - 1 if awaiting else position
+        if awaiting:
+            quiz_session.next_question() # Re-serves the same question with the same answer order
+        return quiz_session
+
+
+class QuizSession:
+    """One user's pass through a quiz: serves questions in order and keeps the score."""
+
+    def __init__(self, engine, shuffle=True, rng=None, seed=None):
+        self.engine = engine
+        self.seed = seed
+        self.rng = random.Random(seed) if seed is not None else (rng or random.Random())
+        self.shuffle = shuffle
+        self.order = list(range(len(engine.questions)))
+        if shuffle:
+            self.rng.shuffle(self.order) # Randomize question order
+        self.position = 0 # Number of questions served so far
+        self.score = 0
+        self.answered = 0
+        self.responses = [] # AnswerResult per answered question
+        self.current = None
+
+    @property
+    def total(self):
+        return len(self.order)
+
+    @property
+    def finished(self):
+        return self.current is None and self.position >= self.total
+
+    @property
+    def percentage(self):
+        return (self.score / self.total) * 100 if self.total else 0.0
+
+    def next_question(self):
+        """Returns the next question (answers shuffled), or None when the quiz is over."""
+        if self.position >= self.total:
+            self.current = None
+            return None
+        question = self.engine.questions[self.order[self.position]]
+        self.position += 1
+        if self.shuffle and len(question.answers) > 1:
+            answers = list(question.answers)
+            # Seeded sessions shuffle each question independently so they can be resumed mid-quiz
+            rng = random.Random(f"{self.seed}:{self.position}") if self.seed is not None else self.rng
+            rng.shuffle(answers) # Randomize answer order
+            question = question._replace(answers=tuple(answers))
+        self.current = question
+        return question
+
+    def answer(self, answer_id):
+        """Scores answer_id against the current question and returns an AnswerResult."""
+        if self.current is None:
+            raise ValueError("No question is awaiting an answer.")
+        question_id = self.current.id
+        is_correct = self.engine.is_correct(question_id, answer_id)
+        if is_correct:
+            self.score += 1
+        self.answered += 1
+        result = AnswerResult(question_id, answer_id, is_correct, self.engine.first_correct_answer[question_id])
+        self.responses.append(result)
+        self.current = None
+        return result
+
+    def skip(self):
+        """Moves past the current question without answering it."""
+        self.current = None
@@ -0,0 +1,150 @@
+import atexit
+import os
+import queue
+import threading
+from sqlalchemy import insert
+from lib.database import get_engine
+from lib.models.attempt import utcnow
+from lib.models.response import Response
+from lib.leaderboard import record_responses
+
+RECORDER_BATCH_SIZE = int(os.environ.get("QUIZ_RECORDER_BATCH_SIZE", 500))
+RECORDER_FLUSH_INTERVAL = float(os.environ.get("QUIZ_RECORDER_FLUSH_INTERVAL", 1.0)) # Seconds
+RECORDER_QUEUE_SIZE = 100000 # Callers block (backpressure) rather than grow memory without bound
+
+_STOP = object()
+
+
+class ResponseRecorder:
+    """Buffers quiz responses in memory and writes them in batches from a background thread.
+
+    record() never touches the database. Buffered responses are written with one
+    executemany INSERT per batch (plus one upsert of per-question counters) when the batch fills up, after flush_interval seconds,
+    or when flush() is called (which waits until everything recorded so far is stored).
+    A batch that fails is retried a response at a time, so one bad response (e.g. for a
+    question deleted mid-quiz) does not lose the others. Each response goes to the database that was active (see lib.tenants) when it was recorded.
+    """
+
+    def __init__(self, batch_size=RECORDER_BATCH_SIZE, flush_interval=RECORDER_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=RECORDER_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name="response-recorder", daemon=True)
+        self._thread.start()
+
+    def record(self, attempt_id, question_id, answer_id, is_correct):
+        """Queues one response for writing to the caller's current database."""
+        self._queue.put((get_engine(), {
+            "attempt_id": attempt_id,
+            "question_id": question_id,
+            "answer_id": answer_id,
+            "is_correct": bool(is_correct),
+            "answered_at": utcnow(),
+        }))
+
+    def flush(self, timeout=None):
+        """Blocks until every response recorded before this call is committed.
+
+        Returns False if it timed out or a response could not be stored.
+        """
+        if not self._thread.is_alive():
+            return False
+        failed = self.failed
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout) and self.failed == failed
+
+    def close(self, timeout=None):
+        """Writes any buffered responses and stops the writer thread.
+
+        Returns False if it timed out or a response could not be stored.
+        """
+        failed = self.failed
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        return not self._thread.is_alive() and self.failed == failed
+
+    def _run(self):
+        pending = []
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval if pending else None)
+            except queue.Empty:
+                pending = self._write(pending)
+                continue
+
+            if item is _STOP:
+                self._write(pending)
+                return
+            if isinstance(item, threading.Event):
+                pending = self._write(pending)
+                item.set()
+                continue
+
+            pending.append(item)
+            if len(pending) >= self.batch_size:
+                pending = self._write(pending)
+
+    def _write(self, items):
+        if not items:
+            return items
+        # The writer thread has no active tenant of its own: each batch goes to the engine its
+        # responses were recorded against, one transaction per database
+        batches = {}
+        for engine, row in items:
+            batches.setdefault(engine, []).append(row)
+        for engine, rows in batches.items():
+            try:
+                _insert(engine, rows)
+                self.written += len(rows)
+            except Exception:
+                # Retry one at a time: only the responses that fail on their own are lost
+                for row in rows:
+                    try:
+                        _insert(engine, [row])
+                        self.written += 1
+                    except Exception as e:
+                        self.failed += 1
+                        print(f"Error recording response to question {row['question_id']}: {e}")
+        return []
+
+
+def _insert(engine, rows):
+    with engine.begin() as connection:
+        connection.execute(insert(Response.__table__), rows)
+        record_responses(connection, rows) # Per-question counters, in the same transaction
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    """Returns the process-wide ResponseRecorder, starting it on first use."""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = ResponseRecorder()
+            atexit.register(_recorder.close)
+        return _recorder
+
+
+def close_recorder(timeout=None):
+    """Flushes and stops the process-wide recorder, if one was started."""
+    with _recorder_lock:
+        if _recorder is not None:
+            _recorder.close(timeout)
+
+
+def _reset_after_fork():
+    # The writer thread does not survive fork; a child starts its own recorder on first use
+    global _recorder, _recorder_lock
+    _recorder = None
+    _recorder_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
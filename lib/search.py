@@ -0,0 +1,323 @@
+import math
+import os
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import chain
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.orm import Session
+from lib.cache import PerEngine
+from lib.database import get_db_session, get_engine
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.models.answer import Answer
+from lib.models.content_revision import ContentRevision, CONTENT_TABLES
+
+SEARCH_PAGE_SIZE = int(os.environ.get("QUIZ_SEARCH_PAGE_SIZE", 10))
+QUESTION_WEIGHT, ANSWER_WEIGHT = 2.0, 1.0 # A match in the question text counts double
+
+SearchHit = namedtuple("SearchHit", ["question_id", "question_text", "category_id", "score"])
+
+
+class SearchResults(namedtuple("SearchResults", ["hits", "total", "page", "page_size"])):
+    """One page of ranked matches; `total` counts matches on all pages."""
+
+    @property
+    def pages(self):
+        return max(1, math.ceil(self.total / self.page_size))
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def tokenize(value):
+    """Splits text into lowercase words without diacritics (like FTS5's unicode61 tokenizer)."""
+    if value is None or value.isascii():
+        return _TOKEN.findall((value or "").lower()) # Nothing to decompose
+    decomposed = unicodedata.normalize("NFKD", value)
+    return _TOKEN.findall("".join(c for c in decomposed if not unicodedata.combining(c)).lower())
+
+
+def fts_query(tokens):
+    """Builds an FTS5 MATCH expression: every word must match, the last one as a prefix."""
+    return " ".join(f'"{t}"' for t in tokens[:-1]) + f' "{tokens[-1]}"*'
+
+
+# --- SQLite FTS5 ---
+
+FTS_TABLE = "question_search"
+PENDING_TABLE = "search_pending"
+
+# One document per question (rowid = question ID): its text plus all its answer texts.
+# Triggers only note which questions changed (a cheap keyed insert, so bulk imports stay
+# fast); sync_search_index() then re-indexes those questions with set-based statements.
+FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(question, answers, "
+    f"tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TABLE IF NOT EXISTS {PENDING_TABLE} (question_id INTEGER PRIMARY KEY)",
+) + tuple(
+    f"CREATE TRIGGER IF NOT EXISTS trg_{table}_search_{name} AFTER {when} ON {table} BEGIN "
+    + " ".join(f"INSERT OR IGNORE INTO {PENDING_TABLE}(question_id) VALUES ({row}.{column});" for row in rows)
+    + " END"
+    for table, column, name, when, rows in (
+        ("questions", "id", "insert", "INSERT", ("NEW",)),
+        ("questions", "id", "update", "UPDATE OF text", ("NEW",)),
+        ("questions", "id", "delete", "DELETE", ("OLD",)),
+        ("answers", "question_id", "insert", "INSERT", ("NEW",)),
+        ("answers", "question_id", "update", "UPDATE OF text, question_id", ("OLD", "NEW")),
+        ("answers", "question_id", "delete", "DELETE", ("OLD",)),
+    )
+)
+
+SYNC_STATEMENTS = (
+    f"DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT question_id FROM {PENDING_TABLE})",
+    f"INSERT INTO {FTS_TABLE}(rowid, question, answers) "
+    f"SELECT q.id, q.text, (SELECT group_concat(a.text, ' ') FROM answers a WHERE a.question_id = q.id) "
+    f"FROM {PENDING_TABLE} p JOIN questions q ON q.id = p.question_id",
+    f"DELETE FROM {PENDING_TABLE}",
+)
+
+
+def fts5_available(conn):
+    if conn.dialect.name != "sqlite":
+        return False
+    return bool(conn.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar())
+
+
+def create_search_index(conn):
+    """Creates the FTS5 table and its change-tracking triggers, indexing existing rows.
+    Returns False when the database has no FTS5 (searches then use the in-memory index)."""
+    if not fts5_available(conn):
+        return False
+    exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                          {"name": FTS_TABLE}).scalar()
+    for statement in FTS_DDL:
+        conn.execute(text(statement))
+    if not exists:
+        conn.execute(text(f"INSERT OR IGNORE INTO {PENDING_TABLE}(question_id) SELECT id FROM questions"))
+    sync_fts_index(conn)
+    return True
+
+
+def sync_fts_index(conn):
+    """Re-indexes every question changed since the last sync, in the caller's transaction.
+
+    Writes nothing when no change is pending, so an up-to-date search takes no write lock.
+    """
+    if conn.execute(text(f"SELECT 1 FROM {PENDING_TABLE} LIMIT 1")).first() is None:
+        return
+    for statement in SYNC_STATEMENTS:
+        conn.execute(text(statement))
+
+
+class FTSSearchIndex:
+    """Ranked search with SQLite FTS5 (bm25)."""
+
+    def __init__(self):
+        self._ready = False
+
+    def sync(self, session):
+        self._sync(session.connection())
+
+    def _sync(self, connection):
+        # Databases built by migrations already have the index; others (e.g. create_all) get it now
+        if self._ready:
+            sync_fts_index(connection)
+        else:
+            self._ready = create_search_index(connection)
+
+    def search(self, tokens, category_id, page, page_size):
+        # Sync and query in a transaction of their own: the caller's session is neither committed
+        # nor read from (an open one could still see the index as it was before the sync)
+        with get_engine().begin() as connection:
+            self._sync(connection)
+            return self._query(connection, tokens, category_id, page, page_size)
+
+    def _query(self, connection, tokens, category_id, page, page_size):
+        where = f"{FTS_TABLE} MATCH :match" + (" AND q.category_id = :category_id" if category_id else "")
+        params = {"match": fts_query(tokens), "category_id": category_id}
+        source = f"FROM {FTS_TABLE} JOIN questions q ON q.id = {FTS_TABLE}.rowid WHERE {where}"
+        total = connection.execute(text(f"SELECT count(*) {source}"), params).scalar()
+        rows = connection.execute(text(
+            f"SELECT q.id, q.text, q.category_id, bm25({FTS_TABLE}, {QUESTION_WEIGHT}, {ANSWER_WEIGHT}) AS rank "
+            f"{source} ORDER BY rank, q.id LIMIT :limit OFFSET :offset"
+        ), {**params, "limit": page_size, "offset": (page - 1) * page_size})
+        return [SearchHit(q_id, q_text, cat_id, -rank) for q_id, q_text, cat_id, rank in rows], total
+
+
+# --- In-memory fallback ---
+
+class MemoryIndex:
+    """Inverted index (term -> {question_id: weighted term frequency}) ranked with BM25.
+
+    Used when the database has no FTS5. Built on first search, updated from ORM flushes
+    in this process, and rebuilt whenever the content revision shows a change it did not
+    see (imports, bulk SQL, other processes, cascading category deletes).
+    """
+
+    K1, B = 1.2, 0.75
+
+    def __init__(self):
+        self.revision = None # Content revision the index reflects; None means rebuild
+        self.postings = {}
+        self.docs = {} # question_id -> (category_id, text, weighted length, terms)
+        self._terms = None # Sorted vocabulary for prefix matches; None when out of date
+        self._total_length = 0.0
+        self._lock = threading.RLock()
+
+    def _add(self, question_id, category_id, question_text, answer_texts):
+        frequencies = {}
+        for weight, value in ((QUESTION_WEIGHT, question_text), (ANSWER_WEIGHT, " ".join(answer_texts))):
+            for token in tokenize(value):
+                frequencies[token] = frequencies.get(token, 0.0) + weight
+        for token, frequency in frequencies.items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = {}
+                self._terms = None
+            postings[question_id] = frequency
+        length = sum(frequencies.values())
+        self.docs[question_id] = (category_id, question_text, length, tuple(frequencies))
+        self._total_length += length
+
+    def _remove(self, question_id):
+        doc = self.docs.pop(question_id, None)
+        if doc is None:
+            return
+        self._total_length -= doc[2]
+        for token in doc[3]:
+            postings = self.postings[token]
+            postings.pop(question_id, None)
+            if not postings:
+                del self.postings[token]
+                self._terms = None
+
+    def _load(self, connection, question_ids=None):
+        """Indexes questions (all, or just question_ids) as currently stored."""
+        query = (select(Question.id, Question.category_id, Question.text, Answer.text)
+                 .outerjoin(Answer, Answer.question_id == Question.id).order_by(Question.id, Answer.id))
+        if question_ids is not None:
+            query = query.where(Question.id.in_(question_ids))
+        current, answers = None, []
+        for question_id, category_id, question_text, answer_text in connection.execute(query):
+            if current is None or current[0] != question_id:
+                if current:
+                    self._add(*current, answers)
+                current, answers = (question_id, category_id, question_text), []
+            if answer_text is not None:
+                answers.append(answer_text)
+        if current:
+            self._add(*current, answers)
+
+    def sync(self, session):
+        pass # Checked against the content revision on every search
+
+    def _rebuild(self, session, revision):
+        self.postings, self.docs, self._terms, self._total_length = {}, {}, None, 0.0
+        self._load(session.connection())
+        self.revision = revision
+
+    def refresh(self, connection, question_ids):
+        """Re-reads the given questions after they (or their answers) changed."""
+        with self._lock:
+            if self.revision is None:
+                return
+            for question_id in question_ids:
+                self._remove(question_id)
+            self._load(connection, question_ids)
+
+    def _matching(self, token, prefix):
+        if not prefix:
+            return self.postings.get(token, {})
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+        merged = {}
+        for term in self._terms[bisect_left(self._terms, token):]:
+            if not term.startswith(token):
+                break
+            for question_id, frequency in self.postings[term].items():
+                merged[question_id] = merged.get(question_id, 0.0) + frequency
+        return merged
+
+    def search(self, tokens, category_id, page, page_size):
+        session = get_db_session()
+        revision = ContentRevision.current()
+        with self._lock:
+            if self.revision != revision:
+                self._rebuild(session, revision)
+            postings = [self._matching(t, prefix=i == len(tokens) - 1) for i, t in enumerate(tokens)]
+            postings.sort(key=len)
+            candidates = [q for q in postings[0] if all(q in p for p in postings[1:])]
+            if category_id:
+                candidates = [q for q in candidates if self.docs[q][0] == category_id]
+
+            count, average = len(self.docs), (self._total_length / len(self.docs) if self.docs else 1.0)
+            idf = [math.log(1 + (count - len(p) + 0.5) / (len(p) + 0.5)) for p in postings]
+            def score(question_id):
+                norm = self.K1 * (1 - self.B + self.B * self.docs[question_id][2] / average)
+                return sum(w * p[question_id] * (self.K1 + 1) / (p[question_id] + norm) for w, p in zip(idf, postings))
+            ranked = sorted(((score(q), q) for q in candidates), key=lambda pair: (-pair[0], pair[1]))
+            start = (page - 1) * page_size
+            hits = [SearchHit(q, self.docs[q][1], self.docs[q][0], s) for s, q in ranked[start:start + page_size]]
+        return hits, len(ranked)
+
+
+# One backend per database (the default one and each tenant). Built on the caller's
+# connection: a pooled checkout here could reset a shared (StaticPool) one
+_indexes = PerEngine(lambda engine: FTSSearchIndex() if fts5_available(get_db_session().connection()) else MemoryIndex())
+
+
+def get_search_index():
+    """Returns the search backend for the current engine: FTS5 if available, else in memory."""
+    return _indexes.get()
+
+
+def sync_search_index(session):
+    """Brings the search index up to date with the session's pending writes."""
+    get_search_index().sync(session)
+
+
+def search_questions(query, category_id=None, page=1, page_size=SEARCH_PAGE_SIZE):
+    """Searches question and answer texts; returns SearchResults ranked best first.
+
+    Every word must match (the last one as a prefix, so partly typed words work).
+    """
+    page = max(1, page)
+    tokens = tokenize(query)
+    if not tokens:
+        return SearchResults([], 0, page, page_size)
+    hits, total = get_search_index().search(tokens, category_id, page, page_size)
+    return SearchResults(hits, total, page, page_size)
+
+
+@event.listens_for(Session, "after_flush")
+def _update_memory_index(session, flush_context):
+    """Keeps an in-memory index in step with ORM writes (FTS5 is kept in sync by triggers)."""
+    index = _indexes.peek(session.get_bind())
+    if not isinstance(index, MemoryIndex) or index.revision is None:
+        return
+    changed = set()
+    content_changed = False
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if getattr(obj, "__tablename__", None) not in CONTENT_TABLES:
+            continue
+        content_changed = True
+        if isinstance(obj, Question):
+            changed.add(obj.id)
+        elif isinstance(obj, Answer):
+            changed.add(obj.question_id)
+            changed.update(inspect(obj).attrs.question_id.history.deleted or ()) # Moved from another question
+        elif isinstance(obj, Category) and obj in session.deleted:
+            index.revision = None # Its questions went by cascade; rebuild on next search
+            return
+    if content_changed:
+        with index._lock:
+            if index.revision is not None:
+                index.revision += 1 # Matches the bump made by this flush
+                index.refresh(session.connection(), changed - {None})
@@ -0,0 +1,406 @@
+import asyncio
+import json
+import os
+import secrets
+import signal
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from lib.database import close_db_session
+from lib.cache import TTLCache
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.models.attempt import Attempt
+from lib.models.content_revision import ContentRevision
+from lib.leaderboard import top_players
+from lib.profiling import operation
+from lib.quiz import QuizEngine
+from lib.recorder import get_recorder
+from lib.session_store import ActiveQuiz, LocalSessionStore
+from lib.snapshot import CategoryInfo
+
+DB_THREADS = int(os.environ.get("QUIZ_SERVER_DB_THREADS", 8)) # Threads for blocking database calls
+SESSION_IDLE_TIMEOUT = float(os.environ.get("QUIZ_SESSION_IDLE_TIMEOUT", 1800)) # Seconds
+QUIZ_CACHE_TTL = 30.0 # Seconds a loaded category quiz is reused for new sessions
+MAX_BODY_SIZE = 64 * 1024
+KEEP_ALIVE_TIMEOUT = 30.0
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def question_payload(question):
+    """Serializes a question without revealing which answers are correct."""
+    if question is None:
+        return None
+    return {
+        "id": question.id,
+        "text": question.text,
+        "answers": [{"id": a.id, "text": a.text} for a in question.answers],
+    }
+
+
+def next_answerable_question(quiz_session):
+    """Advances to the next question that has answers, skipping any without."""
+    question = quiz_session.next_question()
+    while question is not None and not question.answers:
+        quiz_session.skip()
+        question = quiz_session.next_question()
+    return question
+
+
+class DatabaseContent:
+    """Quiz content read through the models; calls block, so the service runs them on its thread pool."""
+
+    blocking = True
+
+    def __init__(self):
+        self.engines = TTLCache(max_size=1024, ttl=QUIZ_CACHE_TTL) # category_id -> QuizEngine
+
+    @property
+    def revision(self):
+        return ContentRevision.current()
+
+    def list_categories(self):
+        return [CategoryInfo(c.id, c.name, len(Question.ids_for_category(c.id))) for c in Category.get_all()]
+
+    def engine(self, category_id, n=None, seed=None):
+        if n is not None:
+            quiz = Question.sample(category_id, n, seed)
+            return QuizEngine(quiz) if quiz else None
+        engine = self.engines.get(category_id)
+        if engine is None:
+            quiz = Category.load_quiz(category_id)
+            if quiz is None:
+                return None
+            engine = QuizEngine(quiz)
+            self.engines.set(category_id, engine)
+        return engine
+
+
+class QuizService:
+    """Quiz API independent of the transport. The event loop never blocks on the database:
+    model calls run on a small thread pool, and content may come from an in-memory
+    ContentSnapshot instead. Sessions live in a LocalSessionStore, or a SharedSessionStore
+    when several worker processes serve the same sessions."""
+
+    def __init__(self, db_threads=DB_THREADS, recorder=None, content=None, sessions=None):
+        self.executor = ThreadPoolExecutor(max_workers=db_threads, thread_name_prefix="quiz-db")
+        self.recorder = recorder or get_recorder()
+        self.content = content or DatabaseContent()
+        self.sessions = sessions if sessions is not None else LocalSessionStore()
+
+    async def run_db(self, fn, *args):
+        """Runs a blocking model call on the database thread pool."""
+        def call():
+            try:
+                with operation(f"server: {getattr(fn, '__name__', 'call')}"):
+                    return fn(*args)
+            finally:
+                close_db_session() # Pool threads are reused; never leak a session between calls
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    async def run_content(self, fn, *args):
+        """Calls a content method, off the event loop only if it reads the database."""
+        if getattr(self.content, "blocking", False):
+            return await self.run_db(fn, *args)
+        return fn(*args)
+
+    async def list_categories(self):
+        categories = await self.run_content(self.content.list_categories)
+        return [{"id": c.id, "name": c.name, "questions": c.question_count} for c in categories]
+
+    async def start_quiz(self, category_id, n=None, player=None):
+        seed = secrets.randbits(62) # Makes the session reproducible from a few counters
+        def build():
+            # Rebuilt sessions are checked against the revision they were sampled from
+            revision = getattr(self.content, "revision", None) if self.sessions.rebuilds_sessions else None
+            return self.content.engine(category_id, n, seed), revision
+        engine, revision = await self.run_content(build)
+        if engine is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Category {category_id} not found")
+        if not len(engine):
+            raise HTTPError(HTTPStatus.CONFLICT, f"Category {category_id} has no questions")
+
+        quiz_session = engine.start(seed=seed)
+        def start_attempt():
+            attempt = Attempt.start(category_id, quiz_session.total, player)
+            return attempt.id if attempt else None
+        attempt_id = await self.run_db(start_attempt)
+
+        active = ActiveQuiz(quiz_session, attempt_id, category_id, n, revision=revision)
+        question = next_answerable_question(quiz_session)
+        session_id = self.sessions.create(active)
+        if session_id is None:
+            await self._finish(active, completed=False)
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Too many active quiz sessions")
+        if question is None:
+            await self._finish(active, completed=True)
+        return {"session_id": session_id, "total": quiz_session.total, "position": quiz_session.position,
+                "question": question_payload(question)}
+
+    async def leaderboard(self, category_id=None):
+        def read():
+            if category_id is not None and Category.find_by_id(category_id) is None:
+                return None
+            return top_players(category_id=category_id)
+        entries = await self.run_db(read)
+        if entries is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Category {category_id} not found")
+        return [{"rank": e.rank, "player": e.player, "points": e.points, "attempts": e.attempts,
+                 "answered": e.answered, "accuracy": round(e.accuracy, 4)} for e in entries]
+
+    async def _active(self, session_id):
+        if self.sessions.rebuilds_sessions:
+            active = await self.run_content(self.sessions.get, session_id, self.content)
+        else:
+            active = self.sessions.get(session_id)
+        if active is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Unknown or expired quiz session")
+        if active.stale:
+            # Its questions may not be the ones the player was shown: end it with the score so far
+            self.sessions.remove(session_id)
+            await self._finish(active, completed=False)
+            raise HTTPError(HTTPStatus.CONFLICT, "The quiz content changed since this quiz started; start a new quiz")
+        return active
+
+    async def get_quiz(self, session_id):
+        active = await self._active(session_id)
+        quiz_session = active.quiz_session
+        return {"session_id": session_id, "total": quiz_session.total, "position": quiz_session.position,
+                "score": quiz_session.score, "finished": quiz_session.finished,
+                "question": question_payload(quiz_session.current)}
+
+    async def answer(self, session_id, answer_id):
+        active = await self._active(session_id)
+        quiz_session = active.quiz_session
+        if quiz_session.current is None:
+            raise HTTPError(HTTPStatus.CONFLICT, "No question is awaiting an answer")
+        if not any(a.id == answer_id for a in quiz_session.current.answers):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Answer {answer_id} is not an answer to the current question")
+        result = quiz_session.answer(answer_id)
+        if active.attempt_id:
+            self.recorder.record(active.attempt_id, result.question_id, result.answer_id, result.is_correct)
+
+        question = next_answerable_question(quiz_session)
+        self.sessions.save(session_id, active)
+        if question is None:
+            await self._finish(active, completed=True)
+        correct = result.correct_answer
+        return {"correct": result.is_correct,
+                "correct_answer": {"id": correct.id, "text": correct.text} if correct else None,
+                "score": quiz_session.score, "position": quiz_session.position, "total": quiz_session.total,
+                "finished": question is None, "question": question_payload(question)}
+
+    async def results(self, session_id):
+        active = await self._active(session_id)
+        quiz_session = active.quiz_session
+        return {"session_id": session_id, "score": quiz_session.score, "answered": quiz_session.answered,
+                "total": quiz_session.total, "percentage": round(quiz_session.percentage, 2),
+                "finished": quiz_session.finished}
+
+    async def end_quiz(self, session_id):
+        active = await self._active(session_id)
+        if not active.quiz_session.finished:
+            await self._finish(active, completed=False)
+        self.sessions.remove(session_id)
+        return {"session_id": session_id, "score": active.quiz_session.score}
+
+    async def _finish(self, active, completed):
+        if not active.attempt_id:
+            return
+        def finish():
+            if not self.recorder.flush():
+                print(f"Error: not every response of attempt {active.attempt_id} was stored")
+            attempt = Attempt.find_by_id(active.attempt_id)
+            if attempt:
+                attempt.finish(active.quiz_session.score, completed=completed)
+        await self.run_db(finish)
+
+    async def expire_idle_sessions(self, idle_timeout=SESSION_IDLE_TIMEOUT):
+        """Drops sessions idle for longer than idle_timeout, recording them as interrupted."""
+        cutoff = time.time() - idle_timeout
+        if self.sessions.rebuilds_sessions:
+            idle = await self.run_content(self.sessions.pop_idle, cutoff, self.content)
+        else:
+            idle = self.sessions.pop_idle(cutoff)
+        for active in idle:
+            if not active.quiz_session.finished:
+                await self._finish(active, completed=False)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+# --- HTTP transport ---
+
+def _json_body(body):
+    if not body:
+        return {}
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body must be JSON")
+    if not isinstance(data, dict):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+    return data
+
+
+def _int_field(data, name, required=True, minimum=None):
+    value = data.get(name)
+    if value is None and not required:
+        return None
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"'{name}' must be an integer")
+    if minimum is not None and value < minimum:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"'{name}' must be at least {minimum}")
+    return value
+
+
+def _str_field(data, name):
+    value = data.get(name)
+    if value is not None and not isinstance(value, str):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"'{name}' must be a string")
+    return value
+
+
+async def dispatch(service, method, path, body):
+    """Routes a request to the QuizService and returns (status, payload)."""
+    parts = [p for p in path.split("?", 1)[0].split("/") if p]
+
+    if parts == ["health"] and method == "GET":
+        return HTTPStatus.OK, {"status": "ok", "sessions": len(service.sessions)}
+    if parts == ["categories"] and method == "GET":
+        return HTTPStatus.OK, await service.list_categories()
+    if parts == ["leaderboard"] and method == "GET":
+        return HTTPStatus.OK, await service.leaderboard()
+    if len(parts) == 3 and parts[0] == "categories" and parts[2] == "leaderboard" and method == "GET":
+        if not parts[1].isdigit():
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Category ID must be an integer")
+        return HTTPStatus.OK, await service.leaderboard(int(parts[1]))
+    if parts == ["quizzes"] and method == "POST":
+        data = _json_body(body)
+        return HTTPStatus.CREATED, await service.start_quiz(
+            _int_field(data, "category_id"), n=_int_field(data, "questions", required=False, minimum=1),
+            player=_str_field(data, "player"))
+    if len(parts) >= 2 and parts[0] == "quizzes":
+        session_id = parts[1]
+        if len(parts) == 2 and method == "GET":
+            return HTTPStatus.OK, await service.get_quiz(session_id)
+        if len(parts) == 2 and method == "DELETE":
+            return HTTPStatus.OK, await service.end_quiz(session_id)
+        if parts[2:] == ["answers"] and method == "POST":
+            return HTTPStatus.OK, await service.answer(session_id, _int_field(_json_body(body), "answer_id"))
+        if parts[2:] == ["results"] and method == "GET":
+            return HTTPStatus.OK, await service.results(session_id)
+    raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {method} {path}")
+
+
+async def _read_request(reader):
+    request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+    if not request_line:
+        return None
+    try:
+        method, path, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = headers.get("content-length") or "0"
+    if not (length.isascii() and length.isdigit()):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Content-Length must be a non-negative integer")
+    length = int(length)
+    if length > MAX_BODY_SIZE:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+    return method.upper(), path, body, keep_alive
+
+
+def _write_response(writer, status, payload, keep_alive):
+    body = json.dumps(payload).encode("utf-8")
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+
+
+async def handle_connection(service, reader, writer):
+    """Serves HTTP/1.1 requests (with keep-alive) on one client connection."""
+    try:
+        while True:
+            keep_alive = False
+            try:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, body, keep_alive = request
+                status, payload = await dispatch(service, method, path, body)
+            except HTTPError as e:
+                status, payload = e.status, {"error": e.message}
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                break
+            except Exception:
+                # Logged here only: the message may hold SQL or other internals
+                traceback.print_exc()
+                status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"}
+            _write_response(writer, status, payload, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+async def _expire_sessions_periodically(service):
+    while True:
+        await asyncio.sleep(60)
+        await service.expire_idle_sessions()
+
+
+async def start_server(service, host="127.0.0.1", port=8000, sock=None):
+    """Starts listening (on host/port, or an already bound socket) and returns the asyncio server."""
+    handler = lambda reader, writer: handle_connection(service, reader, writer)
+    if sock is not None:
+        return await asyncio.start_server(handler, sock=sock, backlog=1024)
+    return await asyncio.start_server(handler, host, port, backlog=1024)
+
+
+async def serve(host="127.0.0.1", port=8000, sock=None, content=None, sessions=None):
+    """Serves the quiz API until cancelled or sent SIGTERM."""
+    service = QuizService(content=content, sessions=sessions)
+    server = await start_server(service, host, port, sock=sock)
+    expiry = asyncio.create_task(_expire_sessions_periodically(service))
+    loop = asyncio.get_running_loop()
+    stopped = loop.create_future()
+    loop.add_signal_handler(signal.SIGTERM, lambda: stopped.done() or stopped.set_result(None))
+    addresses = ", ".join(str(s.getsockname()) for s in server.sockets)
+    print(f"Quiz API listening on {addresses} (pid {os.getpid()})")
+    try:
+        async with server:
+            await stopped
+    finally:
+        loop.remove_signal_handler(signal.SIGTERM)
+        expiry.cancel()
+        service.close()
+
+
+def run_server(host="127.0.0.1", port=8000):
+    """Runs the quiz API until interrupted."""
+    try:
+        asyncio.run(serve(host, port))
+    except KeyboardInterrupt:
+        print("Quiz API stopped.")
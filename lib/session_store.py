@@ -0,0 +1,179 @@
+import mmap
+import multiprocessing
+import os
+import secrets
+import struct
+import time
+
+MAX_SESSIONS = int(os.environ.get("QUIZ_MAX_SESSIONS", 100000)) # Slots in the shared session table
+
+
+class ActiveQuiz:
+    """Server-side state for one quiz taker."""
+
+    __slots__ = ("quiz_session", "attempt_id", "category_id", "sample_size", "last_seen", "revision", "stale")
+
+    def __init__(self, quiz_session, attempt_id, category_id, sample_size=0, last_seen=None, revision=None):
+        self.quiz_session = quiz_session
+        self.attempt_id = attempt_id
+        self.category_id = category_id
+        self.sample_size = sample_size or 0 # 0 means the whole category
+        self.last_seen = last_seen if last_seen is not None else time.time()
+        self.revision = revision # Content revision the quiz was built from, if known
+        self.stale = False # Rebuilt from content that changed since: its questions may not be the ones served
+
+
+class LocalSessionStore:
+    """Quiz sessions kept as live objects in this process (single worker)."""
+
+    rebuilds_sessions = False
+
+    def __init__(self):
+        self._sessions = {}
+
+    def create(self, active):
+        session_id = secrets.token_urlsafe(16)
+        self._sessions[session_id] = active
+        return session_id
+
+    def get(self, session_id, content=None):
+        active = self._sessions.get(session_id)
+        if active is not None:
+            active.last_seen = time.time()
+        return active
+
+    def save(self, session_id, active):
+        pass # Sessions are mutated in place
+
+    def remove(self, session_id):
+        self._sessions.pop(session_id, None)
+
+    def pop_idle(self, cutoff, content=None):
+        idle = [(sid, a) for sid, a in self._sessions.items() if a.last_seen < cutoff]
+        for session_id, _ in idle:
+            del self._sessions[session_id]
+        return [active for _, active in idle]
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SharedSessionStore:
+    """Fixed-size table of quiz session records in anonymous shared memory.
+
+    Created before forking, so every worker sees the same table and any worker can serve
+    any session: a record holds only counters, and the QuizSession is rebuilt from the
+    shared content with QuizEngine.resume(). A session rebuilt from content at another
+    revision than it started on (e.g. after a reload) is marked stale, since replaying
+    its counters there would serve different questions. Session IDs are "<slot>-<nonce>".
+    """
+
+    # nonce, state, category_id, sample_size, seed, revision (-1: unknown), position, score, answered,
+    # attempt_id, awaiting, last_seen
+    RECORD = struct.Struct("<qqqqqqqqqqqd")
+    HEADER = struct.Struct("<qq") # next free-slot hint, active session count
+    FREE, ACTIVE = 0, 1
+    rebuilds_sessions = True # get() and pop_idle() read content to rebuild QuizSessions
+
+    def __init__(self, max_sessions=MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._mmap = mmap.mmap(-1, self.HEADER.size + self.RECORD.size * max_sessions) # MAP_SHARED, inherited by fork
+        self._lock = multiprocessing.Lock()
+
+    def _offset(self, slot):
+        return self.HEADER.size + slot * self.RECORD.size
+
+    def _write(self, slot, nonce, active):
+        quiz_session = active.quiz_session
+        self.RECORD.pack_into(
+            self._mmap, self._offset(slot), nonce, self.ACTIVE, active.category_id, active.sample_size,
+            quiz_session.seed, -1 if active.revision is None else active.revision,
+            quiz_session.position, quiz_session.score, quiz_session.answered, active.attempt_id or 0, int(quiz_session.current is not None), active.last_seen,
+        )
+
+    def _rebuild(self, record, content):
+        (_, _, category_id, sample_size, seed, revision, position, score, answered, attempt_id, awaiting,
+         last_seen) = record
+        engine = content.engine(category_id, sample_size or None, seed)
+        if engine is None:
+            return None # Category deleted since the quiz started
+        quiz_session = engine.resume(seed, position, score, answered, bool(awaiting))
+        active = ActiveQuiz(quiz_session, attempt_id or None, category_id, sample_size, last_seen,
+                            None if revision < 0 else revision)
+        current = getattr(content, "revision", None)
+        active.stale = active.revision is not None and current is not None and current != active.revision
+        return active
+
+    @staticmethod
+    def _parse(session_id):
+        try:
+            slot, nonce = session_id.split("-", 1)
+            return int(slot), int(nonce, 16)
+        except (AttributeError, ValueError):
+            return None, None
+
+    def create(self, active):
+        """Stores a new seeded session; returns its ID, or None when the table is full."""
+        if active.quiz_session.seed is None:
+            raise ValueError("Shared sessions must be started with a seed")
+        nonce = secrets.randbits(62)
+        with self._lock:
+            hint, count = self.HEADER.unpack_from(self._mmap, 0)
+            for i in range(self.max_sessions):
+                slot = (hint + i) % self.max_sessions
+                if self.RECORD.unpack_from(self._mmap, self._offset(slot))[1] == self.FREE:
+                    self._write(slot, nonce, active)
+                    self.HEADER.pack_into(self._mmap, 0, (slot + 1) % self.max_sessions, count + 1)
+                    return f"{slot}-{nonce:x}"
+        return None
+
+    def get(self, session_id, content):
+        slot, nonce = self._parse(session_id)
+        if slot is None or not 0 <= slot < self.max_sessions:
+            return None
+        with self._lock:
+            record = self.RECORD.unpack_from(self._mmap, self._offset(slot))
+            if record[0] != nonce or record[1] != self.ACTIVE:
+                return None
+            struct.pack_into("<d", self._mmap, self._offset(slot) + self.RECORD.size - 8, time.time())
+        return self._rebuild(record, content)
+
+    def save(self, session_id, active):
+        slot, nonce = self._parse(session_id)
+        active.last_seen = time.time()
+        with self._lock:
+            if self.RECORD.unpack_from(self._mmap, self._offset(slot))[0] == nonce:
+                self._write(slot, nonce, active)
+
+    def remove(self, session_id):
+        slot, nonce = self._parse(session_id)
+        if slot is None:
+            return
+        with self._lock:
+            offset = self._offset(slot)
+            record = self.RECORD.unpack_from(self._mmap, offset)
+            if record[0] == nonce and record[1] == self.ACTIVE:
+                self._free(slot, offset)
+
+    def _free(self, slot, offset):
+        self.RECORD.pack_into(self._mmap, offset, 0, self.FREE, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0.0)
+        hint, count = self.HEADER.unpack_from(self._mmap, 0)
+        self.HEADER.pack_into(self._mmap, 0, hint, count - 1)
+
+    def pop_idle(self, cutoff, content):
+        """Frees sessions last used before cutoff and returns them (for recording as interrupted)."""
+        idle = []
+        with self._lock:
+            for slot in range(self.max_sessions):
+                offset = self._offset(slot)
+                record = self.RECORD.unpack_from(self._mmap, offset)
+                if record[1] == self.ACTIVE and record[-1] < cutoff:
+                    idle.append(record)
+                    self._free(slot, offset)
+        return [active for active in (self._rebuild(record, content) for record in idle) if active]
+
+    def __len__(self):
+        return self.HEADER.unpack_from(self._mmap, 0)[1]
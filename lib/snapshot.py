@@ -0,0 +1,71 @@
+import random
+from collections import namedtuple
+from sqlalchemy import select
+from lib.database import get_db_session, close_db_session
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.models.answer import Answer
+from lib.models.content_revision import ContentRevision
+from lib.quiz import Quiz, QuizEngine, build_quiz
+
+CategoryInfo = namedtuple("CategoryInfo", ["id", "name", "question_count"])
+
+
+class ContentSnapshot:
+    """All quiz content as immutable tuples plus a ready QuizEngine per category.
+
+    Built once (e.g. by a pre-fork parent) and then only read, so forked workers share it
+    copy-on-write and never query the database for content.
+    """
+
+    def __init__(self, revision, quizzes):
+        self.revision = revision
+        self.quizzes = quizzes # category_id -> Quiz
+        self.engines = {category_id: QuizEngine(quiz) for category_id, quiz in quizzes.items()}
+        self.categories = tuple(
+            CategoryInfo(quiz.category_id, quiz.category_name, len(quiz.questions))
+            for quiz in sorted(quizzes.values(), key=lambda q: q.category_id)
+        )
+
+    @classmethod
+    def build(cls):
+        """Reads every category, question and answer in one ordered query."""
+        session = get_db_session()
+        try:
+            revision = ContentRevision.current()
+            names = dict(session.execute(select(Category.id, Category.name)).all())
+            rows = session.execute(
+                select(Question.category_id, Question.id, Question.text, Answer.id, Answer.text, Answer.is_correct)
+                .outerjoin(Answer, Answer.question_id == Question.id)
+                .order_by(Question.category_id, Question.id, Answer.id)
+            )
+            grouped = {category_id: [] for category_id in names}
+            for category_id, *row in rows:
+                grouped[category_id].append(row)
+        finally:
+            close_db_session()
+        quizzes = {category_id: build_quiz(category_id, names[category_id], grouped[category_id])
+                   for category_id in names}
+        return cls(revision, quizzes)
+
+    def list_categories(self):
+        return self.categories
+
+    def load_quiz(self, category_id):
+        return self.quizzes.get(category_id)
+
+    def engine(self, category_id, n=None, seed=None):
+        """Returns a QuizEngine for the whole category, or for n questions sampled with seed."""
+        engine = self.engines.get(category_id)
+        if engine is None or n is None or n >= len(engine):
+            return engine
+        return QuizEngine(self.sample(category_id, n, seed))
+
+    def sample(self, category_id, n, seed=None):
+        """Same selection rule as Question.sample, without touching the database."""
+        quiz = self.quizzes.get(category_id)
+        if quiz is None:
+            return None
+        # Questions are in ID order, so sampling positions picks the same IDs as sampling the ID array
+        positions = random.Random(seed).sample(range(len(quiz.questions)), max(0, min(n, len(quiz.questions))))
+        return Quiz(category_id, quiz.category_name, tuple(quiz.questions[i] for i in positions))
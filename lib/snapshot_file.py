@@ -0,0 +1,308 @@
+import hashlib
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from sqlalchemy import select
+from lib.cache import TTLCache
+from lib.database import get_db_session, close_db_session, get_engine
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.models.answer import Answer
+from lib.models.content_revision import ContentRevision
+from lib.quiz import Quiz, QuizQuestion, QuizAnswer, QuizEngine
+from lib.snapshot import CategoryInfo
+
+SNAPSHOT_PATH = os.environ.get("QUIZ_SNAPSHOT_PATH", os.path.join("instance", "quiz_snapshot.bin")) # Per tenant: quiz_snapshot.<tenant>.bin
+SNAPSHOT_READ_BATCH = 10000 # Rows fetched per round trip while writing
+
+MAGIC = b"QUIZSNAP"
+FORMAT_VERSION = 2
+BYTE_ORDERS = {"little": 1, "big": 2}
+
+# Sections in file order: (name, array typecode or None for raw bytes)
+SECTIONS = (
+    ("category_ids", "q"),             # [C] sorted ascending
+    ("category_question_start", "I"),  # [C+1] question index ranges per category
+    ("category_name_offsets", "Q"),    # [C+1] byte ranges into category_names
+    ("category_names", None),
+    ("question_ids", "q"),             # [Q] grouped by category, ascending within it
+    ("question_answer_start", "I"),    # [Q+1] answer index ranges per question
+    ("question_text_offsets", "Q"),    # [Q+1]
+    ("question_texts", None),
+    ("answer_ids", "q"),               # [A] ascending within each question
+    ("answer_text_offsets", "Q"),      # [A+1]
+    ("answer_texts", None),
+    ("answer_correct", None),          # Bitset, bit i set if answer i is correct
+)
+
+# magic, format version, byte order, database identity, revision, category/question/answer counts,
+# then (offset, length) per section
+HEADER = struct.Struct("<8sIIqqqqq" + "qq" * len(SECTIONS))
+
+SnapshotResult = namedtuple("SnapshotResult", ["path", "revision", "categories", "questions", "answers", "size", "seconds"])
+
+
+class SnapshotError(ValueError):
+    """Raised for a file that is not a readable quiz snapshot."""
+
+
+def snapshot_path():
+    """The default snapshot file of the active tenant (see lib.tenants), or of the default database."""
+    from lib.tenants import current_tenant # Import locally to avoid circular dependency
+
+    tenant = current_tenant()
+    if tenant is None:
+        return SNAPSHOT_PATH
+    root, extension = os.path.splitext(SNAPSHOT_PATH)
+    return f"{root}.{tenant}{extension}"
+
+
+def database_identity(engine=None):
+    """A 64-bit hash of the database URL, so a snapshot is never taken for another database's content."""
+    url = (engine or get_engine()).url.render_as_string(hide_password=True)
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+class _StringTable:
+    """UTF-8 strings packed end to end, with an offsets array of len(strings) + 1."""
+
+    def __init__(self):
+        self.offsets = array("Q", [0])
+        self.data = bytearray()
+
+    def append(self, text):
+        self.data += (text or "").encode("utf-8")
+        self.offsets.append(len(self.data))
+
+
+def write_snapshot(path=None):
+    """Writes all quiz content to a binary snapshot file (default: snapshot_path()) and returns a SnapshotResult.
+
+    Rows are streamed from one ordered query into compact arrays; the file is written
+    next to `path` and renamed over it, so readers never see a partial snapshot.
+    """
+    path = path or snapshot_path()
+    started = time.perf_counter()
+    session = get_db_session()
+    database = database_identity(session.get_bind())
+    try:
+        revision = ContentRevision.current()
+        categories = session.execute(select(Category.id, Category.name).order_by(Category.id)).all()
+        category_ids = array("q", (category_id for category_id, _ in categories))
+        category_names = _StringTable()
+        for _, name in categories:
+            category_names.append(name)
+
+        question_ids, answer_ids = array("q"), array("q")
+        question_category = array("q") # Only used to build category_question_start
+        answer_start = array("I", [0])
+        question_texts, answer_texts = _StringTable(), _StringTable()
+        correct = bytearray()
+
+        rows = session.execute(
+            select(Question.category_id, Question.id, Question.text, Answer.id, Answer.text, Answer.is_correct)
+            .outerjoin(Answer, Answer.question_id == Question.id)
+            .order_by(Question.category_id, Question.id, Answer.id)
+            .execution_options(yield_per=SNAPSHOT_READ_BATCH)
+        )
+        for category_id, question_id, question_text, answer_id, answer_text, is_correct in rows:
+            if not question_ids or question_ids[-1] != question_id:
+                if question_ids:
+                    answer_start.append(len(answer_ids))
+                question_ids.append(question_id)
+                question_category.append(category_id)
+                question_texts.append(question_text)
+            if answer_id is not None:
+                index = len(answer_ids)
+                if index % 8 == 0:
+                    correct.append(0)
+                if is_correct:
+                    correct[index >> 3] |= 1 << (index & 7)
+                answer_ids.append(answer_id)
+                answer_texts.append(answer_text)
+        answer_start.append(len(answer_ids))
+        if not question_ids:
+            answer_start = array("I", [0])
+    finally:
+        close_db_session()
+
+    # Questions are ordered by category ID, so each category's questions are one contiguous range
+    question_start = array("I", [0] * (len(category_ids) + 1))
+    position = 0
+    for i, category_id in enumerate(category_ids):
+        question_start[i] = position
+        while position < len(question_category) and question_category[position] == category_id:
+            position += 1
+    question_start[len(category_ids)] = position
+
+    sections = {
+        "category_ids": category_ids, "category_question_start": question_start,
+        "category_name_offsets": category_names.offsets, "category_names": category_names.data,
+        "question_ids": question_ids, "question_answer_start": answer_start,
+        "question_text_offsets": question_texts.offsets, "question_texts": question_texts.data,
+        "answer_ids": answer_ids, "answer_text_offsets": answer_texts.offsets, "answer_texts": answer_texts.data,
+        "answer_correct": correct,
+    }
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(bytes(HEADER.size))
+        layout = []
+        for name, _ in SECTIONS:
+            f.write(bytes(-f.tell() % 8)) # 8-byte align every section
+            data = sections[name]
+            layout += [f.tell(), len(data) * getattr(data, "itemsize", 1)]
+            f.write(data)
+        size = f.tell()
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDERS[sys.byteorder], database, revision,
+                            len(category_ids), len(question_ids), len(answer_ids), *layout))
+    os.replace(temp_path, path)
+    return SnapshotResult(path, revision, len(category_ids), len(question_ids), len(answer_ids),
+                          size, time.perf_counter() - started)
+
+
+class MappedSnapshot:
+    """Read-only view of a snapshot file written by write_snapshot().
+
+    The file is mapped, not read: opening it costs a header parse, and questions are
+    decoded into Quiz tuples only for the categories (or sampled questions) actually
+    used. Processes mapping the same file share its pages through the OS page cache.
+    Offers the same content interface as ContentSnapshot.
+    """
+
+    def __init__(self, path=None):
+        path = self.path = path or snapshot_path()
+        with open(path, "rb") as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError: # Empty file
+                raise SnapshotError(f"{path} is not a quiz snapshot")
+        if len(self._mmap) < HEADER.size:
+            self._mmap.close()
+            raise SnapshotError(f"{path} is not a quiz snapshot")
+        magic, version, byte_order, self.database, self.revision, *counts_and_layout = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mmap.close()
+            raise SnapshotError(f"{path} is not a version {FORMAT_VERSION} quiz snapshot")
+        if byte_order != BYTE_ORDERS[sys.byteorder]:
+            self._mmap.close()
+            raise SnapshotError(f"{path} was written on a machine with a different byte order")
+
+        self.category_count, self.question_count, self.answer_count = counts_and_layout[:3]
+        layout = counts_and_layout[3:]
+        view = memoryview(self._mmap)
+        self._views = [view]
+        for i, (name, typecode) in enumerate(SECTIONS):
+            offset, length = layout[2 * i], layout[2 * i + 1]
+            section = view[offset:offset + length]
+            if typecode:
+                section = section.cast(typecode)
+            self._views.append(section)
+            setattr(self, "_" + name, section)
+
+        self._categories = None
+        self.engines = TTLCache(max_size=256, ttl=float("inf")) # category_id -> QuizEngine; the file never changes
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _string(offsets, data, i):
+        return str(data[offsets[i]:offsets[i + 1]], "utf-8")
+
+    def _category_index(self, category_id):
+        i = bisect_left(self._category_ids, category_id)
+        if i < self.category_count and self._category_ids[i] == category_id:
+            return i
+        return None
+
+    def _question(self, q):
+        answers = tuple(
+            QuizAnswer(self._answer_ids[a], self._string(self._answer_text_offsets, self._answer_texts, a),
+                       bool(self._answer_correct[a >> 3] >> (a & 7) & 1))
+            for a in range(self._question_answer_start[q], self._question_answer_start[q + 1])
+        )
+        return QuizQuestion(self._question_ids[q],
+                            self._string(self._question_text_offsets, self._question_texts, q), answers)
+
+    def _category_name(self, i):
+        return self._string(self._category_name_offsets, self._category_names, i)
+
+    def list_categories(self):
+        if self._categories is None:
+            starts = self._category_question_start
+            self._categories = tuple(
+                CategoryInfo(self._category_ids[i], self._category_name(i), starts[i + 1] - starts[i])
+                for i in range(self.category_count)
+            )
+        return self._categories
+
+    def load_quiz(self, category_id):
+        i = self._category_index(category_id)
+        if i is None:
+            return None
+        questions = range(self._category_question_start[i], self._category_question_start[i + 1])
+        return Quiz(category_id, self._category_name(i), tuple(self._question(q) for q in questions))
+
+    def engine(self, category_id, n=None, seed=None):
+        """Returns a QuizEngine for the whole category, or for n questions sampled with seed."""
+        i = self._category_index(category_id)
+        if i is None:
+            return None
+        if n is not None and n < self._category_question_start[i + 1] - self._category_question_start[i]:
+            return QuizEngine(self.sample(category_id, n, seed))
+        engine = self.engines.get(category_id)
+        if engine is None:
+            engine = QuizEngine(self.load_quiz(category_id))
+            self.engines.set(category_id, engine)
+        return engine
+
+    def sample(self, category_id, n, seed=None):
+        """Same selection rule as Question.sample; decodes only the sampled questions."""
+        i = self._category_index(category_id)
+        if i is None:
+            return None
+        first, end = self._category_question_start[i], self._category_question_start[i + 1]
+        positions = random.Random(seed).sample(range(end - first), max(0, min(n, end - first)))
+        return Quiz(category_id, self._category_name(i), tuple(self._question(first + p) for p in positions))
+
+
+def open_current_snapshot(path=None):
+    """Opens the snapshot at path (default: snapshot_path()) if it exists, was written from the
+    current database and matches its content revision.
+
+    Returns None when there is no usable snapshot, so callers fall back to the database.
+    """
+    path = path or snapshot_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        snapshot = MappedSnapshot(path)
+    except (OSError, SnapshotError):
+        return None
+    try:
+        current = ContentRevision.current()
+    finally:
+        close_db_session()
+    if snapshot.database != database_identity() or snapshot.revision != current:
+        snapshot.close()
+        return None
+    return snapshot
@@ -0,0 +1,129 @@
+import heapq
+import os
+import time
+from collections import namedtuple
+from lib.database import get_db_session
+from lib.models.review_card import ReviewCard
+from lib.quiz import build_quiz
+
+STUDY_SESSION_SIZE = int(os.environ.get("QUIZ_STUDY_SESSION_SIZE", 50)) # Due cards loaded per study session
+NEW_CARDS_PER_SESSION = int(os.environ.get("QUIZ_NEW_CARDS_PER_SESSION", 10)) # Unseen questions added per session
+STUDY_FLUSH_EVERY = int(os.environ.get("QUIZ_STUDY_FLUSH_EVERY", 20)) # Reviews between writes to review_cards
+
+# SM-2 (SuperMemo 2): answers are graded 0-5 and 3 or more is a pass. Passing reviews space
+# the card out to 1 day, then 6, then the previous interval times the card's ease factor;
+# the ease factor follows the grades (never below 1.3). A failed card starts over and comes
+# back within the session after RELEARN_MINUTES.
+PASS_GRADE = 3
+START_EASE, MIN_EASE = 2500, 1300 # Ease factor x 1000
+RELEARN_MINUTES = 10
+LEARN_AHEAD_MINUTES = 20 # Cards due this soon are shown rather than ending the session
+MINUTES_PER_DAY = 24 * 60
+
+GRADE_AGAIN, GRADE_HARD, GRADE_GOOD, GRADE_EASY = 1, 3, 4, 5
+
+CardState = namedtuple("CardState", ["question_id", "due", "interval", "ease", "reps", "lapses"])
+
+
+def now_minutes():
+    """The current time in the unit card due times are stored in."""
+    return int(time.time() // 60)
+
+
+def new_card(question_id, now):
+    return CardState(question_id, now, 0, START_EASE, 0, 0)
+
+
+def schedule(card, grade, now):
+    """Returns the card's state after a review graded 0-5 at `now` (SM-2)."""
+    if grade < PASS_GRADE:
+        # Repetitions start over; the ease factor is kept
+        return card._replace(due=now + RELEARN_MINUTES, interval=0, reps=0, lapses=card.lapses + 1)
+    if card.reps == 0:
+        interval = 1
+    elif card.reps == 1:
+        interval = 6
+    else:
+        interval = max(card.interval + 1, round(card.interval * card.ease / 1000))
+    miss = 5 - grade
+    ease = max(MIN_EASE, card.ease + round(100 - miss * (80 + miss * 20)))
+    return card._replace(due=now + interval * MINUTES_PER_DAY, interval=interval, ease=ease, reps=card.reps + 1)
+
+
+def load_questions(question_ids):
+    """Returns {question_id: QuizQuestion} with answers, one query per 500 IDs."""
+    # Import locally to avoid circular dependency
+    from lib.models.answer import Answer
+    from lib.models.question import Question
+
+    ids, loaded = sorted(question_ids), {}
+    session = get_db_session()
+    for start in range(0, len(ids), 500):
+        rows = (session.query(Question.id, Question.text, Answer.id, Answer.text, Answer.is_correct)
+                .outerjoin(Answer, Answer.question_id == Question.id)
+                .filter(Question.id.in_(ids[start:start + 500]))
+                .order_by(Question.id, Answer.id)
+                .all())
+        loaded.update((q.id, q) for q in build_quiz(None, None, rows).questions)
+    return loaded
+
+
+class StudyDeck:
+    """One player's study session over their due cards (all categories, or one).
+
+    The due cards are read from the (player, due) index and kept in a heap ordered by due
+    time, followed by up to new_cards questions never studied. Each review reschedules its
+    card; cards failed in the session go back in the heap to be shown again. Changed cards
+    are written with one batched upsert every flush_every reviews and when the deck closes.
+    """
+
+    def __init__(self, player, category_id=None, now=None, size=STUDY_SESSION_SIZE,
+                 new_cards=NEW_CARDS_PER_SESSION, flush_every=STUDY_FLUSH_EVERY):
+        now = now_minutes() if now is None else now
+        self.player = player
+        self.flush_every = flush_every
+        self.cards = {row[0]: CardState(*row) for row in ReviewCard.due_cards(player, now, size, category_id)}
+        self.due_count = len(self.cards)
+        for question_id in ReviewCard.unseen_question_ids(player, new_cards, category_id):
+            self.cards[question_id] = new_card(question_id, now)
+        self.new_count = len(self.cards) - self.due_count
+        self.questions = load_questions(self.cards)
+        self.reviewed = 0
+        self._dirty = {}
+        self._heap = [(card.due, question_id) for question_id, card in self.cards.items() if question_id in self.questions]
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        """Cards still queued in this session."""
+        return len(self._heap)
+
+    def next_card(self, now=None):
+        """Removes and returns the QuizQuestion due soonest, or None when nothing is due within LEARN_AHEAD_MINUTES."""
+        now = now_minutes() if now is None else now
+        if not self._heap or self._heap[0][0] > now + LEARN_AHEAD_MINUTES:
+            return None
+        return self.questions[heapq.heappop(self._heap)[1]]
+
+    def review(self, question_id, grade, now=None):
+        """Reschedules a card after an answer graded 0-5; returns its new CardState."""
+        now = now_minutes() if now is None else now
+        card = self.cards[question_id] = schedule(self.cards[question_id], grade, now)
+        self._dirty[question_id] = card
+        self.reviewed += 1
+        if card.interval == 0:
+            heapq.heappush(self._heap, (card.due, question_id)) # Relearn in this session
+        if len(self._dirty) >= self.flush_every:
+            self.flush()
+        return card
+
+    def flush(self):
+        """Writes the changed cards with one statement; returns how many were written."""
+        if not self._dirty:
+            return 0
+        written = ReviewCard.save_all(self.player, self._dirty.values())
+        if written:
+            self._dirty.clear()
+        return written
+
+    def close(self):
+        return self.flush()
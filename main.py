@@ -1,29 +1,204 @@
 import sys
 import os
-import pytest
-from lib.cli import main_menu
-from lib.helpers import initialize_database
+import argparse
+
+# Commands are dispatched before anything heavy is imported: each one imports what it
+# needs, so `--help` and the first menu never load SQLAlchemy or pytest.
 
 # Set up the path for module imports
 # This ensures that 'lib' is recognized as a package
 sys.path.append(os.path.join(os.path.dirname(__file__), 'lib'))
 
+USAGE = """Usage: python main.py [command] [--profile] [--tenant ID]
+
+Without a command, starts the interactive menu.
+
+Commands:
+  initdb                  Create the schema and reseed the sample data
+  migrate [version]       Apply pending schema migrations
+  runtests                Run the unit tests
+  import <file> [format]  Import a CSV/JSON/JSONL question bank (QUIZ_IMPORT_DUPLICATE_POLICY=flag
+                          or reject also checks it for near-duplicates)
+  export [options]        Export the question bank (see 'export --help')
+  snapshot [file]         Write a binary content snapshot
+  dedupe [options]        Report near-duplicate questions
+  serve [options]         Serve the HTTP/JSON API
+  bench [options]         Run the benchmark suite
+  loadtest [options]      Simulate concurrent quiz takers
+  tenants <action>        List, create, migrate or copy between tenants (see 'tenants --help')
+
+--profile (or QUIZ_PROFILE=1) reports the queries behind every action.
+--tenant ID runs the command or menu against that tenant's database (see QUIZ_TENANT_URL)."""
+
 def run_cli():
+    from lib.cli import main_menu # Import locally; draws the first menu before any model loads
     print("Welcome to the Quiz App!")
     main_menu()
 
+def run_export(argv):
+    parser = argparse.ArgumentParser(prog="python main.py export", description="Export the question bank.")
+    parser.add_argument("--format", choices=["jsonl", "csv", "columnar"], default="jsonl")
+    parser.add_argument("--category", help="Only export this category (name or ID)")
+    parser.add_argument("--gzip", action="store_true", help="Gzip the output (implied by a .gz file name)")
+    parser.add_argument("-o", "--output", default="-", help="Output file (default: stdout)")
+    args = parser.parse_args(argv)
+    from lib.helpers import export_question_bank # Import locally; only needed for this command
+    export_question_bank(args.output, fmt=args.format, category=args.category, compress=args.gzip)
+
+def run_dedupe(argv):
+    parser = argparse.ArgumentParser(prog="python main.py dedupe", description="Report near-duplicate questions.")
+    parser.add_argument("--threshold", type=float, help="Minimum similarity, 0-1 (default: QUIZ_DUPLICATE_THRESHOLD or 0.8)")
+    parser.add_argument("--category", help="Only check this category (name or ID)")
+    args = parser.parse_args(argv)
+    from lib.helpers import report_duplicates # Import locally; only needed for this command
+    report_duplicates(args.threshold, args.category)
+
+def run_bench(argv):
+    parser = argparse.ArgumentParser(prog="python main.py bench", description="Time model, quiz and bulk operations.")
+    parser.add_argument("--sizes", default="1000,10000", help="Comma-separated bank sizes in questions (default: 1000,10000)")
+    parser.add_argument("--categories", type=int, default=20, help="Categories the bank is spread over")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplies the number of timed operations per case")
+    parser.add_argument("--only", help="Comma-separated case names to run")
+    parser.add_argument("-o", "--output", default="instance/benchmark_results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, help="Allowed median slowdown vs the baseline (default: QUIZ_BENCH_THRESHOLD or 0.25)")
+    args = parser.parse_args(argv)
+    from benchmarks.runner import REGRESSION_THRESHOLD, compare, load_results, run_benchmarks, save_results # Import locally; only needed for this command
+
+    sizes = [int(size.replace("_", "")) for size in args.sizes.split(",")]
+    document = run_benchmarks(sizes, args.categories, args.scale, args.only.split(",") if args.only else None)
+    save_results(document, args.output)
+    print(f"Results written to {args.output}")
+    if args.baseline:
+        regressions = compare(document, load_results(args.baseline), args.threshold or REGRESSION_THRESHOLD)
+        for r in regressions:
+            print(f"REGRESSION {r.name} at {r.size:,} questions: median {r.current * 1000:.3f} ms "
+                  f"(baseline {r.baseline * 1000:.3f} ms, limit {r.limit * 1000:.3f} ms)")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}.")
+
+def run_serve(argv):
+    parser = argparse.ArgumentParser(prog="python main.py serve", description="Serve the quiz HTTP/JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes; more than 1 serves a shared in-memory content snapshot")
+    args = parser.parse_args(argv)
+    if args.workers > 1:
+        from lib.prefork import run_prefork # Import locally; only needed for this command
+        run_prefork(args.host, args.port, args.workers)
+    else:
+        from lib.server import run_server
+        run_server(args.host, args.port)
+
+def run_loadtest(argv):
+    parser = argparse.ArgumentParser(prog="python main.py loadtest",
+                                     description="Simulate concurrent quiz takers and report latency per operation.")
+    parser.add_argument("--users", type=int, default=50, help="Virtual users (default: 50)")
+    parser.add_argument("--mode", choices=["threads", "asyncio", "processes"], default="threads",
+                        help="threads and processes use the models directly; asyncio drives the HTTP API")
+    parser.add_argument("--processes", type=int, help="Worker processes for --mode processes (default: CPU count)")
+    parser.add_argument("--url", help="Server for --mode asyncio, e.g. http://127.0.0.1:8000 (default: start one in-process)")
+    parser.add_argument("--quizzes", type=int, default=1, help="Quizzes each user takes")
+    parser.add_argument("--questions", type=int, default=10, help="Questions per quiz")
+    parser.add_argument("--think", type=float, default=0.5, help="Median seconds before each answer")
+    parser.add_argument("--think-dist", choices=["lognormal", "exponential", "fixed", "none"], default="lognormal")
+    parser.add_argument("--accuracy", type=float, default=0.7, help="Chance a user picks a correct answer (models only)")
+    parser.add_argument("--ramp-up", type=float, default=1.0, help="Seconds over which users start")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    from lib.helpers import report_load_test # Import locally; only needed for this command
+    report_load_test(users=args.users, mode=args.mode, processes=args.processes, url=args.url, quizzes=args.quizzes,
+                     questions=args.questions, think=args.think, distribution=args.think_dist,
+                     accuracy=args.accuracy, ramp_up=args.ramp_up, seed=args.seed)
+
+def run_tenants(argv):
+    parser = argparse.ArgumentParser(prog="python main.py tenants", description="Administer per-tenant databases.")
+    actions = parser.add_subparsers(dest="action", required=True)
+    actions.add_parser("list", help="Schema version and content counts of every tenant")
+    actions.add_parser("migrate", help="Apply pending migrations to every tenant")
+    create = actions.add_parser("create", help="Create a tenant's database and schema")
+    create.add_argument("tenant")
+    copy = actions.add_parser("copy", help="Copy questions and answers from one tenant to another")
+    copy.add_argument("source")
+    copy.add_argument("target")
+    copy.add_argument("--category", help="Only copy this category (by name)")
+    args = parser.parse_args(argv)
+    from lib import helpers # Import locally; only needed for this command
+    try:
+        if args.action == "list":
+            helpers.report_tenants()
+        elif args.action == "migrate":
+            helpers.migrate_all_tenants()
+        elif args.action == "create":
+            helpers.create_tenant(args.tenant)
+        else:
+            helpers.copy_tenant_content(args.source, args.target, args.category)
+    except ValueError as e: # Invalid tenant ID
+        print(e)
+        sys.exit(2)
+
+def run_command(command, argv):
+    """Runs one subcommand; returns False if it is unknown."""
+    if command == "initdb":
+        from lib.helpers import initialize_database
+        initialize_database()
+    elif command == "migrate":
+        from lib.helpers import migrate_database
+        migrate_database(int(argv[0]) if argv else None)
+    elif command == "runtests":
+        import pytest
+        print("Running tests...")
+        # Use pytest.main to run tests programmatically
+        # Pass tests/ directory as argument to discover tests
+        pytest.main(["tests"])
+    elif command == "import":
+        if not argv:
+            print("Usage: python main.py import <file> [csv|json|jsonl]")
+        else:
+            from lib.helpers import import_question_bank
+            import_question_bank(argv[0], argv[1] if len(argv) > 1 else None)
+    elif command == "export":
+        run_export(argv)
+    elif command == "snapshot":
+        from lib.helpers import build_snapshot
+        build_snapshot(argv[0] if argv else None)
+    elif command == "dedupe":
+        run_dedupe(argv)
+    elif command == "serve":
+        run_serve(argv)
+    elif command == "bench":
+        run_bench(argv)
+    elif command == "loadtest":
+        run_loadtest(argv)
+    elif command == "tenants":
+        run_tenants(argv)
+    else:
+        return False
+    return True
+
 if __name__ == '__main__':
+    if "--profile" in sys.argv: # Count queries per action; report at exit (same as QUIZ_PROFILE=1)
+        sys.argv.remove("--profile")
+        from lib.profiling import enable as enable_profiling
+        enable_profiling()
+    if "--tenant" in sys.argv: # Route every model call to one tenant's database
+        position = sys.argv.index("--tenant")
+        tenant_id = sys.argv[position + 1] if position + 1 < len(sys.argv) else ""
+        del sys.argv[position:position + 2]
+        from lib.tenants import select_tenant
+        try:
+            select_tenant(tenant_id)
+        except ValueError as e:
+            print(e)
+            sys.exit(2)
     if len(sys.argv) > 1:
         command = sys.argv[1]
-        if command == "initdb":
-            initialize_database()
-        elif command == "runtests":
-            print("Running tests...")
-            # Use pytest.main to run tests programmatically
-            # Pass tests/ directory as argument to discover tests
-            pytest.main(["tests"]) 
-        else:
+        if command in ("-h", "--help", "help"):
+            print(USAGE)
+        elif not run_command(command, sys.argv[2:]):
             print(f"Unknown command: {command}")
-            print("Usage: python main.py [initdb|runtests]")
+            print(USAGE)
     else:
-        run_cli()
\ No newline at end of file
+        run_cli()
@@ -0,0 +1,88 @@
+import pytest
+import lib.database
+from lib.database import Base, build_engine, configure_engine, get_db_session, close_db_session, swap_engine
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.models.answer import Answer
+from lib.models.attempt import Attempt
+from lib.models.response import Response
+from lib.models.question_stat import QuestionStat
+from lib.models.player_score import PlayerScore
+from lib.models.category_score import CategoryScore
+from lib.models.review_card import ReviewCard
+from lib.profiling import assert_max_queries
+
+# Define a test database URL
+TEST_DATABASE_URL = "sqlite:///:memory:" # Use in-memory database for tests
+
+# Fixture for a clean database state for each test
+@pytest.fixture(scope='function', autouse=True)
+def setup_db_for_test():
+    # Point the shared session factory at a fresh in-memory database
+    original_url = lib.database.get_engine().url
+    test_engine = configure_engine(TEST_DATABASE_URL)
+    Base.metadata.create_all(test_engine)
+
+    # Seed some data for tests
+    seed_database_for_test()
+
+    yield # Run the test
+
+    # Teardown: Drop tables after the test
+    close_db_session()
+    Base.metadata.drop_all(test_engine)
+
+    # Restore the original engine
+    configure_engine(original_url)
+
+
+# Query budgets: `with query_budget(2): ...` fails if the block runs more than 2 statements
+@pytest.fixture
+def query_budget():
+    return assert_max_queries
+
+
+# A seeded SQLite file instead of the in-memory database, for tests running concurrent
+# transactions from several threads (the in-memory database is one shared connection)
+@pytest.fixture
+def file_database(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path}/test.db")
+    Base.metadata.create_all(engine)
+    previous = swap_engine(engine)
+    seed_database_for_test()
+    yield engine
+    close_db_session()
+    swap_engine(previous)
+    engine.dispose()
+
+
+# Helper function to seed data using the test session
+def seed_database_for_test():
+    session = get_db_session()
+    try:
+        session.query(Answer).delete()
+        session.query(Question).delete()
+        session.query(Category).delete()
+        session.commit()
+
+        cat1 = Category(name="Test History")
+        cat2 = Category(name="Test Science")
+        session.add_all([cat1, cat2])
+        session.commit()
+
+        q1 = Question(text="Test Q1", category=cat1)
+        q2 = Question(text="Test Q2", category=cat1)
+        q3 = Question(text="Test Q3", category=cat2)
+        session.add_all([q1, q2, q3])
+        session.flush() # To get IDs for questions
+
+        ans1 = Answer(text="A1 Correct", is_correct=True, question=q1)
+        ans2 = Answer(text="A1 Wrong", is_correct=False, question=q1)
+        ans3 = Answer(text="A2 Correct", is_correct=True, question=q2)
+        session.add_all([ans1, ans2, ans3])
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise e # Re-raise to fail the test if seeding fails
+    finally:
+        close_db_session() # Tests start with an empty identity map
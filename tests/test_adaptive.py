@@ -0,0 +1,95 @@
+import random
+import pytest
+from lib.adaptive import AdaptiveQuizSession, ItemStats, get_item_stats, probability
+from lib.database import get_db_session
+from lib.models.category import Category
+from lib.models.question_stat import QuestionStat
+from lib.quiz import Quiz, QuizAnswer, QuizEngine, QuizQuestion
+
+def make_engine(n):
+    return QuizEngine(Quiz(1, "Levels", tuple(
+        QuizQuestion(i, f"Q{i}", (QuizAnswer(10 * i, "right", True), QuizAnswer(10 * i + 1, "wrong", False)))
+        for i in range(1, n + 1)
+    )))
+
+def stats_with_difficulties(difficulties):
+    stats = ItemStats(flush_every=10**9)
+    for question_id, difficulty in difficulties.items():
+        stats._ensure(question_id)
+        stats.difficulty[question_id] = difficulty
+    return stats
+
+def test_most_informative_matches_ability():
+    stats = stats_with_difficulties({1: -2.0, 2: 0.0, 3: 2.0})
+    assert stats.most_informative([1, 2, 3], 0.1) == 2
+    assert stats.most_informative([1, 2, 3], 1.8) == 3
+    assert stats.most_informative([1, 3], -5.0) == 1
+    stats.discrimination[3] = 3.0 # Sharper questions tell more near their difficulty
+    assert stats.most_informative([2, 3], 1.0) == 3
+    assert stats.most_informative([7, 8], 0.0) == 7 # Unknown questions use the defaults; ties keep order
+
+def test_update_moves_estimates_with_prediction_error():
+    stats = ItemStats(flush_every=10**9)
+    assert stats.update(5, 0.0, True) == probability(0.0, 0.0, 1.0) == 0.5
+    assert stats.get(5)[0] < 0.0 and stats.get(5)[2] == 1 # Answered correctly: looks easier
+    stats.update(6, 0.0, False)
+    assert stats.get(6)[0] > 0.0
+    first = stats.get(5)[0]
+    stats.update(5, first, True)
+    assert 0 < first - stats.get(5)[0] < -first # Steps shrink as responses accumulate
+
+def test_adaptive_session_follows_the_taker():
+    engine = make_engine(5)
+    stats = stats_with_difficulties({1: -2.0, 2: -1.0, 3: 0.0, 4: 1.0, 5: 2.0})
+    quiz_session = AdaptiveQuizSession(engine, stats, rng=random.Random(1))
+    assert quiz_session.next_question().id == 3
+    quiz_session.answer(30) # Correct: ability goes up, so a harder question follows
+    assert quiz_session.ability > 0
+    assert quiz_session.next_question().id == 4
+
+    served = [3, 4]
+    quiz_session.answer(41) # Wrong
+    while (question := quiz_session.next_question()) is not None:
+        served.append(question.id)
+        quiz_session.answer(question.answers[0].id)
+    assert sorted(served) == [1, 2, 3, 4, 5] and quiz_session.finished
+    assert quiz_session.answered == 5 and stats.get(4)[2] == 1
+
+def test_flush_persists_and_load_restores():
+    question_id = Category.find_by_name("Test History").questions[0].id
+    stats = ItemStats(flush_every=2)
+    stats.update(question_id, 1.0, False)
+    assert QuestionStat.find_by_question_id(question_id) is None # Buffered until flush_every updates
+    stats.update(question_id, 1.0, False)
+    row = QuestionStat.find_by_question_id(question_id)
+    assert row.responses == 2 and row.difficulty == pytest.approx(stats.get(question_id)[0]) and row.difficulty > 0
+
+    stats.update(question_id, 0.0, True)
+    assert stats.flush() == 1 # Existing row updated in place
+    reloaded = ItemStats().load(get_db_session().connection())
+    assert reloaded.get(question_id) == pytest.approx(stats.get(question_id)) # Stored as summed changes
+    assert get_item_stats().get(question_id)[2] == 3
+
+def test_failed_flush_keeps_updates():
+    question_id = Category.find_by_name("Test History").questions[0].id
+    stats = ItemStats(flush_every=10**9)
+    stats.update(question_id, 1.0, False)
+    QuestionStat.__table__.drop(get_db_session().connection()) # Every write fails
+    get_db_session().commit()
+    assert stats.flush() == 0
+    QuestionStat.__table__.create(get_db_session().connection())
+    get_db_session().commit()
+    assert stats.flush() == 1
+    assert QuestionStat.find_by_question_id(question_id).responses == 1
+
+def test_flushes_from_two_processes_add_up():
+    question_id = Category.find_by_name("Test History").questions[0].id
+    first, second = ItemStats(flush_every=10**9), ItemStats(flush_every=10**9) # Loaded before either writes
+    first.update(question_id, 1.0, False)
+    first.update(question_id, 1.0, False)
+    second.update(question_id, -1.0, True)
+    assert first.flush() == second.flush() == 1
+    row = QuestionStat.find_by_question_id(question_id)
+    assert row.responses == 3
+    change = sum(stats.get(question_id)[0] for stats in (first, second)) # Each moved from the default 0.0
+    assert row.difficulty == pytest.approx(change)
@@ -0,0 +1,35 @@
+from benchmarks.bank import synthetic_records
+from benchmarks.runner import compare, run_benchmarks, summarize
+from lib.models.category import Category
+
+def document(**medians):
+    return {"results": {"1000": {name: {"median": median} for name, median in medians.items()}}}
+
+def test_synthetic_records_are_reproducible():
+    records = list(synthetic_records(10, categories=3, seed=7))
+    assert records == list(synthetic_records(10, categories=3, seed=7))
+    assert len({r["question"] for r in records}) == 10
+    assert {r["category"] for r in records} == {"Bench Category 1", "Bench Category 2", "Bench Category 3"}
+    assert all(sum(a["is_correct"] for a in r["answers"]) == 1 for r in records)
+
+def test_summarize():
+    stats = summarize([0.3, 0.1, 0.2, 0.4])
+    assert (stats["ops"], stats["min"], stats["median"], stats["p95"]) == (4, 0.1, 0.25, 0.4)
+
+def test_compare_flags_slowdowns_beyond_threshold():
+    baseline = document(answer_update=0.001, category_create=0.001, quiz_load_sample=0.001, seed=0.000001)
+    current = document(answer_update=0.0013, category_create=0.0012, seed=0.000010, export_jsonl=5.0)
+    [regression] = compare(current, baseline, threshold=0.25)
+    assert (regression.size, regression.name, regression.current) == (1000, "answer_update", 0.0013)
+    # 10x slower but below the noise floor; cases missing on either side are skipped
+    assert compare(current, baseline, threshold=0.5) == []
+    # Per-case thresholds override the default for noisy cases
+    assert compare(document(question_find_by_id_cached=0.0019), document(question_find_by_id_cached=0.001)) == []
+
+def test_run_benchmarks_on_a_scratch_database():
+    results = run_benchmarks(sizes=[40], categories=4, ops_scale=0.01, only=["quiz_load_sample", "seed"], log=lambda m: None)
+    cases = results["results"]["40"]
+    assert set(cases) == {"bulk_import", "quiz_load_sample", "seed"}
+    assert cases["quiz_load_sample"]["ops"] == 2
+    assert cases["bulk_import"]["rows_per_second"] > 0
+    assert Category.find_by_name("Test History") is not None # The app's database is restored
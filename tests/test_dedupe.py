@@ -0,0 +1,86 @@
+import lib.dedupe
+from lib.dedupe import MAX_BUCKET_SIZE, CategoryIndex, find_duplicate, jaccard, scan_duplicates, shingles
+from lib.importer import import_records
+from lib.models.category import Category
+from lib.models.question import Question
+
+def record(category, question):
+    return {"category": category, "question": question, "answers": [{"text": "yes", "is_correct": True}]}
+
+def test_shingles_ignore_case_accents_and_punctuation():
+    assert shingles("What is the capital of France?") == shingles("  what IS the capital of france ")
+    assert shingles("Qu'est-ce que l'été?") == shingles("qu est ce que l ete")
+    assert jaccard(shingles("What is the capital of France?"), shingles("What is the capital of Spain?")) < 0.8
+    assert shingles("?!") == set()
+
+def test_category_index_matches_near_duplicates_only():
+    index = CategoryIndex(threshold=0.8)
+    assert index.check(1, "Which planet is known as the Red Planet?") is None
+    assert index.check(2, "What is the largest ocean on Earth?") is None
+    match = index.check(3, "Which planet is known as the red planet")
+    assert (match.question_id, match.similarity) == (1, 1.0)
+    assert index.check(4, "Which planet is known as the Red Planet, exactly?").question_id == 1
+    assert index.match("Which ocean is the largest on Earth?") is None
+    assert index.check(5, "Which planet is known as the Red Planet in our solar system?") is None # 64% similar
+    assert len(index) == 3 # Duplicates are not indexed themselves
+
+def test_templated_questions_keep_buckets_bounded():
+    index = CategoryIndex(threshold=0.8)
+    texts = [f"Which river is described by clue {n}?" for n in range(2000)] # Mostly the same shingles
+    assert all(index.check(n, text) is None for n, text in enumerate(texts))
+    assert max(len(ids) for bucket in index.buckets for ids in bucket.values() if isinstance(ids, list)) <= MAX_BUCKET_SIZE
+    assert [index.match(texts[n].upper()).question_id for n in (0, 999, 1999)] == [0, 999, 1999]
+
+def test_create_flags_or_rejects_duplicates(capsys):
+    category_id = Category.find_by_name("Test Science").id
+    original = Question.create("What is the boiling point of water at sea level?", category_id)
+
+    flagged = Question.create("What is the boiling point of water at sea level", category_id)
+    assert flagged is not None
+    assert f"near-duplicate of question {original.id}" in capsys.readouterr().out
+
+    assert Question.create("What is the boiling point of water at sea-level?", category_id, duplicates="reject") is None
+    assert "near-duplicate" in capsys.readouterr().out
+    assert Question.create("What is the boiling point of water at sea level?", category_id, duplicates="off")
+
+    other_id = Category.find_by_name("Test History").id # Only questions in the same category count
+    assert Question.create("What is the boiling point of water at sea level?", other_id, duplicates="reject")
+
+def test_cached_index_follows_own_writes():
+    category_id = Category.find_by_name("Test Science").id
+    assert find_duplicate("How many moons does Mars have?", category_id) is None
+    index = lib.dedupe._indexes.get()[category_id]
+
+    question = Question.create("How many moons does Mars have?", category_id)
+    assert find_duplicate("How many moons does Mars have", category_id).question_id == question.id
+    assert lib.dedupe._indexes.get()[category_id] is index # Kept in step, not rebuilt
+
+    question.update(new_text="How many rings does Saturn have?")
+    assert find_duplicate("How many moons does Mars have", category_id) is None
+    assert find_duplicate("how many rings does saturn have", category_id).question_id == question.id
+
+def test_import_flags_and_rejects_duplicates():
+    rows = [record("Geo", "What is the capital of France?"), record("Geo", "What is the capital of Spain?"),
+            record("Geo", "what is the capital of france"), record("Other", "What is the capital of France?")]
+    result = import_records(rows, batch_size=2, duplicates="flag")
+    assert (result.questions, result.duplicates) == (4, 1)
+
+    result = import_records(rows + [record("Geo", "What is the capital of Italy?")], batch_size=2, duplicates="reject")
+    assert (result.questions, result.answers, result.duplicates) == (1, 1, 4) # Only Italy is new
+    assert len(Category.find_by_name("Geo").questions) == 4
+    assert import_records(rows).duplicates == 0 # Imports are not checked unless asked
+
+def test_scan_duplicates_groups_by_original():
+    import_records([record("Geo", "What is the capital of France?"), record("Geo", "What is the capital of Spain?"),
+                    record("Geo", "what is the capital of france"), record("Geo", "What is the capital of France ?!"),
+                    record("Other", "What is the capital of France?")], duplicates="off")
+    report = scan_duplicates()
+    assert (report.questions, report.duplicates, len(report.groups)) == (8, 2, 1)
+    group = report.groups[0]
+    assert (group.category_name, group.question_text) == ("Geo", "What is the capital of France?")
+    assert [d.similarity for d in group.duplicates] == [1.0, 1.0]
+
+    geo_id = Category.find_by_name("Geo").id
+    other_id = Category.find_by_name("Other").id
+    assert scan_duplicates(category_id=other_id).groups == []
+    assert scan_duplicates(category_id=geo_id).categories == 1
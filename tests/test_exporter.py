@@ -0,0 +1,44 @@
+import gzip
+import io
+import json
+from lib.exporter import export_questions, export_file, iter_question_chunks
+from lib.importer import iter_csv_records
+from lib.models.category import Category
+
+def test_chunks_follow_question_order():
+    chunks = list(iter_question_chunks(chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    records = [record for chunk in chunks for record in chunk]
+    assert [r["question"] for r in records] == ["Test Q1", "Test Q2", "Test Q3"]
+    assert records[0]["answers"] == [{"text": "A1 Correct", "is_correct": True}, {"text": "A1 Wrong", "is_correct": False}]
+    assert records[2]["answers"] == []
+
+def test_jsonl_export_with_category_filter():
+    out = io.StringIO()
+    science = Category.find_by_name("Test Science")
+    result = export_questions(out, fmt="jsonl", category_id=science.id)
+    assert (result.questions, result.answers) == (1, 0)
+    assert [json.loads(line)["question"] for line in out.getvalue().splitlines()] == ["Test Q3"]
+
+def test_csv_export_round_trips_through_importer():
+    out = io.StringIO()
+    export_questions(out, fmt="csv")
+    records = list(iter_csv_records(io.StringIO(out.getvalue())))
+    assert [r["question"] for r in records] == ["Test Q1", "Test Q2", "Test Q3"]
+    assert records[1]["answers"] == [{"text": "A2 Correct", "is_correct": True}]
+
+def test_columnar_export():
+    out = io.StringIO()
+    export_questions(out, fmt="columnar", chunk_size=10)
+    group = json.loads(out.getvalue())
+    assert group["rows"] == 3
+    assert group["dictionary"]["category"] == ["Test History", "Test Science"]
+    assert group["columns"]["question"] == ["Test Q1", "Test Q2", "Test Q3"]
+    assert group["columns"]["question_index"] == [0, 0, 1]
+    assert group["columns"]["is_correct"] == [1, 0, 1]
+
+def test_gzip_export(tmp_path):
+    path = tmp_path / "bank.jsonl.gz"
+    export_file(str(path), fmt="jsonl")
+    with gzip.open(path, "rt") as fp:
+        assert len(fp.readlines()) == 3
@@ -0,0 +1,63 @@
+import io
+import json
+import pytest
+from lib.importer import import_file, import_records, iter_csv_records, iter_json_records, detect_format
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.models.answer import Answer
+
+CSV_BANK = """category,question,answer,is_correct
+Geography,Capital of France?,Paris,1
+Geography,Capital of France?,Lyon,0
+Geography,Largest ocean?,Pacific,yes
+Test History,Year of the moon landing?,1969,true
+Test History,Year of the moon landing?,1972,false
+"""
+
+def test_csv_rows_are_grouped_by_question():
+    records = list(iter_csv_records(io.StringIO(CSV_BANK)))
+    assert [r["question"] for r in records] == ["Capital of France?", "Largest ocean?", "Year of the moon landing?"]
+    assert records[0]["answers"] == [{"text": "Paris", "is_correct": True}, {"text": "Lyon", "is_correct": False}]
+
+def test_json_array_is_streamed_across_chunks(monkeypatch):
+    import lib.importer
+    monkeypatch.setattr(lib.importer, "JSON_READ_CHUNK", 7) # Force objects to span chunk boundaries
+    items = [{"category": "C", "question": f"Q{i}", "answers": [{"text": "A", "is_correct": True}]} for i in range(20)]
+    records = list(iter_json_records(io.StringIO(json.dumps(items, indent=2))))
+    assert [r["question"] for r in records] == [f"Q{i}" for i in range(20)]
+
+def test_json_requires_array():
+    with pytest.raises(ValueError):
+        list(iter_json_records(io.StringIO('{"category": "C"}')))
+
+def test_detect_format():
+    assert detect_format("bank.CSV") == "csv"
+    assert detect_format("bank.ndjson") == "jsonl"
+    with pytest.raises(ValueError):
+        detect_format("bank.xml")
+
+def test_import_csv_file(tmp_path):
+    path = tmp_path / "bank.csv"
+    path.write_text(CSV_BANK)
+    result = import_file(str(path), batch_size=2)
+    assert (result.categories, result.questions, result.answers) == (1, 3, 5)
+
+    geography = Category.find_by_name("Geography")
+    quiz = Category.load_quiz(geography.id)
+    assert [q.text for q in quiz.questions] == ["Capital of France?", "Largest ocean?"]
+    assert [(a.text, a.is_correct) for a in quiz.questions[0].answers] == [("Paris", True), ("Lyon", False)]
+    # Existing categories are reused rather than duplicated
+    assert len(Category.get_all()) == 3
+    history = Category.find_by_name("Test History")
+    assert len(Category.load_quiz(history.id).questions) == 3
+
+def test_import_jsonl_records_in_batches():
+    records = ({"category": "Bulk", "question": f"Q{i}", "answers": [{"text": "A", "is_correct": True}, {"text": "B", "is_correct": False}]}
+               for i in range(250))
+    progress = []
+    result = import_records(records, batch_size=100, progress=progress.append)
+    assert result.questions == 250
+    assert result.answers == 500
+    assert [p.questions for p in progress] == [100, 200, 250]
+    assert len(Question.get_all()) == 253
+    assert len(Answer.get_all()) == 503
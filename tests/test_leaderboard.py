@@ -0,0 +1,120 @@
+from sqlalchemy import text
+from lib.database import close_db_session, get_db_session, get_engine
+from lib.leaderboard import hardest_questions, question_correctness, record_attempt, top_players
+from lib.migrations import _backfill_aggregates
+from lib.models.attempt import Attempt
+from lib.models.base import upsert
+from lib.models.category import Category
+from lib.models.player_score import PlayerScore
+from lib.models.question import Question
+from lib.models.question_stat import QuestionStat
+from lib.recorder import ResponseRecorder
+
+def play(player, category_name, score, total, completed=True):
+    category_id = Category.find_by_name(category_name).id
+    attempt = Attempt.start(category_id, total, player)
+    attempt.finish(score, completed=completed)
+    return attempt
+
+def test_stale_copies_of_an_attempt_are_counted_once():
+    attempt_id = Attempt.start(Category.find_by_name("Test History").id, 2, "Ada").id
+    close_db_session()
+    first = Attempt.find_by_id(attempt_id)
+    close_db_session()
+    second = Attempt.find_by_id(attempt_id) # Still reads "in progress", like a racing request
+    close_db_session()
+    assert first.finish(2) and second.finish(1)
+    [entry] = top_players()
+    assert (entry.points, entry.attempts) == (2, 1)
+    assert Attempt.find_by_id(attempt_id).score == 2
+
+def question(text):
+    return get_db_session().query(Question).filter_by(text=text).one()
+
+def test_upsert_inserts_then_increments_or_replaces():
+    session = get_db_session()
+    table = PlayerScore.__table__
+    upsert(session.connection(), table, ["player"], [{"player": "Ada", "attempts": 1, "points": 3, "answered": 4}],
+           increment=("attempts", "points"))
+    upsert(session.connection(), table, ["player"], [{"player": "Ada", "attempts": 1, "points": 2, "answered": 5},
+                                                     {"player": "Bob", "attempts": 1, "points": 1, "answered": 1}],
+           increment=("attempts", "points"))
+    session.commit()
+    ada = session.get(PlayerScore, "Ada")
+    assert (ada.attempts, ada.points, ada.answered) == (2, 5, 5) # answered is replaced, not added
+    assert session.get(PlayerScore, "Bob").points == 1
+
+def test_finished_attempts_update_totals_once():
+    attempt = play("Ada", "Test History", 2, 2)
+    play("Ada", "Test Science", 1, 3)
+    play("Ada", "Test Science", 3, 3, completed=False) # Interrupted quizzes do not count
+    play("Anonymous", "Test History", 5, 5)
+    attempt.finish(2, completed=True) # Finishing again adds nothing
+
+    [entry] = top_players()
+    assert (entry.rank, entry.player, entry.points, entry.attempts, entry.answered) == (1, "Ada", 3, 2, 5)
+    assert entry.accuracy == 0.6
+    science = top_players(category_id=Category.find_by_name("Test Science").id)
+    assert [(e.player, e.points, e.answered) for e in science] == [("Ada", 1, 3)]
+
+def test_top_players_ranking_and_limit():
+    play("Cy", "Test History", 2, 4)
+    play("Bea", "Test History", 2, 2)
+    play("Ada", "Test History", 2, 2)
+    play("Dan", "Test History", 1, 1)
+    assert [e.player for e in top_players()] == ["Ada", "Bea", "Cy", "Dan"] # Points, then fewer answered, then name
+    assert [(e.rank, e.player) for e in top_players(limit=2)] == [(1, "Ada"), (2, "Bea")]
+    assert top_players(category_id=Category.find_by_name("Test Science").id) == []
+
+def test_recorded_responses_update_question_correctness():
+    q1, q2 = question("Test Q1"), question("Test Q2")
+    attempt = Attempt.start(q1.category_id, 2, "Ada")
+    recorder = ResponseRecorder(batch_size=100, flush_interval=60)
+    try:
+        for asked, correct in [(q1, True), (q1, False), (q1, False), (q2, True), (q2, True)]:
+            recorder.record(attempt.id, asked.id, asked.answers[0].id, correct)
+        recorder.flush()
+        recorder.record(attempt.id, q2.id, q2.answers[0].id, False)
+        recorder.flush()
+    finally:
+        recorder.close(timeout=5)
+
+    counts = question_correctness([q1.id, q2.id])
+    assert (counts[q1.id].answered, counts[q1.id].correct) == (3, 1)
+    assert (counts[q2.id].answered, counts[q2.id].correct) == (3, 2)
+    assert [q.question_id for q in hardest_questions(q1.category_id)] == [q1.id, q2.id]
+    assert hardest_questions(q1.category_id, min_answers=4) == []
+    assert question_correctness([question("Test Q3").id]).popitem()[1].rate is None
+
+def test_backfill_rebuilds_totals():
+    play("Ada", "Test History", 2, 2)
+    session = get_db_session()
+    session.execute(text("DELETE FROM player_scores"))
+    session.execute(text("DELETE FROM category_scores"))
+    session.commit()
+    session.close()
+
+    _backfill_aggregates(get_engine())
+    _backfill_aggregates(get_engine()) # Idempotent
+    assert [(e.player, e.points, e.attempts) for e in top_players()] == [("Ada", 2, 1)]
+
+def test_batched_backfill_matches_live_totals():
+    for player, category, score in (("Ada", "Test History", 2), ("Bob", "Test Science", 1), ("Cy", "Test History", 1),
+                                    ("Ada", "Test Science", 1), ("Bob", "Test History", 0)):
+        play(player, category, score, 2)
+    recorder = ResponseRecorder(flush_interval=60)
+    attempt_id = Attempt.get_all()[0].id
+    for question_id, is_correct in ((1, True), (1, False), (2, True), (3, False)):
+        recorder.record(attempt_id, question_id, None, is_correct)
+    recorder.close(timeout=5)
+    live = top_players(), [top_players(category_id=c.id) for c in Category.get_all()], question_correctness([1, 2, 3])
+
+    session = get_db_session()
+    for table in ("player_scores", "category_scores", "question_stats"):
+        session.execute(text(f"DELETE FROM {table}"))
+    session.commit()
+    session.close()
+    for _ in range(2): # Idempotent
+        _backfill_aggregates(get_engine(), batch_size=1)
+        assert (top_players(), [top_players(category_id=c.id) for c in Category.get_all()],
+                question_correctness([1, 2, 3])) == live
@@ -0,0 +1,65 @@
+import random
+import pytest
+from lib.database import get_db_session
+from lib.loadtest import LatencyLog, percentile, run_load_test, think_time
+from lib.models.attempt import Attempt
+from lib.models.response import Response
+
+def operations(report):
+    return {op.name: op for op in report.operations}
+
+def test_percentile_uses_nearest_rank():
+    ordered = list(range(1, 101))
+    assert percentile(ordered, 0.5) == 50
+    assert percentile(ordered, 0.95) == 95
+    assert percentile(ordered, 0.99) == 99
+    assert percentile([7], 0.99) == 7
+    assert percentile([], 0.5) == 0.0
+
+def test_think_time_distributions_center_on_the_median():
+    rng = random.Random(1)
+    assert think_time(rng, 0.5, "none") == 0.0
+    assert think_time(rng, 0.5, "fixed") == 0.5
+    samples = sorted(think_time(rng, 0.5, "lognormal") for _ in range(2001))
+    assert 0.4 < samples[1000] < 0.6
+    assert all(s > 0 for s in samples)
+    exponential = [think_time(rng, 0.5, "exponential") for _ in range(2000)]
+    assert 0.4 < sum(exponential) / len(exponential) < 0.6
+
+def test_latency_log_reports_counts_errors_and_merges():
+    log, other = LatencyLog(), LatencyLog()
+    for ms in range(1, 11):
+        log.add("answer", ms / 1000)
+    with pytest.raises(ValueError):
+        with other.timed("answer"):
+            raise ValueError("boom")
+    log.merge(other)
+    [answer] = log.report(2.0)
+    assert (answer.count, answer.errors, answer.throughput) == (10, 1, 5.0)
+    assert answer.p50 == pytest.approx(5.0)
+    assert answer.max == pytest.approx(10.0)
+
+def test_threads_write_attempts_and_responses_through_the_models(file_database):
+    report = run_load_test(users=4, mode="threads", questions=2, quizzes=2, think=0, ramp_up=0, seed=3)
+    assert report.quizzes == 8
+    ops = operations(report)
+    assert ops["start_attempt"].count == ops["finish"].count == 8
+    assert all(op.errors == 0 for op in report.operations)
+    session = get_db_session()
+    attempts = session.query(Attempt).all()
+    assert len(attempts) == 8 and all(a.status == "completed" for a in attempts)
+    assert session.query(Response).count() == ops["answer"].count
+
+def test_asyncio_users_drive_the_http_api(file_database):
+    report = run_load_test(users=3, mode="asyncio", questions=2, think=0, ramp_up=0, seed=3)
+    assert report.quizzes == 3
+    ops = operations(report)
+    assert {"list_categories", "start_quiz", "results"} <= set(ops)
+    assert all(op.errors == 0 for op in report.operations)
+    session = get_db_session()
+    assert session.query(Attempt).filter_by(status="completed").count() == 3
+    assert session.query(Response).count() == (ops["answer"].count if "answer" in ops else 0)
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        run_load_test(users=1, mode="fibers")
@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import inspect, text
+from lib.database import build_engine
+from lib.migrations import (MIGRATIONS, backfill_in_batches, current_version, head_version,
+                            migration_transaction, upgrade)
+
+# Schema as created by the first release: no indexes and no ON DELETE actions
+LEGACY_SCHEMA = """
+CREATE TABLE categories (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL UNIQUE);
+CREATE TABLE questions (id INTEGER PRIMARY KEY, text VARCHAR NOT NULL,
+    category_id INTEGER NOT NULL REFERENCES categories (id));
+CREATE TABLE answers (id INTEGER PRIMARY KEY, text VARCHAR NOT NULL, is_correct BOOLEAN NOT NULL,
+    question_id INTEGER NOT NULL REFERENCES questions (id));
+INSERT INTO categories VALUES (1, 'History');
+INSERT INTO questions VALUES (1, 'Q1', 1), (2, 'Q2', 1);
+INSERT INTO answers VALUES (1, 'A', 1, 1), (2, 'B', 0, 1), (3, 'C', 1, 2);
+"""
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    yield engine
+    engine.dispose()
+
+def test_fresh_database_upgrades_to_head(file_engine):
+    assert current_version(file_engine) == 0
+    applied = upgrade(file_engine, log=lambda message: None)
+    assert applied == [m.version for m in MIGRATIONS]
+    assert current_version(file_engine) == head_version()
+    assert upgrade(file_engine, log=lambda message: None) == [] # Nothing left to do
+    assert {"categories", "questions", "answers", "attempts", "responses"} <= set(inspect(file_engine).get_table_names())
+
+def test_upgrade_to_target_version(file_engine):
+    assert upgrade(file_engine, target=1, log=lambda message: None) == [1]
+    assert current_version(file_engine) == 1
+
+def test_legacy_database_keeps_data_and_gains_indexes_and_cascades(file_engine):
+    with file_engine.begin() as conn:
+        for statement in LEGACY_SCHEMA.strip().split(";"):
+            if statement.strip():
+                conn.exec_driver_sql(statement)
+
+    upgrade(file_engine, log=lambda message: None)
+
+    indexes = {tuple(ix["column_names"]) for ix in inspect(file_engine).get_indexes("answers")}
+    assert ("question_id", "is_correct") in indexes
+    with file_engine.begin() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM answers")).scalar() == 3
+        conn.execute(text("DELETE FROM categories WHERE id = 1")) # Would violate the old foreign keys
+        assert conn.execute(text("SELECT COUNT(*) FROM questions")).scalar() == 0
+        assert conn.execute(text("SELECT COUNT(*) FROM answers")).scalar() == 0
+
+def test_failed_migration_rolls_back_ddl(file_engine):
+    with pytest.raises(RuntimeError):
+        with migration_transaction(file_engine) as conn:
+            conn.execute(text("CREATE TABLE half_done (id INTEGER PRIMARY KEY)"))
+            raise RuntimeError("boom")
+    assert "half_done" not in inspect(file_engine).get_table_names()
+
+def test_backfill_in_batches(file_engine):
+    upgrade(file_engine, log=lambda message: None)
+    with file_engine.begin() as conn:
+        conn.execute(text("INSERT INTO categories (id, name) VALUES (1, 'C')"))
+        for i in range(1, 26):
+            conn.execute(text("INSERT INTO questions (id, text, category_id) VALUES (:id, :text, 1)"),
+                         {"id": i, "text": f"q{i}"})
+        conn.execute(text("ALTER TABLE questions ADD COLUMN text_length INTEGER"))
+
+    updated = backfill_in_batches(file_engine, "questions", "text_length = LENGTH(text)", "text_length IS NULL",
+                                  batch_size=10)
+    assert updated == 25
+    assert backfill_in_batches(file_engine, "questions", "text_length = LENGTH(text)", "text_length IS NULL") == 0
+    with file_engine.connect() as conn:
+        assert conn.execute(text("SELECT SUM(text_length) FROM questions")).scalar() == 9 * 2 + 16 * 3
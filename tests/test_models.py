@@ -1,80 +1,32 @@
 import pytest
-import os
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-from lib.database import Base, engine, get_db_session
+import lib.database
+from lib.database import build_engine, get_db_session, close_db_session, session_scope
 from lib.models.category import Category
 from lib.models.question import Question
 from lib.models.answer import Answer
 from lib.helpers import initialize_database, create_database_and_tables, seed_database
 
-# Define a test database URL
-TEST_DATABASE_URL = "sqlite:///:memory:" # Use in-memory database for tests
-
-# Fixture for a clean database state for each test
-@pytest.fixture(scope='function', autouse=True)
-def setup_db_for_test():
-    # Use the test engine
-    test_engine = create_engine(TEST_DATABASE_URL)
-    TestSession = sessionmaker(bind=test_engine)
-    
-    # Bind the Base metadata to the test engine
-    Base.metadata.create_all(test_engine)
-    
-    # Override get_db_session for tests to use the in-memory db
-    # This is a simple way; for more complex scenarios, consider dependency injection
-    original_get_db_session = get_db_session.__wrapped__ # Access the original function
-    
-    def mock_get_db_session():
-        return TestSession()
-    
-    # Temporarily replace the function in its module
-    import lib.database
-    lib.database.get_db_session = mock_get_db_session
-
-    # Seed some data for tests
-    seed_database_for_test(TestSession)
-
-    yield # Run the test
-
-    # Teardown: Drop tables after the test
-    Base.metadata.drop_all(test_engine)
-    
-    # Restore original get_db_session
-    lib.database.get_db_session = original_get_db_session
-
-
-# Helper function to seed data using the test session
-def seed_database_for_test(TestSession):
-    session = TestSession()
-    try:
-        session.query(Answer).delete()
-        session.query(Question).delete()
-        session.query(Category).delete()
-        session.commit()
-
-        cat1 = Category(name="Test History")
-        cat2 = Category(name="Test Science")
-        session.add_all([cat1, cat2])
-        session.commit()
-
-        q1 = Question(text="Test Q1", category=cat1)
-        q2 = Question(text="Test Q2", category=cat1)
-        q3 = Question(text="Test Q3", category=cat2)
-        session.add_all([q1, q2, q3])
-        session.flush() # To get IDs for questions
-
-        ans1 = Answer(text="A1 Correct", is_correct=True, question=q1)
-        ans2 = Answer(text="A1 Wrong", is_correct=False, question=q1)
-        ans3 = Answer(text="A2 Correct", is_correct=True, question=q2)
-        session.add_all([ans1, ans2, ans3])
-        session.commit()
-    except Exception as e:
-        session.rollback()
-        raise e # Re-raise to fail the test if seeding fails
-    finally:
-        session.close()
-
+# --- Test Database Layer ---
+def test_session_is_reused_within_operation():
+    assert get_db_session() is get_db_session()
+    first = get_db_session()
+    close_db_session()
+    assert get_db_session() is not first
+
+def test_session_scope_rolls_back_on_error():
+    with pytest.raises(ValueError):
+        with session_scope() as session:
+            session.add(Category(name="Rolled Back"))
+            session.flush()
+            raise ValueError("boom")
+    assert Category.find_by_name("Rolled Back") is None
+
+def test_sqlite_file_engine_pragmas(tmp_path):
+    file_engine = build_engine(f"sqlite:///{tmp_path / 'quiz.db'}")
+    with file_engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1 # NORMAL
+    file_engine.dispose()
 
 # --- Test Category Model ---
 def test_category_creation():
@@ -202,4 +154,223 @@ def test_answer_delete():
 def test_answer_question_relationship():
     ans = Answer.find_by_id(1)
     assert isinstance(ans.question, Question)
-    assert ans.question.text == "Test Q1"
\ No newline at end of file
+    assert ans.question.text == "Test Q1"
+
+# --- Test Quiz Loading ---
+def test_load_quiz_returns_questions_and_answers():
+    cat = Category.find_by_name("Test History")
+    quiz = Category.load_quiz(cat.id)
+    assert quiz.category_name == "Test History"
+    assert [q.text for q in quiz.questions] == ["Test Q1", "Test Q2"]
+    q1 = quiz.questions[0]
+    assert [(a.text, a.is_correct) for a in q1.answers] == [("A1 Correct", True), ("A1 Wrong", False)]
+
+def test_load_quiz_unknown_category():
+    assert Category.load_quiz(9999) is None
+
+def test_load_quiz_is_detached_and_constant_queries():
+    from sqlalchemy import event
+    cat_id = Category.find_by_name("Test Science").id
+    for i in range(50):
+        q = Question.create(f"Bulk Q{i}", cat_id)
+        q.add_answer("Yes", True)
+        q.add_answer("No", False)
+    close_db_session()
+
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    engine = lib.database.get_engine()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        quiz = Category.load_quiz(cat_id)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    close_db_session()
+
+    assert len(statements) == 1
+    assert len(quiz.questions) == 51
+    assert quiz.questions[-1].answers[0].text == "Yes" # Still readable after the session is gone
+
+
+# --- Test Keyset Pagination ---
+def test_iter_page_walks_ids_in_order():
+    cat_id = Category.find_by_name("Test Science").id
+    for i in range(7):
+        Question.create(f"Paged Q{i}", cat_id)
+    all_ids = sorted(q.id for q in Question.get_all())
+    close_db_session()
+
+    first = Question.iter_page(0, 4)
+    second = Question.iter_page(first[-1].id, 4)
+    third = Question.iter_page(second[-1].id, 4)
+    assert [q.id for q in first + second + third] == all_ids
+    assert len(third) == 2
+    assert Question.iter_page(all_ids[-1], 4) == []
+
+def test_iter_page_filters_by_parent():
+    history = Category.find_by_name("Test History")
+    assert [q.text for q in Question.iter_page(0, 10, category_id=history.id)] == ["Test Q1", "Test Q2"]
+    q1 = Question.iter_page(0, 1, category_id=history.id)[0]
+    assert [a.text for a in Answer.iter_page(0, 10, question_id=q1.id)] == ["A1 Correct", "A1 Wrong"]
+    assert [c.name for c in Category.iter_page(0, 10)] == ["Test History", "Test Science"]
+
+def test_iter_page_eager_loads_with_two_queries():
+    from sqlalchemy import event
+    cat_id = Category.find_by_name("Test Science").id
+    for i in range(30):
+        Question.create(f"Bulk Q{i}", cat_id).add_answer("Yes", True)
+    close_db_session()
+
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    engine = lib.database.get_engine()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        page = Question.iter_page(0, 25)
+        rendered = [(q.category.name, [a.text for a in q.answers]) for q in page]
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert len(statements) == 2 # Questions joined with categories, then all their answers
+    assert len(rendered) == 25
+    assert rendered[0] == ("Test History", ["A1 Correct", "A1 Wrong"])
+
+def test_iter_all_yields_every_row_across_pages():
+    cat_id = Category.find_by_name("Test Science").id
+    for i in range(10):
+        Question.create(f"Stream Q{i}", cat_id)
+    expected = sorted(q.id for q in Question.get_all())
+    close_db_session()
+
+    assert [q.id for q in Question.iter_all(batch_size=3)] == expected
+    assert [q.text for q in Question.iter_all(category_id=cat_id, batch_size=4)][:2] == ["Test Q3", "Stream Q0"]
+    assert len(list(Answer.iter_all(batch_size=2))) == 3
+    assert list(Category.iter_all(batch_size=5)) != []
+
+
+# --- Test Model Cache ---
+def test_find_by_id_is_served_from_cache():
+    from lib.cache import cache_stats
+    Question.find_by_id(1)
+    close_db_session()
+    hits_before = cache_stats()["hits"]
+    q = Question.find_by_id(1)
+    assert cache_stats()["hits"] == hits_before + 1
+    assert q.text == "Test Q1"
+    assert len(q.answers) == 2 # Lazy loads still work on a cache hit
+
+def test_writes_invalidate_cache():
+    assert len(Category.get_all()) == 2
+    Category.create("Geography")
+    assert len(Category.get_all()) == 3
+    Question.find_by_id(3).update(new_text="Changed Q3")
+    close_db_session()
+    assert Question.find_by_id(3).text == "Changed Q3"
+    Question.find_by_id(3).delete()
+    assert Question.find_by_id(3) is None
+
+
+# --- Test Schema ---
+def test_lookup_indexes_exist():
+    from sqlalchemy import inspect
+    inspector = inspect(lib.database.get_engine())
+    question_indexes = {tuple(ix["column_names"]) for ix in inspector.get_indexes("questions")}
+    answer_indexes = {tuple(ix["column_names"]) for ix in inspector.get_indexes("answers")}
+    assert ("category_id",) in question_indexes
+    assert ("question_id", "is_correct") in answer_indexes
+
+def test_category_delete_cascades_in_database():
+    from sqlalchemy import event
+    cat_id = Category.find_by_name("Test History").id
+    close_db_session()
+    category = Category.find_by_id(cat_id)
+
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    engine = lib.database.get_engine()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        assert category.delete()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    # Questions and answers are removed by ON DELETE CASCADE, not loaded into Python
+    assert not any(s.lstrip().upper().startswith("SELECT") for s in statements)
+    session = get_db_session()
+    assert session.query(Question).filter_by(category_id=cat_id).count() == 0
+    assert session.query(Answer).count() == 0 # All seeded answers belong to Test History
+
+
+# --- Test Question Sampling ---
+def test_sample_returns_n_questions_with_answers():
+    cat_id = Category.find_by_name("Test Science").id
+    for i in range(30):
+        Question.create(f"Sample Q{i}", cat_id).add_answer(f"Answer {i}", True)
+    quiz = Question.sample(cat_id, 5, seed=42)
+    assert len(quiz.questions) == 5
+    assert len({q.id for q in quiz.questions}) == 5
+    sampled = [q for q in quiz.questions if q.text.startswith("Sample")]
+    assert all(len(q.answers) == 1 and q.answers[0].is_correct for q in sampled)
+
+def test_sample_is_reproducible_with_seed():
+    cat_id = Category.find_by_name("Test Science").id
+    for i in range(30):
+        Question.create(f"Sample Q{i}", cat_id)
+    first = [q.id for q in Question.sample(cat_id, 10, seed=7).questions]
+    assert first == [q.id for q in Question.sample(cat_id, 10, seed=7).questions]
+    assert first != [q.id for q in Question.sample(cat_id, 10, seed=8).questions]
+
+def test_sample_more_than_available_and_unknown_category():
+    cat_id = Category.find_by_name("Test History").id
+    assert sorted(q.text for q in Question.sample(cat_id, 50).questions) == ["Test Q1", "Test Q2"]
+    assert Question.sample(9999, 5) is None
+
+def test_question_id_array_is_invalidated_by_writes():
+    cat_id = Category.find_by_name("Test History").id
+    assert list(Question.ids_for_category(cat_id)) == [1, 2]
+    Question.create("Test Q4", cat_id)
+    assert len(Question.ids_for_category(cat_id)) == 3
+
+
+# --- Test Bulk Operations ---
+def test_bulk_writes_are_single_statements(query_budget):
+    from lib.models.content_revision import ContentRevision
+    history_id = Category.find_by_name("Test History").id
+    science_id = Category.find_by_name("Test Science").id
+    revision = ContentRevision.current()
+    close_db_session()
+
+    with query_budget(2): # The UPDATE and the content revision bump
+        assert Question.bulk_replace_text("Test Q", "Question ", category_id=history_id) == 2
+    with query_budget(3): # Target category check, UPDATE, revision bump
+        assert Question.move_all(history_id, science_id) == 2
+    with query_budget(2):
+        assert Answer.bulk_set_correct([1, 2, 9999], True) == 2
+    assert ContentRevision.current() == revision + 3
+    assert [q.text for q in Category.load_quiz(science_id).questions] == ["Question 1", "Question 2", "Test Q3"]
+    assert all(a.is_correct for a in Question.find_by_id(1).answers)
+    assert Question.move_all(science_id, 9999) is None
+
+def test_bulk_delete_by_ids_or_filter():
+    science_id = Category.find_by_name("Test Science").id
+    Question.find_by_id(1) # Cached; must not survive the delete
+    assert Question.bulk_delete() is None # Refuses to delete everything
+    assert Question.bulk_delete([1, 9999]) == 1
+    assert Question.find_by_id(1) is None
+    assert Answer.find_by_id(1) is None # Answers go by cascade
+    assert Question.bulk_delete(category_id=science_id, text_contains="Q2") == 0 # Filters combine
+    assert Question.bulk_delete(text_contains="Q2") == 1
+    assert [q.text for q in Question.get_all()] == ["Test Q3"]
+
+def test_bulk_rename_categories():
+    history_id = Category.find_by_name("Test History").id
+    science_id = Category.find_by_name("Test Science").id
+    assert Category.bulk_rename({history_id: "History", science_id: "Science"}) == 2
+    assert sorted(c.name for c in Category.get_all()) == ["History", "Science"]
+    assert Category.bulk_rename({history_id: "Science"}) is None # Unique names; nothing changes
+    assert Category.find_by_id(history_id).name == "History"
+    assert Category.bulk_rename({history_id: "Science", science_id: "History"}) == 2 # Swapped
+    assert (Category.find_by_id(history_id).name, Category.find_by_id(science_id).name) == ("Science", "History")
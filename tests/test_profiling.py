@@ -0,0 +1,60 @@
+import pytest
+from lib.cache import invalidate_cache
+from lib.leaderboard import top_players
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.profiling import LatencyHistogram, Profiler, count_queries
+
+def test_quiz_loads_within_budget(query_budget):
+    category_id = Category.find_by_name("Test History").id
+    invalidate_cache()
+    with query_budget(1):
+        Category.load_quiz(category_id)
+    with query_budget(3):
+        Question.sample(category_id, 1) # Category, ID array, then the chosen questions
+    with query_budget(1):
+        Question.sample(category_id, 1) # Category and IDs are cached now
+    with query_budget(2):
+        Question.iter_page(0, 10) # Page plus its answers, however many questions
+    with query_budget(1):
+        top_players()
+
+def test_cached_lookups_run_no_queries(query_budget):
+    question_id = Question.iter_page(0, 1)[0].id
+    Question.find_by_id(question_id)
+    with query_budget(0):
+        Question.find_by_id(question_id)
+
+def test_budget_failure_lists_statements(query_budget):
+    with pytest.raises(AssertionError, match=r"at most 0 queries, ran 1:\n  1\. SELECT categories"):
+        with query_budget(0):
+            Category.load_quiz(1)
+
+def test_operations_nest_and_log_slow_statements():
+    profiler = Profiler(slow_query_ms=0)
+    profiler.install()
+    try:
+        with profiler.operation("outer") as outer:
+            Category.load_quiz(1)
+            with profiler.operation("inner") as inner:
+                Category.load_quiz(2)
+    finally:
+        profiler.uninstall()
+    assert (outer.queries, outer.round_trips, inner.queries) == (2, 2, 1)
+    assert profiler.totals["outer"][:3] == (1, 2, 2)
+    assert len(profiler.slow_queries) == 2
+    assert profiler.slow_queries[-1].call_site.startswith("lib/models/category.py:")
+    assert profiler.slow_queries[-1].operation == "inner"
+
+def test_count_queries_ignores_other_blocks():
+    with count_queries() as stats:
+        pass
+    Category.load_quiz(1)
+    assert stats.queries == 0
+
+def test_latency_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for ms in [0.05] * 90 + [3] * 9 + [5000]:
+        histogram.add(ms / 1000)
+    assert (histogram.percentile(0.5), histogram.percentile(0.95), histogram.percentile(1.0)) == (0.1, 5, 5000)
+    assert histogram.count == 100
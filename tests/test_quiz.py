@@ -0,0 +1,66 @@
+import random
+import pytest
+from lib.quiz import Quiz, QuizQuestion, QuizAnswer, QuizEngine
+
+QUIZ = Quiz(1, "Sample", (
+    QuizQuestion(10, "2 + 2?", (QuizAnswer(100, "3", False), QuizAnswer(101, "4", True), QuizAnswer(102, "5", False))),
+    QuizQuestion(20, "Capital of Italy?", (QuizAnswer(200, "Rome", True), QuizAnswer(201, "Milan", False))),
+    QuizQuestion(30, "Unanswerable?", ()),
+))
+
+def test_session_scores_answers():
+    session = QuizEngine(QUIZ).start(shuffle=False)
+    q = session.next_question()
+    assert q.id == 10
+    result = session.answer(101)
+    assert result.is_correct
+    q = session.next_question()
+    result = session.answer(201)
+    assert not result.is_correct
+    assert result.correct_answer.text == "Rome"
+    q = session.next_question()
+    assert q.answers == ()
+    session.skip()
+    assert session.next_question() is None
+    assert session.finished
+    assert (session.score, session.answered, session.total) == (1, 2, 3)
+    assert session.percentage == pytest.approx(100 / 3)
+
+def test_answer_requires_a_current_question():
+    session = QuizEngine(QUIZ).start()
+    with pytest.raises(ValueError):
+        session.answer(101)
+
+def test_shuffle_is_reproducible_with_seed():
+    engine = QuizEngine(QUIZ)
+    def run(seed):
+        session = engine.start(rng=random.Random(seed))
+        order = []
+        while (q := session.next_question()) is not None:
+            order.append((q.id, tuple(a.id for a in q.answers)))
+            session.skip()
+        return order
+    assert run(7) == run(7)
+    assert sorted(q_id for q_id, _ in run(7)) == [10, 20, 30]
+
+def test_sessions_share_engine_independently():
+    engine = QuizEngine(QUIZ)
+    first, second = engine.start(shuffle=False), engine.start(shuffle=False)
+    first.next_question()
+    first.answer(101)
+    second.next_question()
+    second.answer(100)
+    assert (first.score, second.score) == (1, 0)
+
+def test_resume_rebuilds_a_seeded_session():
+    engine = QuizEngine(QUIZ)
+    original = engine.start(seed=42)
+    q = original.next_question()
+    original.answer(q.answers[0].id)
+    current = original.next_question()
+    resumed = engine.resume(42, original.position, original.score, original.answered, awaiting=True)
+    assert resumed.current == current
+    assert (resumed.score, resumed.answered, resumed.position) == (original.score, original.answered, original.position)
+    answer_id = current.answers[-1].id
+    assert resumed.answer(answer_id) == original.answer(answer_id)
+    assert resumed.next_question() == original.next_question()
@@ -0,0 +1,63 @@
+from lib.database import close_db_session
+from lib.models.category import Category
+from lib.models.attempt import Attempt
+from lib.models.response import Response
+from lib.recorder import ResponseRecorder
+
+def test_attempt_start_and_finish():
+    cat = Category.find_by_name("Test History")
+    attempt = Attempt.start(cat.id, 2, "Ada")
+    assert attempt.status == Attempt.STATUS_IN_PROGRESS
+    assert attempt.finish(1, completed=False)
+    attempt_id = attempt.id
+    close_db_session()
+    stored = Attempt.find_by_id(attempt_id)
+    assert (stored.player, stored.score, stored.total_questions) == ("Ada", 1, 2)
+    assert stored.status == Attempt.STATUS_INTERRUPTED
+    assert stored.finished_at is not None
+
+def test_responses_are_written_in_batches():
+    cat = Category.find_by_name("Test History")
+    attempt_id = Attempt.start(cat.id, 2, None).id
+    close_db_session()
+
+    recorder = ResponseRecorder(batch_size=2, flush_interval=60)
+    try:
+        recorder.record(attempt_id, 1, 1, True)
+        recorder.record(attempt_id, 2, 3, True)
+        recorder.record(attempt_id, 1, 2, False)
+        assert recorder.flush(timeout=5)
+        assert recorder.written == 3
+    finally:
+        recorder.close(timeout=5)
+
+    responses = Response.for_attempt(attempt_id)
+    assert [(r.question_id, r.answer_id, r.is_correct) for r in responses] == [(1, 1, True), (2, 3, True), (1, 2, False)]
+    assert Attempt.find_by_id(attempt_id).player == "Anonymous"
+
+def test_close_writes_buffered_responses():
+    cat = Category.find_by_name("Test Science")
+    attempt_id = Attempt.start(cat.id, 1, "Grace").id
+    close_db_session()
+    recorder = ResponseRecorder(batch_size=100, flush_interval=60)
+    recorder.record(attempt_id, 3, None, False)
+    recorder.close(timeout=5)
+    assert len(Response.for_attempt(attempt_id)) == 1
+    assert not recorder.flush() # Closed recorders no longer accept flushes
+
+def test_a_bad_response_does_not_lose_the_rest_of_its_batch(capsys):
+    cat = Category.find_by_name("Test History")
+    attempt_id = Attempt.start(cat.id, 2, "Ada").id
+    close_db_session()
+    recorder = ResponseRecorder(batch_size=100, flush_interval=60)
+    try:
+        recorder.record(attempt_id, 1, 999999, False) # No such answer
+        recorder.record(attempt_id, 2, 3, True)
+        assert not recorder.flush(timeout=5) # Reports the loss
+        assert (recorder.written, recorder.failed) == (1, 1)
+        recorder.record(attempt_id, 1, 1, True)
+        assert recorder.flush(timeout=5)
+    finally:
+        assert recorder.close(timeout=5)
+    assert [(r.question_id, r.answer_id) for r in Response.for_attempt(attempt_id)] == [(2, 3), (1, 1)]
+    assert "Error recording response to question 1" in capsys.readouterr().out
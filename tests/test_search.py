@@ -0,0 +1,89 @@
+import pytest
+import lib.search
+from lib.cache import PerEngine
+from lib.database import get_db_session
+from lib.importer import import_records
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.models.answer import Answer
+from lib.search import FTSSearchIndex, MemoryIndex, search_questions, tokenize
+
+@pytest.fixture(params=["fts", "memory"])
+def backend(request, monkeypatch):
+    index = FTSSearchIndex() if request.param == "fts" else MemoryIndex()
+    monkeypatch.setattr(lib.search, "_indexes", PerEngine(lambda engine: index))
+    return request.param
+
+def ids(results):
+    return [hit.question_id for hit in results.hits]
+
+def test_tokenize_folds_case_and_accents():
+    assert tokenize("Où est l'Élysée? Paris_France") == ["ou", "est", "l", "elysee", "paris", "france"]
+
+def test_search_questions_and_answers(backend):
+    q1 = Question.find_by_id(1)
+    assert ids(search_questions("Q1")) == [1]
+    assert ids(search_questions("wrong")) == [1] # Matches an answer
+    assert sorted(ids(search_questions("test q"))) == [1, 2, 3] # Last word is a prefix
+    assert sorted(ids(search_questions("correct", category_id=q1.category_id))) == [1, 2]
+    assert search_questions("   ").total == 0
+
+def test_search_follows_writes(backend):
+    search_questions("anything") # Build the index first, then change content
+    category_id = Category.find_by_name("Test Science").id
+    question_id = Question.create("Which planet is largest?", category_id).id
+    assert ids(search_questions("planet")) == [question_id]
+
+    Answer.create("Jupiter", True, question_id)
+    assert ids(search_questions("jupiter")) == [question_id]
+
+    Question.find_by_id(question_id).update(new_text="Which gas giant is largest?")
+    assert ids(search_questions("planet")) == []
+    assert ids(search_questions("gas giant jupiter")) == [question_id]
+
+    Question.find_by_id(question_id).delete()
+    assert ids(search_questions("jupiter")) == []
+
+    Category.find_by_name("Test History").delete() # Questions go by cascade
+    assert ids(search_questions("test")) == [3]
+
+def test_search_sees_imports_and_paginates(backend):
+    search_questions("anything")
+    import_records({"category": "Bulk", "question": f"Bulk question {i}", "answers": [{"text": "yes", "is_correct": True}]}
+                   for i in range(25))
+    first = search_questions("bulk", page=1, page_size=10)
+    last = search_questions("bulk", page=3, page_size=10)
+    assert (first.total, first.pages, len(first.hits), len(last.hits)) == (25, 3, 10, 5)
+    assert first.has_next and not last.has_next
+    assert not set(ids(first)) & set(ids(last))
+
+def test_question_text_ranks_above_answers(backend):
+    category_id = Category.find_by_name("Test Science").id
+    in_answer = Question.create("Which metal rusts?", category_id).id
+    Answer.create("Iron", True, in_answer)
+    in_question = Question.create("What is iron made of?", category_id).id
+    assert ids(search_questions("iron")) == [in_question, in_answer]
+
+def test_search_follows_bulk_writes(backend):
+    search_questions("anything")
+    history_id = Category.find_by_name("Test History").id
+    science_id = Category.find_by_name("Test Science").id
+    assert Question.bulk_replace_text("Test Q", "Quiz item ") == 3
+    assert ids(search_questions("test q")) == []
+    assert sorted(ids(search_questions("quiz item"))) == [1, 2, 3]
+
+    assert Question.move_all(history_id, science_id) == 2
+    assert sorted(ids(search_questions("quiz", category_id=science_id))) == [1, 2, 3]
+
+    assert Question.bulk_delete([1, 3]) == 2
+    assert ids(search_questions("quiz")) == [2]
+
+def test_fts_search_leaves_the_callers_session_alone(file_database):
+    search_questions("anything")
+    session = get_db_session()
+    category = Category(name="Uncommitted")
+    session.add(category)
+    session.flush()
+    assert ids(search_questions("test q3")) == [3] # Does not wait on or commit the pending write
+    session.rollback()
+    assert Category.find_by_name("Uncommitted") is None
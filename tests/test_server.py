@@ -0,0 +1,176 @@
+import asyncio
+import json
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.models.attempt import Attempt
+from lib.models.response import Response
+from lib.recorder import ResponseRecorder
+from lib.server import HTTPError, QuizService, start_server
+from lib.session_store import SharedSessionStore
+from lib.snapshot import ContentSnapshot
+
+async def request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode() + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+def run_with_server(scenario):
+    async def main():
+        recorder = ResponseRecorder(flush_interval=60)
+        service = QuizService(db_threads=2, recorder=recorder)
+        server = await start_server(service, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await scenario(port, service)
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+            recorder.close(timeout=5)
+    return asyncio.run(main())
+
+def test_list_categories():
+    async def scenario(port, service):
+        return await request(port, "GET", "/categories")
+    status, categories = run_with_server(scenario)
+    assert status == 200
+    assert {c["name"]: c["questions"] for c in categories} == {"Test History": 2, "Test Science": 1}
+
+def test_full_quiz_over_http():
+    cat_id = Category.find_by_name("Test History").id
+
+    async def scenario(port, service):
+        status, started = await request(port, "POST", "/quizzes", {"category_id": cat_id, "player": "Ada"})
+        assert status == 201
+        assert "is_correct" not in json.dumps(started["question"])
+        session_id, question = started["session_id"], started["question"]
+        correct_ids = {"Test Q1": "A1 Correct", "Test Q2": "A2 Correct"}
+        while question:
+            answer = next(a for a in question["answers"] if a["text"] == correct_ids[question["text"]])
+            status, result = await request(port, "POST", f"/quizzes/{session_id}/answers", {"answer_id": answer["id"]})
+            assert status == 200 and result["correct"]
+            question = result["question"]
+        results = await request(port, "GET", f"/quizzes/{session_id}/results")
+        return results, await request(port, "GET", f"/categories/{cat_id}/leaderboard")
+
+    (status, results), (_, leaderboard) = run_with_server(scenario)
+    assert status == 200
+    assert (results["score"], results["total"], results["finished"]) == (2, 2, True)
+    attempt = Attempt.get_all()[0]
+    assert (attempt.player, attempt.score, attempt.status) == ("Ada", 2, Attempt.STATUS_COMPLETED)
+    assert len(Response.for_attempt(attempt.id)) == 2
+    assert [(e["rank"], e["player"], e["points"]) for e in leaderboard] == [(1, "Ada", 2)]
+
+def test_errors():
+    async def scenario(port, service):
+        return [
+            await request(port, "POST", "/quizzes", {"category_id": 9999}),
+            await request(port, "POST", "/quizzes", {"category_id": "x"}),
+            await request(port, "GET", "/quizzes/nope"),
+            await request(port, "GET", "/unknown"),
+            await request(port, "GET", "/categories/9999/leaderboard"),
+            await request(port, "GET", "/leaderboard"),
+        ]
+    assert [status for status, _ in run_with_server(scenario)] == [404, 400, 404, 404, 404, 200]
+
+def test_internal_errors_are_not_leaked(capsys):
+    async def scenario(port, service):
+        async def fail():
+            raise RuntimeError("no such table: categories")
+        service.list_categories = fail
+        return await request(port, "GET", "/categories")
+    assert run_with_server(scenario) == (500, {"error": "Internal server error"})
+    assert "no such table" in capsys.readouterr().err
+
+async def raw_request(port, head):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(head.encode())
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    return int(raw.split()[1])
+
+def test_invalid_requests_are_rejected():
+    cat_id = Category.find_by_name("Test History").id
+
+    async def scenario(port, service):
+        _, started = await request(port, "POST", "/quizzes", {"category_id": cat_id})
+        return [
+            (await request(port, "POST", f"/quizzes/{started['session_id']}/answers", {"answer_id": 999999}))[0],
+            (await request(port, "GET", f"/quizzes/{started['session_id']}"))[1]["position"],
+            (await request(port, "POST", "/quizzes", {"category_id": cat_id, "questions": -1}))[0],
+            (await request(port, "POST", "/quizzes", {"category_id": cat_id, "questions": 0}))[0],
+            (await request(port, "POST", "/quizzes", {"category_id": cat_id, "player": ["Ada"]}))[0],
+            await raw_request(port, "POST /quizzes HTTP/1.1\r\nContent-Length: abc\r\n\r\n"),
+            await raw_request(port, "POST /quizzes HTTP/1.1\r\nContent-Length: -5\r\n\r\n"),
+            await raw_request(port, f"POST /quizzes HTTP/1.1\r\nContent-Length: {10 ** 9}\r\n\r\n"),
+        ]
+    assert run_with_server(scenario) == [400, 1, 400, 400, 400, 400, 400, 413] # Still on the first question
+    [attempt] = Attempt.get_all()
+    assert Response.for_attempt(attempt.id) == [] # Nor recorded
+
+def test_idle_sessions_expire():
+    cat_id = Category.find_by_name("Test History").id
+    async def scenario(port, service):
+        _, started = await request(port, "POST", "/quizzes", {"category_id": cat_id})
+        await service.expire_idle_sessions(idle_timeout=0)
+        return started["session_id"] in service.sessions
+    assert run_with_server(scenario) is False
+    assert Attempt.get_all()[0].status == Attempt.STATUS_INTERRUPTED
+
+def test_workers_share_sessions_and_snapshot():
+    cat_id = Category.find_by_name("Test History").id
+    snapshot, sessions = ContentSnapshot.build(), SharedSessionStore(max_sessions=16)
+    async def main():
+        recorder = ResponseRecorder(flush_interval=60)
+        # Two services over one shared store stand in for two forked workers
+        first, second = (QuizService(db_threads=2, recorder=recorder, content=snapshot, sessions=sessions)
+                         for _ in range(2))
+        try:
+            started = await first.start_quiz(cat_id, n=2)
+            session_id = started["session_id"]
+            answer_id = started["question"]["answers"][0]["id"]
+            reply = await second.answer(session_id, answer_id)
+            assert reply["position"] == 2 and not reply["finished"]
+            assert (await first.get_quiz(session_id))["question"] == reply["question"]
+            await first.answer(session_id, reply["question"]["answers"][0]["id"])
+            return await second.results(session_id)
+        finally:
+            first.close()
+            second.close()
+            recorder.close(timeout=5)
+    results = asyncio.run(main())
+    assert (results["answered"], results["finished"]) == (2, True)
+    assert Attempt.get_all()[0].status == Attempt.STATUS_COMPLETED
+
+def test_sessions_end_when_content_changes_mid_quiz():
+    cat_id = Category.find_by_name("Test History").id
+    before, sessions = ContentSnapshot.build(), SharedSessionStore(max_sessions=16)
+    Question.create("Added mid-quiz?", cat_id)
+    after = ContentSnapshot.build()
+    async def main():
+        recorder = ResponseRecorder(flush_interval=60)
+        # A worker of the generation started after a reload serves a session started before it
+        old, new = (QuizService(db_threads=2, recorder=recorder, content=content, sessions=sessions)
+                    for content in (before, after))
+        try:
+            started = await old.start_quiz(cat_id)
+            answer_id = started["question"]["answers"][0]["id"]
+            try:
+                await new.answer(started["session_id"], answer_id)
+            except HTTPError as e:
+                return e.status, sessions.get(started["session_id"], after), len(sessions)
+        finally:
+            old.close()
+            new.close()
+            recorder.close(timeout=5)
+    assert asyncio.run(main()) == (409, None, 0)
+    [attempt] = Attempt.get_all()
+    assert attempt.status == Attempt.STATUS_INTERRUPTED
+    assert Response.for_attempt(attempt.id) == [] # Not graded against the wrong question
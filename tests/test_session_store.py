@@ -0,0 +1,43 @@
+from lib.quiz import Quiz, QuizQuestion, QuizAnswer, QuizEngine
+from lib.session_store import ActiveQuiz, SharedSessionStore
+
+QUIZ = Quiz(1, "Sample", (
+    QuizQuestion(10, "2 + 2?", (QuizAnswer(100, "3", False), QuizAnswer(101, "4", True))),
+    QuizQuestion(20, "Capital of Italy?", (QuizAnswer(200, "Rome", True), QuizAnswer(201, "Milan", False))),
+))
+
+class StaticContent:
+    def engine(self, category_id, n=None, seed=None):
+        return QuizEngine(QUIZ) if category_id == 1 else None
+
+def test_shared_store_round_trip():
+    store, content = SharedSessionStore(max_sessions=4), StaticContent()
+    quiz_session = QuizEngine(QUIZ).start(seed=5)
+    question = quiz_session.next_question()
+    session_id = store.create(ActiveQuiz(quiz_session, 7, 1))
+    assert len(store) == 1
+
+    loaded = store.get(session_id, content)
+    assert (loaded.attempt_id, loaded.category_id) == (7, 1)
+    assert loaded.quiz_session.current == question
+    loaded.quiz_session.answer(question.answers[0].id)
+    loaded.quiz_session.next_question()
+    store.save(session_id, loaded)
+    again = store.get(session_id, content).quiz_session
+    assert (again.position, again.answered, again.current) == (2, 1, loaded.quiz_session.current)
+
+    store.remove(session_id)
+    assert store.get(session_id, content) is None
+    assert len(store) == 0
+
+def test_shared_store_rejects_stale_ids_and_fills_up():
+    store, content = SharedSessionStore(max_sessions=2), StaticContent()
+    ids = [store.create(ActiveQuiz(QuizEngine(QUIZ).start(seed=i), None, 1)) for i in range(3)]
+    assert ids[2] is None
+    store.remove(ids[0])
+    reused = store.create(ActiveQuiz(QuizEngine(QUIZ).start(seed=9), None, 1))
+    assert reused.split("-")[0] == ids[0].split("-")[0]
+    assert store.get(ids[0], content) is None # Same slot, different nonce
+    assert store.get("garbage", content) is None
+    assert len(store.pop_idle(float("inf"), content)) == 2
+    assert len(store) == 0
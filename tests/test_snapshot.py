@@ -0,0 +1,74 @@
+import pytest
+from lib.importer import import_records
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.models.content_revision import ContentRevision
+from lib.snapshot import ContentSnapshot
+from lib.snapshot_file import MappedSnapshot, SnapshotError, open_current_snapshot, write_snapshot
+
+def test_content_writes_bump_revision():
+    before = ContentRevision.current()
+    category = Category.create("Revisioned")
+    after_create = ContentRevision.current()
+    category.delete()
+    assert before < after_create < ContentRevision.current()
+
+def test_import_bumps_revision():
+    before = ContentRevision.current()
+    import_records([{"category": "Imported", "question": "Q?", "answers": [{"text": "A", "is_correct": True}]}])
+    assert ContentRevision.current() > before
+
+def test_snapshot_matches_database():
+    snapshot = ContentSnapshot.build()
+    assert snapshot.revision == ContentRevision.current()
+    history_id = Category.find_by_name("Test History").id
+    assert {c.name: c.question_count for c in snapshot.list_categories()} == {"Test History": 2, "Test Science": 1}
+    assert snapshot.load_quiz(history_id) == Category.load_quiz(history_id)
+    assert snapshot.engine(9999) is None
+
+def test_snapshot_samples_like_the_database():
+    category_id = Category.create("Big").id
+    for i in range(20):
+        Question.create(f"Big Q{i}", category_id)
+    snapshot = ContentSnapshot.build()
+    for seed in (1, 2, 3):
+        assert snapshot.sample(category_id, 5, seed) == Question.sample(category_id, 5, seed)
+    assert len(snapshot.engine(category_id, 5, seed=1)) == 5
+    assert len(snapshot.engine(category_id, 50, seed=1)) == 20
+
+def test_snapshot_file_round_trip(tmp_path):
+    category_id = Category.create("Big").id
+    for i in range(20):
+        Question.create(f"Big Q{i} ✓", category_id)
+    Category.create("Empty")
+    path = str(tmp_path / "quiz.snap")
+    result = write_snapshot(path)
+    assert (result.categories, result.questions, result.answers) == (4, 23, 3)
+
+    expected = ContentSnapshot.build()
+    with MappedSnapshot(path) as mapped:
+        assert mapped.revision == expected.revision
+        assert mapped.list_categories() == expected.list_categories()
+        for info in expected.list_categories():
+            assert mapped.load_quiz(info.id) == expected.load_quiz(info.id)
+        assert mapped.sample(category_id, 5, seed=3) == Question.sample(category_id, 5, seed=3)
+        assert len(mapped.engine(category_id, 5, seed=3)) == 5
+        assert len(mapped.sample(category_id, -1).questions) == len(expected.sample(category_id, -1).questions) == 0
+        assert len(Question.sample(category_id, -1).questions) == 0
+        assert mapped.load_quiz(9999) is None and mapped.engine(9999) is None
+
+def test_snapshot_file_goes_stale_on_content_changes(tmp_path):
+    path = str(tmp_path / "quiz.snap")
+    write_snapshot(path)
+    snapshot = open_current_snapshot(path)
+    assert snapshot is not None
+    snapshot.close()
+    Category.create("New")
+    assert open_current_snapshot(path) is None
+    assert open_current_snapshot(str(tmp_path / "missing.snap")) is None
+
+def test_snapshot_file_rejects_other_files(tmp_path):
+    path = tmp_path / "bogus.snap"
+    path.write_bytes(b"not a snapshot" * 20)
+    with pytest.raises(SnapshotError):
+        MappedSnapshot(str(path))
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET_MS = float(os.environ.get("QUIZ_IMPORT_BUDGET_MS", 60)) # Cumulative import time of main and lib.cli
+HEAVY_MODULES = ("sqlalchemy", "pytest", "lib.database", "lib.models")
+
+def run(args, stdin=""):
+    return subprocess.run([sys.executable, "-X", "importtime", *args], cwd=ROOT, input=stdin,
+                          capture_output=True, text=True, timeout=60)
+
+def imported(importtime_output):
+    """Maps module name -> cumulative import time (microseconds) from -X importtime output."""
+    modules = {}
+    for line in importtime_output.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                modules[name.strip()] = int(cumulative)
+    return modules
+
+def test_help_and_first_menu_skip_heavy_imports():
+    for args, stdin in ((["main.py", "--help"], ""), (["main.py"], "0\n")):
+        result = run(args, stdin)
+        assert result.returncode == 0, result.stderr
+        loaded = [name for name in imported(result.stderr) if name.startswith(HEAVY_MODULES)]
+        assert loaded == [], f"{' '.join(args)} imported {loaded[:5]}"
+    assert "Main Menu" in result.stdout
+
+def test_import_time_budget():
+    modules = imported(run(["-c", "import main, lib.cli"]).stderr)
+    total_ms = (modules["main"] + modules["lib.cli"]) / 1000
+    assert total_ms <= IMPORT_BUDGET_MS, f"Importing main and lib.cli took {total_ms:.1f} ms (budget {IMPORT_BUDGET_MS} ms)"
+
+def test_any_single_model_import_configures_all_mappers():
+    script = ("from lib.models.category import Category; from sqlalchemy.orm import configure_mappers; "
+              "configure_mappers(); print(Category.questions.property.mapper.class_.answers.property.mapper.class_.__name__)")
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "Answer"
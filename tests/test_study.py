@@ -0,0 +1,75 @@
+from lib.database import get_db_session
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.models.review_card import ReviewCard
+from lib.study import (GRADE_AGAIN, GRADE_EASY, GRADE_GOOD, GRADE_HARD, LEARN_AHEAD_MINUTES, MIN_EASE,
+                       MINUTES_PER_DAY, RELEARN_MINUTES, START_EASE, StudyDeck, new_card, schedule)
+
+NOW = 1_000_000
+
+def question(text):
+    return get_db_session().query(Question).filter_by(text=text).one()
+
+def test_schedule_follows_sm2_intervals():
+    card = new_card(1, NOW)
+    card = schedule(card, GRADE_GOOD, NOW)
+    assert (card.interval, card.reps, card.ease, card.due) == (1, 1, START_EASE, NOW + MINUTES_PER_DAY)
+    card = schedule(card, GRADE_GOOD, card.due)
+    assert card.interval == 6
+    card = schedule(card, GRADE_GOOD, card.due)
+    assert card.interval == 15 # 6 x 2.5
+    easy = schedule(card, GRADE_EASY, card.due)
+    hard = schedule(card, GRADE_HARD, card.due)
+    assert easy.ease == START_EASE + 100 and hard.ease == START_EASE - 140
+    assert easy.interval == hard.interval == 38
+
+def test_failed_card_restarts_and_keeps_ease_above_minimum():
+    card = schedule(schedule(new_card(1, NOW), GRADE_GOOD, NOW), GRADE_AGAIN, NOW + 10)
+    assert (card.interval, card.reps, card.lapses, card.due) == (0, 0, 1, NOW + 10 + RELEARN_MINUTES)
+    card = card._replace(ease=MIN_EASE)
+    assert schedule(card, GRADE_HARD, NOW).ease == MIN_EASE
+
+def test_deck_serves_overdue_cards_first_then_new_ones():
+    q1, q2, q3 = question("Test Q1"), question("Test Q2"), question("Test Q3")
+    ReviewCard.save_all("Ada", [new_card(q2.id, NOW - 5)._replace(interval=3, reps=2),
+                                new_card(q3.id, NOW + 5 * MINUTES_PER_DAY)])
+    deck = StudyDeck("Ada", now=NOW)
+    assert (deck.due_count, deck.new_count) == (1, 1)
+    assert [deck.next_card(NOW).id, deck.next_card(NOW).id] == [q2.id, q1.id]
+    assert deck.next_card(NOW) is None # Q3 is not due for days
+
+def test_deck_limits_to_category_and_relearns_failed_cards():
+    history = Category.find_by_name("Test History")
+    deck = StudyDeck("Ada", history.id, now=NOW)
+    assert {question("Test Q1").id, question("Test Q2").id} == set(deck.questions)
+    first = deck.next_card(NOW)
+    deck.review(first.id, GRADE_AGAIN, NOW)
+    second = deck.next_card(NOW)
+    deck.review(second.id, GRADE_GOOD, NOW)
+    assert deck.next_card(NOW - LEARN_AHEAD_MINUTES) is None # The failed card waits RELEARN_MINUTES
+    assert deck.next_card(NOW).id == first.id # ...but is shown early rather than ending the session
+    assert deck.next_card(NOW) is None
+
+def test_reviews_are_written_in_batches(query_budget):
+    deck = StudyDeck("Ada", now=NOW, flush_every=2)
+    first = deck.next_card(NOW)
+    deck.review(first.id, GRADE_GOOD, NOW)
+    assert ReviewCard.summary("Ada", NOW) == (0, 0, None)
+    with query_budget(1):
+        deck.review(deck.next_card(NOW).id, GRADE_GOOD, NOW)
+    assert ReviewCard.summary("Ada", NOW + MINUTES_PER_DAY) == (2, 2, NOW + MINUTES_PER_DAY)
+    deck.review(deck.next_card(NOW).id, GRADE_AGAIN, NOW)
+    deck.close()
+    assert ReviewCard.summary("Ada", NOW + RELEARN_MINUTES) == (3, 1, NOW + RELEARN_MINUTES)
+    assert [row.question_id for row in ReviewCard.due_cards("Ada", NOW + MINUTES_PER_DAY, 10)][0] != first.id
+
+def test_due_cards_are_read_from_the_player_due_index():
+    plan = get_db_session().connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN SELECT question_id FROM review_cards WHERE player = 'Ada' AND due <= 5 ORDER BY due").all()
+    assert any("ix_review_cards_due" in row[-1] for row in plan)
+
+def test_deleting_a_question_deletes_its_cards():
+    q1 = question("Test Q1")
+    ReviewCard.save_all("Ada", [new_card(q1.id, NOW)])
+    q1.delete()
+    assert ReviewCard.summary("Ada", NOW)[0] == 0
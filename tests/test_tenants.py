@@ -0,0 +1,184 @@
+import threading
+import pytest
+import lib.tenants
+from lib.adaptive import get_item_stats
+from lib.database import get_db_session, get_engine, swap_engine
+from lib.dedupe import find_duplicate
+from lib.models.attempt import Attempt
+from lib.models.category import Category
+from lib.models.question import Question
+from lib.models.question_stat import QuestionStat
+from lib.models.response import Response
+from lib.models.content_revision import ContentRevision
+from lib.recorder import ResponseRecorder
+from lib.search import search_questions
+from lib.snapshot_file import SNAPSHOT_PATH, open_current_snapshot, snapshot_path, write_snapshot
+from lib.tenants import (TenantRouter, copy_content, current_tenant, for_each_tenant, select_tenant,
+                         tenant_stats, use_tenant)
+
+@pytest.fixture
+def router(tmp_path):
+    router = TenantRouter(f"sqlite:///{tmp_path}/{{tenant}}.db", max_open=2)
+    yield router
+    router.close()
+
+def names():
+    return sorted(c.name for c in Category.get_all())
+
+def test_models_use_the_active_tenant(router):
+    with use_tenant("acme", router):
+        assert current_tenant() == "acme"
+        Category.create("Acme Only")
+    with use_tenant("globex", router):
+        assert names() == []
+        Category.create("Globex Only")
+    with use_tenant("acme", router):
+        assert names() == ["Acme Only"]
+    assert current_tenant() is None
+    assert names() == ["Test History", "Test Science"] # The default database is untouched
+
+def test_cached_lookups_never_cross_tenants(router):
+    for tenant in ("acme", "globex"):
+        with use_tenant(tenant, router):
+            Category.create(f"{tenant} first")
+    with use_tenant("acme", router):
+        assert Category.find_by_id(1).name == "acme first"
+    with use_tenant("globex", router):
+        assert Category.find_by_id(1).name == "globex first"
+
+def test_threads_work_on_different_tenants_at_once(router):
+    results, barrier = {}, threading.Barrier(2)
+
+    def work(tenant):
+        with use_tenant(tenant, router):
+            Category.create(f"{tenant} category")
+            barrier.wait()
+            results[tenant] = names()
+
+    threads = [threading.Thread(target=work, args=(t,)) for t in ("acme", "globex")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == {"acme": ["acme category"], "globex": ["globex category"]}
+
+def test_router_keeps_only_the_most_recently_used_engines_open(router):
+    with use_tenant("a", router):
+        Category.create("Kept")
+    for tenant in ("b", "c"):
+        router.engine(tenant)
+    assert router.open_tenants() == ["b", "c"]
+    assert router.evicted == 1
+    with use_tenant("a", router): # Reopened lazily, data intact
+        assert names() == ["Kept"]
+    assert router.open_tenants() == ["c", "a"]
+    assert router.tenants() == ["a", "b", "c"] # Found on disk, open or not
+
+def test_invalid_tenant_ids_are_rejected(router):
+    for tenant in ("", "../escape", "Upper", "a" * 64):
+        with pytest.raises(ValueError):
+            router.engine(tenant)
+
+def test_admin_tools_span_all_tenants(router):
+    with use_tenant("acme", router):
+        history = Category.create("History")
+        Question.create("Who built the pyramids?", history.id).add_answer("Egyptians", True)
+        Question.create("When did Rome fall?", Category.create("Rome").id)
+    router.engine("globex")
+    assert copy_content("acme", "globex", category="History", router=router) == 1
+    assert copy_content("acme", "globex", category="Missing", router=router) is None
+    stats = {row.tenant: row for row in tenant_stats(router=router)}
+    assert (stats["acme"].categories, stats["acme"].questions, stats["acme"].answers) == (2, 2, 1)
+    assert (stats["globex"].categories, stats["globex"].questions, stats["globex"].answers) == (1, 1, 1)
+    assert for_each_tenant(lambda tenant: names(), router=router)["globex"] == ["History"]
+
+def test_failing_tenant_does_not_stop_the_others(router, capsys):
+    results = for_each_tenant(lambda tenant: 1 / (tenant != "bad"), ["good", "bad"], router)
+    assert results["good"] == 1 and isinstance(results["bad"], ZeroDivisionError)
+    assert "Error in tenant 'bad'" in capsys.readouterr().out
+
+def test_select_tenant_routes_every_thread(router, monkeypatch):
+    monkeypatch.setattr(lib.tenants, "_default_tenant", None)
+    previous = get_engine()
+    try:
+        select_tenant("acme", router)
+        Category.create("Selected")
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append((current_tenant(), names())))
+        thread.start()
+        thread.join()
+        assert seen == [("acme", ["Selected"])]
+    finally:
+        swap_engine(previous)
+
+def test_recorded_responses_are_written_to_the_tenant_database(router):
+    recorder = ResponseRecorder()
+    try:
+        with use_tenant("acme", router):
+            question = Question.create("Tenant question?", Category.create("Tenant").id)
+            answer = question.add_answer("Yes", True)
+            attempt = Attempt.start(question.category_id, 1, "Ada")
+            recorder.record(attempt.id, question.id, answer.id, True)
+            assert recorder.flush(timeout=5)
+            assert get_db_session().query(Response).count() == 1
+        assert get_db_session().query(Response).count() == 0 # Not in the default database
+        assert recorder.failed == 0
+    finally:
+        recorder.close()
+
+def test_snapshots_are_kept_per_tenant(router, tmp_path):
+    path = str(tmp_path / "quiz.snap")
+    write_snapshot(path) # From the default database
+    default_revision = ContentRevision.current()
+    with use_tenant("acme", router):
+        assert snapshot_path() == SNAPSHOT_PATH.replace(".bin", ".acme.bin")
+        session = get_db_session()
+        while ContentRevision.current() < default_revision: # Same revision, different content
+            ContentRevision.bump(session.connection())
+            session.commit()
+        assert open_current_snapshot(path) is None
+        write_snapshot(path)
+        snapshot = open_current_snapshot(path)
+        assert snapshot is not None and not snapshot.list_categories()
+        snapshot.close()
+    assert open_current_snapshot(path) is None
+
+def test_stats_and_indexes_are_kept_per_tenant(router):
+    with use_tenant("acme", router):
+        category_id = Category.create("Acme").id
+        question_id = Question.create("Which acme rocket is fastest?", category_id).id
+        get_item_stats().update(question_id, 0.0, True)
+        assert [hit.question_id for hit in search_questions("rocket").hits] == [question_id]
+        assert find_duplicate("Which acme rocket is fastest?", category_id) is not None
+    with use_tenant("globex", router):
+        Category.create("Globex")
+        assert get_item_stats().get(question_id)[2] == 0
+        assert search_questions("rocket").total == 0
+        assert find_duplicate("Which acme rocket is fastest?", category_id) is None
+    with use_tenant("acme", router):
+        assert get_item_stats().get(question_id)[2] == 1 # Kept while globex was in use
+        assert get_item_stats().flush() == 1
+        assert get_db_session().get(QuestionStat, question_id).responses == 1
+    with use_tenant("globex", router):
+        assert get_db_session().get(QuestionStat, question_id) is None
+
+def test_a_slow_tenant_does_not_block_the_others(router, monkeypatch):
+    release, opened = threading.Event(), []
+    open_tenant = router._open
+
+    def slow_open(tenant_id):
+        if tenant_id == "slow":
+            assert release.wait(5)
+        return open_tenant(tenant_id)
+
+    monkeypatch.setattr(router, "_open", slow_open)
+    threads = [threading.Thread(target=lambda: opened.append(router.engine("slow"))) for _ in range(2)]
+    for t in threads:
+        t.start()
+    assert router.engine("fast") is not None # While "slow" is still migrating
+    assert router.open_tenants() == ["fast"]
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(opened) == 2 and opened[0] is opened[1] # Opened once, shared with the thread that waited
+    assert router.opened == 2